@@ -0,0 +1,237 @@
+"""Benchmark of the HTTP/2 transport of prd.transport against HTTP/1.1.
+
+Two local servers answer like the stream API of Webex after a fixed latency, one
+over HTTP/1.1 and one over HTTP/2 (in cleartext, with prior knowledge). The same
+generate_recording_from_id calls are made concurrently through a requests session
+with each transport, and the time and the connections opened are printed.
+
+Run it from the root of the repository, it needs httpx[http2]:
+    python -m benchmarks.http2_transport --requests=2000 --workers=64
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.pool import ThreadPool
+from typing import Dict, Tuple
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+import httpx
+import requests
+import typer
+from rich import print
+from rich.table import Table
+
+from prd.config import Config
+from prd.transport import Http2Adapter
+from prd.webex_api import generate_recording_from_id
+
+
+def make_body() -> bytes:
+    """Make a response of the stream API, padded to a realistic size.
+
+    Returns:
+        bytes: The json of the response.
+    """
+    return json.dumps(
+        {
+            "recordName": "Lesson",
+            "createTime": "2021-10-04 10:15:00",
+            "preventDownload": False,
+            "downloadRecordingInfo": {
+                "downloadInfo": {"mp4URL": "https://example.com/recording.mp4"}
+            },
+            "fallbackPlaySrc": "https://example.com/recording.mp4",
+            "padding": "x" * 4096,
+        }
+    ).encode()
+
+
+class Http1Server:
+    """Local HTTP/1.1 server answering every request after a fixed latency."""
+
+    def __init__(self, latency: float, body: bytes):
+        self.connections: int = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                server.connections += 1
+                super().setup()
+
+            def do_GET(self) -> None:
+                time.sleep(latency)
+                self.send_response(200)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.httpd: ThreadingHTTPServer = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port: int = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+
+
+class Http2Server:
+    """Local HTTP/2 server answering every request after a fixed latency."""
+
+    def __init__(self, latency: float, body: bytes):
+        self.latency: float = latency
+        self.body: bytes = body
+        self.connections: int = 0
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.server: asyncio.AbstractServer = self.loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0)
+        )
+        self.port: int = self.server.sockets[0].getsockname()[1]
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        conn = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False)
+        )
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+        window_updated: asyncio.Event = asyncio.Event()
+        while True:
+            data: bytes = await reader.read(65536)
+            if not data:
+                break
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    asyncio.create_task(
+                        self._respond(conn, writer, event.stream_id, window_updated)
+                    )
+                elif isinstance(event, h2.events.WindowUpdated):
+                    window_updated.set()
+            writer.write(conn.data_to_send())
+        writer.close()
+
+    async def _respond(
+        self,
+        conn: h2.connection.H2Connection,
+        writer: asyncio.StreamWriter,
+        stream_id: int,
+        window_updated: asyncio.Event,
+    ) -> None:
+        await asyncio.sleep(self.latency)
+        body: bytes = self.body
+        try:
+            conn.send_headers(
+                stream_id,
+                [
+                    (":status", "200"),
+                    ("content-type", "application/json"),
+                    ("content-length", str(len(body))),
+                ],
+            )
+            while len(body) > 0:
+                size: int = min(
+                    conn.local_flow_control_window(stream_id),
+                    conn.max_outbound_frame_size,
+                )
+                if size <= 0:
+                    # Wait for the client to consume the data already sent
+                    window_updated.clear()
+                    await window_updated.wait()
+                    continue
+                conn.send_data(stream_id, body[:size], end_stream=len(body) <= size)
+                body = body[size:]
+                writer.write(conn.data_to_send())
+        except h2.exceptions.StreamClosedError:
+            pass
+        writer.write(conn.data_to_send())
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.server.close)
+
+
+def run(session: requests.Session, count: int, workers: int) -> float:
+    """Resolve recordings concurrently.
+
+    Args:
+        session (requests.Session): The session used for the requests.
+        count (int): The number of recordings.
+        workers (int): The number of concurrent requests.
+
+    Returns:
+        float: The elapsed seconds.
+    """
+    start: float = time.perf_counter()
+    with ThreadPool(workers) as pool:
+        for _ in pool.imap_unordered(
+            lambda i: generate_recording_from_id(
+                f"{i:032x}", "TICKET", "Course", session=session
+            ),
+            range(count),
+        ):
+            pass
+    return time.perf_counter() - start
+
+
+def main(
+    requests_count: int = typer.Option(2000, "--requests", help="Recordings resolved"),
+    workers: int = typer.Option(64, help="Concurrent requests, like PARSER_WORKERS"),
+    latency: float = typer.Option(0.05, help="Seconds the servers wait before answering"),
+) -> None:
+    """Compare the HTTP/2 transport with HTTP/1.1 on the stream API calls."""
+    # requests discards the connections beyond the size of its pool
+    logging.getLogger("urllib3.connectionpool").setLevel(logging.ERROR)
+    body: bytes = make_body()
+    results: Dict[str, Tuple[float, int]] = {}
+
+    server1: Http1Server = Http1Server(latency, body)
+    Config.WEBEX_API_URL = f"http://127.0.0.1:{server1.port}/webappng/api/v1"
+    elapsed: float = run(requests.Session(), requests_count, workers)
+    results["HTTP/1.1 (requests)"] = (elapsed, server1.connections)
+    server1.close()
+
+    server2: Http2Server = Http2Server(latency, body)
+    Config.WEBEX_API_URL = f"http://127.0.0.1:{server2.port}/webappng/api/v1"
+    session: requests.Session = requests.Session()
+    adapter: Http2Adapter = Http2Adapter(
+        httpx.AsyncClient(
+            http1=False,
+            http2=True,
+            limits=httpx.Limits(max_connections=Config.HTTP2_MAX_CONNECTIONS),
+        )
+    )
+    session.mount(f"http://127.0.0.1:{server2.port}/", adapter)
+    elapsed = run(session, requests_count, workers)
+    results["HTTP/2 (httpx)"] = (elapsed, server2.connections)
+    adapter.close()
+    server2.close()
+
+    table: Table = Table(
+        title=f"{requests_count} stream API requests, {workers} concurrent, {latency}s latency"
+    )
+    for column in ["Transport", "Seconds", "Requests/s", "Connections"]:
+        table.add_column(column)
+    for name, (elapsed, connections) in results.items():
+        table.add_row(
+            name,
+            f"{elapsed:.2f}",
+            f"{requests_count / elapsed:.0f}",
+            str(connections),
+        )
+    print(table)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,2 +1,4 @@
 from prd.main import app
-app(prog_name="prd")
\ No newline at end of file
+
+if __name__ == "__main__":
+    app(prog_name="prd")
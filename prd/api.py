@@ -0,0 +1,289 @@
+"""Programmatic API of the application.
+
+A Client keeps a requests session and one parser per source, so that thread
+pools and caches are reused by the following calls. Recordings are returned as
+lazy iterators and the progress is reported through callbacks, nothing is
+written to the terminal:
+
+    from prd.api import Client
+
+    client = Client(cookie_ticket="...", cookie_SSL_JSESSIONID="...")
+    recordings = list(client.archives("https://www11.ceda.polimi.it/..."))
+    client.create_output(recordings, "output")
+"""
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import requests
+
+from prd.create_output import create_output
+from prd.filters import RecordingFilter
+from prd.journal import Journal
+from prd.parsers import ArchivesParser, TxtParser, WebeepParser, WebpageParser
+from prd.preflight import DiskSpacePolicy
+from prd.placement import PlacementPolicy
+from prd.reporter import CallbackReporter, Reporter
+from prd.transport import create_session
+from prd.webex_api import Recording, TicketPool
+
+
+class Client:
+    """Entry point to parse sources and create the output from Python code."""
+
+    def __init__(
+        self,
+        cookie_ticket: str,
+        cookie_SSL_JSESSIONID: Optional[str] = None,
+        cookie_MoodleSession: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        journal: Optional[Journal] = None,
+        batch_metadata: bool = False,
+        ticket_pool: Optional[TicketPool] = None,
+        recording_filter: Optional[RecordingFilter] = None,
+    ):
+        """Create the client.
+
+        Args:
+            cookie_ticket (str): The ticket cookie.
+            cookie_SSL_JSESSIONID (Optional[str], optional): The SSL_JSESSIONID
+                cookie, required to parse archives. Defaults to None.
+            cookie_MoodleSession (Optional[str], optional): The MoodleSession cookie,
+                required to parse Webeep pages. Defaults to None.
+            session (Optional[requests.Session], optional): The session used for all
+                the requests. Defaults to None, which creates a new one reaching
+                Config.HTTP2_HOSTS over HTTP/2.
+            on_event (Optional[Callable[[str, Dict[str, Any]], None]], optional):
+                Called with the name and the fields of each event, see
+                CallbackReporter. Defaults to None, which discards them.
+            journal (Optional[Journal], optional): Where the resolved and failed
+                items are journaled, the items already resolved in it are skipped.
+                Defaults to None.
+            batch_metadata (bool, optional): True to get the information about the
+                videos from the pages of the recordings listing. Defaults to False.
+            ticket_pool (Optional[TicketPool], optional): The tickets of several
+                accounts across which the requests to the Webex API are spread.
+                Defaults to None.
+            recording_filter (Optional[RecordingFilter], optional): Keep only some
+                of the recordings, its limit counts the recordings of all the
+                calls. Defaults to None.
+        """
+        self.cookie_ticket = cookie_ticket
+        self.cookie_SSL_JSESSIONID = cookie_SSL_JSESSIONID
+        self.cookie_MoodleSession = cookie_MoodleSession
+        self.session: requests.Session = (
+            session if session is not None else create_session()
+        )
+        self.journal: Optional[Journal] = journal
+        self.batch_metadata = batch_metadata
+        self.ticket_pool: Optional[TicketPool] = ticket_pool
+        self.recording_filter: Optional[RecordingFilter] = recording_filter
+        self.reporter: Reporter = (
+            CallbackReporter(on_event) if on_event is not None else Reporter()
+        )
+        self._archives_parser: Optional[ArchivesParser] = None
+        self._webeep_parser: Optional[WebeepParser] = None
+        self._txt_parser: Optional[TxtParser] = None
+        self._webpage_parser: Optional[WebpageParser] = None
+
+    def archives(self, url: str) -> Iterator[Recording]:
+        """Get the recordings of an url of the recording archives.
+
+        Args:
+            url (str): The url of the recording archives.
+
+        Raises:
+            ValueError: If the SSL_JSESSIONID cookie is missing or the url is not correct.
+
+        Returns:
+            Iterator[Recording]: The recordings, in the order they are resolved.
+        """
+        if self.cookie_SSL_JSESSIONID is None:
+            raise ValueError("The cookie SSL_JSESSIONID is not set.")
+        if self._archives_parser is None:
+            self._archives_parser = ArchivesParser(
+                cookie_ticket=self.cookie_ticket,
+                cookie_SSL_JSESSIONID=self.cookie_SSL_JSESSIONID,
+                session=self.session,
+                reporter=self.reporter,
+                journal=self.journal,
+                batch_metadata=self.batch_metadata,
+                ticket_pool=self.ticket_pool,
+            )
+            self._archives_parser.recording_filter = self.recording_filter
+        return self._archives_parser.iter_parse(url)
+
+    def webeep(self, url: str, depth: int = 0) -> Iterator[Recording]:
+        """Get the recordings of a Webeep page.
+
+        Args:
+            url (str): The Webeep url containing the links to the recordings.
+            depth (int, optional): How many levels of sections, pages, folders and
+                books of the course linked by the page are crawled. Defaults to 0.
+
+        Raises:
+            ValueError: If the MoodleSession cookie is missing or the url is not correct.
+
+        Returns:
+            Iterator[Recording]: The recordings, in the order they are resolved.
+        """
+        if self.cookie_MoodleSession is None:
+            raise ValueError("The cookie MoodleSession is not set.")
+        if self._webeep_parser is None:
+            self._webeep_parser = WebeepParser(
+                cookie_ticket=self.cookie_ticket,
+                cookie_MoodleSession=self.cookie_MoodleSession,
+                session=self.session,
+                reporter=self.reporter,
+                journal=self.journal,
+                batch_metadata=self.batch_metadata,
+                ticket_pool=self.ticket_pool,
+            )
+            self._webeep_parser.recording_filter = self.recording_filter
+        return self._webeep_parser.iter_parse(url, depth)
+
+    def txt(
+        self, file: Path, course: str, academic_year: Optional[str] = None
+    ) -> Iterator[Recording]:
+        """Get the recordings of a txt file with a list of urls or video ids.
+
+        Args:
+            file (Path): The txt file.
+            course (str): The course name.
+            academic_year (Optional[str], optional): The academic year in the format "2021-22". Defaults to None.
+
+        Returns:
+            Iterator[Recording]: The recordings, in the order they are resolved.
+        """
+        if self._txt_parser is None:
+            self._txt_parser = TxtParser(
+                cookie_ticket=self.cookie_ticket,
+                session=self.session,
+                reporter=self.reporter,
+                journal=self.journal,
+                batch_metadata=self.batch_metadata,
+                ticket_pool=self.ticket_pool,
+            )
+            self._txt_parser.recording_filter = self.recording_filter
+        return self._txt_parser.iter_parse(file, course, academic_year)
+
+    def _get_webpage_parser(self) -> WebpageParser:
+        """Get the parser of webpages, creating it on first use.
+
+        Returns:
+            WebpageParser: The parser.
+        """
+        if self._webpage_parser is None:
+            self._webpage_parser = WebpageParser(
+                cookie_ticket=self.cookie_ticket,
+                session=self.session,
+                reporter=self.reporter,
+                journal=self.journal,
+                batch_metadata=self.batch_metadata,
+                ticket_pool=self.ticket_pool,
+            )
+            self._webpage_parser.recording_filter = self.recording_filter
+        return self._webpage_parser
+
+    def webpage_url(
+        self,
+        url: str,
+        course: str,
+        academic_year: Optional[str] = None,
+        depth: int = 0,
+    ) -> Iterator[Recording]:
+        """Get the recordings linked in a public webpage.
+
+        Args:
+            url (str): The url of the webpage.
+            course (str): The course name.
+            academic_year (Optional[str], optional): The academic year in the format "2021-22". Defaults to None.
+            depth (int, optional): How many levels of pages of the same site linked
+                by the page are crawled. Defaults to 0.
+
+        Returns:
+            Iterator[Recording]: The recordings, in the order they are resolved.
+        """
+        return self._get_webpage_parser().iter_parse_url(
+            url, course, academic_year, depth
+        )
+
+    def webpage_file(
+        self, file: Path, course: str, academic_year: Optional[str] = None
+    ) -> Iterator[Recording]:
+        """Get the recordings linked in a saved HTML file.
+
+        Args:
+            file (Path): The path to the HTML file.
+            course (str): The course name.
+            academic_year (Optional[str], optional): The academic year in the format "2021-22". Defaults to None.
+
+        Returns:
+            Iterator[Recording]: The recordings, in the order they are resolved.
+        """
+        return self._get_webpage_parser().iter_parse_file(file, course, academic_year)
+
+    def create_output(
+        self,
+        recordings: Iterable[Recording],
+        output: str,
+        create_xlsx: bool = True,
+        aria2c: bool = True,
+        postprocess: Optional[str] = None,
+        disk_space_policy: DiskSpacePolicy = DiskSpacePolicy.refuse,
+        dedup: bool = False,
+        auto_tune: bool = False,
+        extra_outputs: Optional[List[str]] = None,
+        placement_policy: PlacementPolicy = PlacementPolicy.course,
+        priority: Optional[List[Recording]] = None,
+        clip: Optional[Tuple[float, float]] = None,
+    ) -> None:
+        """Create the xlsx files and download the recordings.
+
+        Args:
+            recordings (Iterable[Recording]): The recordings.
+            output (str): The output path.
+            create_xlsx (bool, optional): True to create xlsx. Defaults to True.
+            aria2c (bool, optional): True to download with aria2c, otherwise only
+                write the file with the download links. Defaults to True.
+            postprocess (Optional[str], optional): Name of the ffmpeg preset applied
+                to each recording as soon as it is downloaded. Defaults to None.
+            disk_space_policy (DiskSpacePolicy, optional): What to do if the
+                recordings do not fit in the free disk space. Defaults to
+                DiskSpacePolicy.refuse.
+            dedup (bool, optional): True to download the recordings shared by
+                several courses only once and link them into each course folder.
+                Defaults to False.
+            auto_tune (bool, optional): True to tune the concurrency of aria2c
+                during the first minutes of the download. Defaults to False.
+            extra_outputs (Optional[List[str]], optional): Other output paths the
+                recordings are spread across, each downloaded by its own aria2c.
+                Defaults to None.
+            placement_policy (PlacementPolicy, optional): How the recordings are
+                spread across the output paths. Defaults to PlacementPolicy.course.
+            priority (Optional[List[Recording]], optional): The recordings
+                downloaded first and in order, so they can be played while they
+                are downloaded, see prd.priority.select_priority. Defaults to None.
+            clip (Optional[Tuple[float, float]], optional): The start and the end
+                in seconds of the time range downloaded from each recording, see
+                prd.clip.parse_clip. Defaults to None.
+
+        Raises:
+            InsufficientDiskSpaceError: If the recordings do not fit in the free
+                disk space and the policy is refuse.
+        """
+        recordings: List[Recording] = list(recordings)
+        create_output(
+            recordings=recordings,
+            output=output,
+            create_xlsx=create_xlsx,
+            aria2c=aria2c,
+            postprocess=postprocess,
+            reporter=self.reporter,
+            disk_space_policy=disk_space_policy,
+            dedup=dedup,
+            auto_tune=auto_tune,
+            extra_outputs=extra_outputs,
+            placement_policy=placement_policy,
+            priority=priority,
+            clip=clip,
+        )
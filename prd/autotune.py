@@ -0,0 +1,251 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import requests
+
+from prd.config import Config
+from prd.reporter import Reporter, ConsoleReporter
+from prd.utils import format_size
+
+
+class Aria2cRPC:
+    """Client of the JSON-RPC interface of a running aria2c."""
+
+    def __init__(
+        self, port: int, secret: str, session: Optional[requests.Session] = None
+    ):
+        """Create the client.
+
+        Args:
+            port (int): The port aria2c listens on.
+            secret (str): The value of --rpc-secret.
+            session (Optional[requests.Session], optional): The session used for the
+                requests. Defaults to None, which creates a new one.
+        """
+        self.url: str = f"http://127.0.0.1:{port}/jsonrpc"
+        self.secret: str = secret
+        self.session: requests.Session = (
+            session if session is not None else requests.Session()
+        )
+
+    def call(self, method: str, *params: Any) -> Any:
+        """Call a method of aria2c.
+
+        Args:
+            method (str): The method, for example "aria2.getGlobalStat".
+
+        Raises:
+            requests.exceptions.RequestException: If aria2c cannot be reached or the
+                call fails.
+
+        Returns:
+            Any: The result of the call.
+        """
+        res: requests.Response = self.session.post(
+            self.url,
+            json={
+                "jsonrpc": "2.0",
+                "id": "prd",
+                "method": method,
+                "params": [f"token:{self.secret}", *params],
+            },
+            timeout=5,
+        )
+        res.raise_for_status()
+        return res.json()["result"]
+
+    def get_global_stat(self) -> Dict[str, str]:
+        """Get the global statistics, such as the download speed and the number of
+        active and waiting downloads.
+
+        Returns:
+            Dict[str, str]: The statistics, see aria2.getGlobalStat.
+        """
+        return self.call("aria2.getGlobalStat")
+
+    def get_download_speed(self) -> int:
+        """Get the overall download speed.
+
+        Returns:
+            int: The speed in bytes per second.
+        """
+        return int(self.get_global_stat()["downloadSpeed"])
+
+    def tell_active(self, keys: List[str]) -> List[Dict[str, Any]]:
+        """Get the downloads in progress.
+
+        Args:
+            keys (List[str]): The keys of each download to get, see aria2.tellStatus.
+
+        Returns:
+            List[Dict[str, Any]]: The downloads.
+        """
+        return self.call("aria2.tellActive", keys)
+
+    def remove(self, gid: str) -> None:
+        """Stop a download, leaving its file and control file as they are.
+
+        Args:
+            gid (str): The id of the download in aria2c.
+        """
+        self.call("aria2.remove", gid)
+
+    def change_global_option(self, options: Dict[str, int]) -> None:
+        """Change global options of aria2c.
+
+        The connections per server apply to the downloads started afterwards.
+
+        Args:
+            options (Dict[str, int]): The options by name.
+        """
+        self.call("aria2.changeGlobalOption", {k: str(v) for k, v in options.items()})
+
+
+class AutoTuner:
+    """Tune the concurrent downloads and the connections per server of aria2c.
+
+    During the first Config.AUTO_TUNE_DURATION seconds of a download the
+    throughput of each setting is measured for Config.AUTO_TUNE_INTERVAL
+    seconds, after a first interval of warm-up. It is a hill climbing: one
+    option at a time is doubled or halved, moving on while the throughput
+    improves and going back to the best setting when it does not. Then the best
+    setting is kept for the rest of the run.
+    """
+
+    OPTIONS: List[str] = ["max-concurrent-downloads", "max-connection-per-server"]
+
+    def __init__(
+        self,
+        rpc: Aria2cRPC,
+        concurrent_downloads: int,
+        connections: int,
+        reporter: Optional[Reporter] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Create the tuner.
+
+        Args:
+            rpc (Aria2cRPC): The client of aria2c.
+            concurrent_downloads (int): The concurrent downloads aria2c started with.
+            connections (int): The connections per server aria2c started with.
+            reporter (Optional[Reporter], optional): Where the progress is reported.
+                Defaults to None, which prints to the terminal.
+            clock (Callable[[], float], optional): The clock. Defaults to
+                time.monotonic.
+        """
+        self.rpc: Aria2cRPC = rpc
+        self.reporter: Reporter = reporter if reporter is not None else ConsoleReporter()
+        self.clock: Callable[[], float] = clock
+        self.limits: Dict[str, int] = {
+            "max-concurrent-downloads": Config.AUTO_TUNE_MAX_CONCURRENT_DOWNLOADS,
+            "max-connection-per-server": Config.AUTO_TUNE_MAX_CONNECTIONS,
+        }
+        self.setting: Dict[str, int] = {
+            "max-concurrent-downloads": concurrent_downloads,
+            "max-connection-per-server": connections,
+        }
+        self.best: Optional[Tuple[float, Dict[str, int]]] = None
+        self.done: bool = False
+        # Each move is an option and a direction, the first ones are tried first
+        self._moves: List[Tuple[str, int]] = [
+            (o, d) for o in self.OPTIONS for d in [1, -1]
+        ]
+        self._move: int = 0
+        self._failed_moves: int = 0
+        self._samples: List[int] = []
+        self._warmed_up: bool = False
+        self._started: Optional[float] = None
+        self._interval_started: Optional[float] = None
+
+    def _next_setting(self, move: Tuple[str, int]) -> Optional[Dict[str, int]]:
+        """Apply a move to the best setting.
+
+        Args:
+            move (Tuple[str, int]): The option and the direction.
+
+        Returns:
+            Optional[Dict[str, int]]: The new setting, None if the option is
+                already at its limit.
+        """
+        option, direction = move
+        setting: Dict[str, int] = dict(self.best[1])
+        value: int = setting[option] * 2 if direction > 0 else setting[option] // 2
+        value = min(self.limits[option], max(1, value))
+        if value == setting[option]:
+            return None
+        setting[option] = value
+        return setting
+
+    def _end_interval(self) -> None:
+        """Record the throughput of the setting measured in the last interval."""
+        throughput: float = sum(self._samples) / max(1, len(self._samples))
+        self._samples = []
+        if self.best is None or throughput > self.best[0]:
+            self.best = (throughput, dict(self.setting))
+            self._failed_moves = 0
+        else:
+            # Try the next move from the best setting
+            self._move = (self._move + 1) % len(self._moves)
+            self._failed_moves += 1
+
+    def _try_next_setting(self) -> None:
+        """Apply the next setting to measure, stopping if none can improve."""
+        while self._failed_moves < len(self._moves):
+            setting: Optional[Dict[str, int]] = self._next_setting(
+                self._moves[self._move]
+            )
+            if setting is not None:
+                self._apply(setting)
+                return
+            self._move = (self._move + 1) % len(self._moves)
+            self._failed_moves += 1
+        self._finish()
+
+    def _apply(self, setting: Dict[str, int]) -> None:
+        """Change the setting of aria2c.
+
+        Args:
+            setting (Dict[str, int]): The new setting.
+        """
+        if setting != self.setting:
+            self.rpc.change_global_option(setting)
+            self.setting = setting
+
+    def _finish(self) -> None:
+        """Go back to the best setting and stop tuning."""
+        self.done = True
+        if self.best is None:
+            return
+        self._apply(self.best[1])
+        self.reporter.message(
+            "aria2c tuned to "
+            f"{self.best[1]['max-concurrent-downloads']} concurrent downloads and "
+            f"{self.best[1]['max-connection-per-server']} connections per server "
+            f"({format_size(round(self.best[0]))}/s)"
+        )
+
+    def tick(self) -> None:
+        """Sample the throughput, called periodically while aria2c downloads."""
+        if self.done:
+            return
+        now: float = self.clock()
+        try:
+            if self._started is None:
+                self._started = now
+                self._interval_started = now
+            self._samples.append(self.rpc.get_download_speed())
+            if now - self._interval_started < Config.AUTO_TUNE_INTERVAL:
+                return
+            self._interval_started = now
+            if not self._warmed_up:
+                # The first interval includes the start of the downloads
+                self._warmed_up = True
+                self._samples = []
+                return
+            self._end_interval()
+            if now - self._started >= Config.AUTO_TUNE_DURATION:
+                self._finish()
+            else:
+                self._try_next_setting()
+        except requests.exceptions.RequestException as e:
+            self.done = True
+            self.reporter.message(f"[yellow]aria2c auto-tune stopped: {e}[/yellow]")
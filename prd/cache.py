@@ -0,0 +1,113 @@
+import os
+import json
+import threading
+from typing import Any, Dict, List
+import typer
+
+from prd.config import Config
+
+CACHE_FOLDER_PATH: str = os.path.join(
+    typer.get_app_dir(Config.APP_NAME), Config.CACHE_FOLDER
+)
+
+
+class PersistentCache:
+    """Thread safe key-value cache persisted as a json file in the application folder."""
+
+    def __init__(self, name: str):
+        """Load the cache.
+
+        Args:
+            name (str): Name of the cache, used as file name.
+        """
+        self.name = name
+        self.filepath: str = os.path.join(CACHE_FOLDER_PATH, name + ".json")
+        self._lock: threading.Lock = threading.Lock()
+        self._dirty: bool = False
+        try:
+            with open(self.filepath) as f:
+                self._data: Dict[str, Any] = json.load(f)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            self._data = {}
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a value from the cache.
+
+        Args:
+            key (str): The key.
+            default (Any, optional): Returned if the key is not cached. Defaults to None.
+
+        Returns:
+            Any: The cached value.
+        """
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        """Set a value in the cache. Call save() to persist it.
+
+        Args:
+            key (str): The key.
+            value (Any): The value, it must be json serializable.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._dirty = True
+
+    def save(self) -> None:
+        """Persist the cache if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            if not os.path.exists(CACHE_FOLDER_PATH):
+                os.makedirs(CACHE_FOLDER_PATH)
+            tmp_filepath: str = self.filepath + ".tmp"
+            with open(tmp_filepath, "w") as f:
+                json.dump(self._data, f)
+            os.replace(tmp_filepath, self.filepath)
+            self._dirty = False
+
+
+_caches: Dict[str, PersistentCache] = {}
+_caches_lock: threading.Lock = threading.Lock()
+
+
+def get_cache(name: str) -> PersistentCache:
+    """Get a persistent cache, shared by everything in the process using the same name.
+
+    Args:
+        name (str): Name of the cache.
+
+    Returns:
+        PersistentCache: The cache.
+    """
+    with _caches_lock:
+        if name not in _caches.keys():
+            _caches[name] = PersistentCache(name)
+        return _caches[name]
+
+
+def clear_caches() -> List[str]:
+    """Delete all the persistent caches.
+
+    Returns:
+        List[str]: The names of the deleted caches.
+    """
+    deleted: List[str] = []
+    if not os.path.exists(CACHE_FOLDER_PATH):
+        return deleted
+    for filename in os.listdir(CACHE_FOLDER_PATH):
+        if filename.endswith(".json"):
+            os.remove(os.path.join(CACHE_FOLDER_PATH, filename))
+            deleted.append(filename[: -len(".json")])
+    with _caches_lock:
+        _caches.clear()
+    return deleted
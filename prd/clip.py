@@ -0,0 +1,234 @@
+import os
+from multiprocessing.pool import ThreadPool
+from typing import BinaryIO, Callable, List, Optional, Tuple
+import requests
+
+from prd.config import Config
+from prd.mp4 import Clip, Mp4Error, RangeReader, build_clip, get_top_level_boxes
+from prd.reporter import Reporter, ConsoleReporter
+from prd.webex_api import Recording
+
+
+def parse_time(value: str) -> float:
+    """Parse a time in the format "HH:MM:SS", "MM:SS" or seconds.
+
+    Args:
+        value (str): The time.
+
+    Raises:
+        ValueError: If the time is not valid.
+
+    Returns:
+        float: The time in seconds.
+    """
+    seconds: float = 0
+    parts: List[str] = value.strip().split(":")
+    if len(parts) > 3:
+        raise ValueError(f'The time "{value}" is not valid.')
+    for part in parts:
+        try:
+            number: float = float(part)
+        except ValueError:
+            raise ValueError(f'The time "{value}" is not valid.')
+        if number < 0:
+            raise ValueError(f'The time "{value}" is not valid.')
+        seconds = seconds * 60 + number
+    return seconds
+
+
+def parse_clip(value: str) -> Tuple[float, float]:
+    """Parse a time range in the format "START-END".
+
+    Args:
+        value (str): The range, for example "1:00:00-1:20:00".
+
+    Raises:
+        ValueError: If the range is not valid.
+
+    Returns:
+        Tuple[float, float]: The start and the end in seconds.
+    """
+    if value.count("-") != 1:
+        raise ValueError('The clip must be in the format "START-END", for example "1:00:00-1:20:00".')
+    start, end = (parse_time(t) for t in value.split("-"))
+    if end <= start:
+        raise ValueError("The end of the clip must be after its start.")
+    return (start, end)
+
+
+def _format_time(seconds: float) -> str:
+    """Format a time for a filename.
+
+    Args:
+        seconds (float): The time in seconds.
+
+    Returns:
+        str: The time in the format "HH-MM-SS".
+    """
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}-{seconds // 60 % 60:02d}-{seconds % 60:02d}"
+
+
+def get_clip_filename(recording: Recording, start: float, end: float) -> str:
+    """Get the path of a clip of a recording relative to the output folder.
+
+    Args:
+        recording (Recording): The recording.
+        start (float): The start of the clip in seconds.
+        end (float): The end of the clip in seconds.
+
+    Returns:
+        str: The relative path of the clip.
+    """
+    return (
+        recording.get_output_filename()[: -len(".mp4")]
+        + f" {_format_time(start)} {_format_time(end)}.mp4"
+    )
+
+
+def _copy_samples(
+    reader: RangeReader, f: BinaryIO, samples: List[Tuple[int, int]]
+) -> None:
+    """Download the samples of a clip and write them one after the other.
+
+    Samples close to each other in the source are downloaded by a single range
+    request, the bytes between them are discarded.
+
+    Args:
+        reader (RangeReader): The reader of the source.
+        f (BinaryIO): The clip file.
+        samples (List[Tuple[int, int]]): The offset and the size of each sample,
+            in increasing order of offset.
+    """
+    i: int = 0
+    while i < len(samples):
+        start: int = samples[i][0]
+        end: int = start + samples[i][1]
+        last: int = i + 1
+        while (
+            last < len(samples)
+            and samples[last][0] - end <= Config.CLIP_RANGE_GAP
+        ):
+            end = max(end, samples[last][0] + samples[last][1])
+            last += 1
+
+        buffer: bytearray = bytearray()
+        buffer_start: int = start
+        for chunk in reader.iter_range(start, end, Config.IN_ORDER_CHUNK_SIZE):
+            buffer += chunk
+            while i < last and samples[i][0] + samples[i][1] <= buffer_start + len(buffer):
+                offset: int = samples[i][0] - buffer_start
+                f.write(buffer[offset : offset + samples[i][1]])
+                i += 1
+            # Only the bytes of the next samples are kept
+            consumed: int = (
+                samples[i][0] - buffer_start if i < last else len(buffer)
+            )
+            consumed = max(0, min(consumed, len(buffer)))
+            del buffer[:consumed]
+            buffer_start += consumed
+        if i < last:
+            raise Mp4Error("The server returned fewer bytes than requested.")
+
+
+def download_clip(
+    url: str,
+    path: str,
+    start: float,
+    end: float,
+    session: Optional[requests.Session] = None,
+) -> None:
+    """Download a time range of an MP4 as a standalone MP4.
+
+    Only the ftyp and moov boxes and the samples of the range are downloaded,
+    with range requests.
+
+    Args:
+        url (str): The url of the recording.
+        path (str): The path of the clip.
+        start (float): The start of the clip in seconds, moved back to the
+            previous keyframe.
+        end (float): The end of the clip in seconds.
+        session (Optional[requests.Session], optional): The session used for the
+            requests. Defaults to None, which creates a new one.
+
+    Raises:
+        Mp4Error: If the recording is not a supported MP4, the server does not
+            support range requests or the clip is outside of the recording.
+        requests.exceptions.RequestException: If a request fails.
+    """
+    reader: RangeReader = RangeReader(url, session)
+    ftyp: bytes = b""
+    moov_data: Optional[bytes] = None
+    for b in get_top_level_boxes(reader):
+        if b.type == "ftyp":
+            ftyp = reader.read(b.offset, b.size)
+        elif b.type == "moov":
+            moov_data = reader.read(b.offset, b.size)
+    clip: Clip = build_clip(ftyp, moov_data, start, end)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path: str = path + ".part"
+    with open(tmp_path, "wb") as f:
+        f.write(clip.header)
+        _copy_samples(reader, f, clip.samples)
+    os.replace(tmp_path, path)
+
+
+def download_clips(
+    recordings: List[Recording],
+    output: str,
+    start: float,
+    end: float,
+    on_complete: Callable[[Recording, str], None],
+    reporter: Optional[Reporter] = None,
+    session: Optional[requests.Session] = None,
+) -> List[Recording]:
+    """Download the same time range of several recordings concurrently.
+
+    Args:
+        recordings (List[Recording]): The recordings.
+        output (str): The output folder.
+        start (float): The start of the clips in seconds.
+        end (float): The end of the clips in seconds.
+        on_complete (Callable[[Recording, str], None]): Called with the recording
+            and the path of the clip once it is downloaded.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
+        session (Optional[requests.Session], optional): The session used for the
+            requests. Defaults to None, which creates a new one.
+
+    Returns:
+        List[Recording]: The recordings whose clip could not be downloaded.
+    """
+    reporter = reporter if reporter is not None else ConsoleReporter()
+    session = session if session is not None else requests.Session()
+
+    def download(recording: Recording) -> Optional[Recording]:
+        path: str = os.path.join(output, get_clip_filename(recording, start, end))
+        # Each source of the recording is tried in turn
+        for url in recording.download_urls:
+            if os.path.exists(path):
+                break
+            try:
+                download_clip(url, path, start, end, session)
+            except (requests.exceptions.RequestException, Mp4Error) as e:
+                reporter.message(
+                    f"[yellow]Clip of {recording.subject} from {url} failed: {e}[/yellow]"
+                )
+        if not os.path.exists(path):
+            return recording
+        on_complete(recording, path)
+        return None
+
+    failed: List[Recording] = []
+    reporter.progress_start("Downloading the clips...", len(recordings))
+    try:
+        with ThreadPool(Config.CLIP_WORKERS) as pool:
+            for result in pool.imap_unordered(download, recordings):
+                if result is not None:
+                    failed.append(result)
+                reporter.progress_advance()
+    finally:
+        reporter.progress_stop()
+    return failed
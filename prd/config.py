@@ -1,9 +1,79 @@
+from typing import Dict, List, Optional
+
+
 class Config:
     """Configuration variables of the application."""
 
     APP_NAME: str = "polimi_recordings_downloader"
     DEFAULT_OUTPUT_FOLDER: str = "output"
     DOWNLOAD_INPUT_FILENAME: str = "dowaload_links.txt"
-    ARIA2C_CONCURRENT_DOWNLOADS: str = str(16)
-    ARIA2C_CONNECTIONS: str = str(16)
+    SETTINGS_FILENAME: str = "settings.json"
+    ARIA2C_CONCURRENT_DOWNLOADS: int = 16
+    ARIA2C_CONNECTIONS: int = 16
+    ARIA2C_TIMEOUT: int = 60
+    ARIA2C_CONNECT_TIMEOUT: int = 60
+    ARIA2C_RPC_PORT: int = 6800
+    ARIA2C_LOWEST_SPEED_LIMIT: str = "0"
+    SOURCE_SPEED_SMOOTHING: float = 0.3
+    SOURCE_SWITCH_AFTER: float = 30.0
+    SOURCE_SWITCH_SPEED: int = 50 * 1024
+    PRIORITY_BULK_SPEED_LIMIT: str = "1M"
+    IN_ORDER_CHUNK_SIZE: int = 1024 * 1024
+    IN_ORDER_MARKER_SUFFIX: str = ".downloading"
+    CLIP_RANGE_GAP: int = 256 * 1024
+    CLIP_WORKERS: Optional[int] = 4
+    AUTO_TUNE_DURATION: float = 300.0
+    AUTO_TUNE_INTERVAL: float = 20.0
+    AUTO_TUNE_MAX_CONCURRENT_DOWNLOADS: int = 64
+    AUTO_TUNE_MAX_CONNECTIONS: int = 16
+    PARSER_WORKERS: Optional[int] = None
+    PREFLIGHT_WORKERS: Optional[int] = None
+    ARIA2C_FILE_ALLOCATION: str = "falloc"
+    DISK_SPACE_MARGIN: int = 1024 ** 3
     COOKIES_STORE_FILENAME: str = "cookies.json"
+    CACHE_FOLDER: str = "cache"
+    STORE_FOLDER: str = ".store"
+    WEBEX_API_URL: str = "https://politecnicomilano.webex.com/webappng/api/v1"
+    HTTP2_HOSTS: List[str] = []
+    HTTP2_MAX_CONNECTIONS: int = 2
+    TICKET_THROTTLE_COOLDOWN: float = 60.0
+    WEBEX_LISTING_PAGE_SIZE: int = 100
+    WEBEX_LISTING_MAX_PAGES: int = 50
+    HTML_CHUNK_SIZE: int = 64 * 1024
+    HTML_EXTRACTION_PROCESSES: Optional[int] = None
+    CRAWL_MAX_PAGES: int = 200
+    WEBEEP_RECORDING_MODULES: List[str] = ["url"]
+    PLAN_SAMPLE_SIZE: int = 3
+    PLAN_BANDWIDTH_SAMPLE_BYTES: int = 4 * 1024 * 1024
+    EVENTS_FILENAME: str = "events.ndjson"
+    JOURNAL_FILENAME: str = "journal.ndjson"
+    OUTPUT_INDEX_FILENAME: str = "output_index.json"
+    PLACEMENT_UNKNOWN_SIZE: int = 1024 ** 3
+    DOWNLOAD_POLL_INTERVAL: float = 2.0
+    POSTPROCESS_PRESETS_FILENAME: str = "postprocess_presets.json"
+    POSTPROCESS_WORKERS: Optional[int] = None
+    POSTPROCESS_PRESETS: Dict[str, Dict[str, object]] = {
+        "compress": {
+            "extension": ".mp4",
+            "args": [
+                "-c:v",
+                "libx264",
+                "-preset",
+                "veryfast",
+                "-crf",
+                "28",
+                "-c:a",
+                "aac",
+                "-b:a",
+                "96k",
+            ],
+        },
+        "audio": {
+            "extension": ".m4a",
+            "args": ["-vn", "-c:a", "aac", "-b:a", "96k"],
+        },
+        "audio-copy": {
+            "extension": ".m4a",
+            "args": ["-vn", "-c:a", "copy"],
+        },
+    }
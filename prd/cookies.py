@@ -1,6 +1,7 @@
 import os
 import typer
 import json
+from typing import Dict, Optional
 
 from prd.config import Config
 
@@ -9,29 +10,45 @@ COOKIE_STORE_FILEPATH: str = os.path.join(
 )
 
 
-def save_cookie(name: str, value: str) -> None:
+def _load_store() -> dict:
+    """Load the cookies store.
+
+    Returns:
+        dict: The cookies by name, and the cookies of the named accounts in
+            "accounts".
+    """
+    try:
+        with open(COOKIE_STORE_FILEPATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        return {}
+
+
+def save_cookie(name: str, value: str, account: Optional[str] = None) -> None:
     """Save a cookie.
 
     Args:
         name (str): Name of the cookie.
         value (str): Value of the cookie.
+        account (Optional[str], optional): Name of the account. Defaults to None,
+            which is the default account.
     """
-    try:
-        with open(COOKIE_STORE_FILEPATH) as f:
-            data = json.load(f)
-    except:
-        data = {}
-    finally:
+    data: dict = _load_store()
+    if account is None:
         data[name] = value
-        with open(COOKIE_STORE_FILEPATH, "w") as f:
-            json.dump(data, f)
+    else:
+        data.setdefault("accounts", {}).setdefault(account, {})[name] = value
+    with open(COOKIE_STORE_FILEPATH, "w") as f:
+        json.dump(data, f)
 
 
-def get_cookie(name: str) -> str:
+def get_cookie(name: str, account: Optional[str] = None) -> str:
     """Get the value of a cookie.
 
     Args:
         name (str): Name of the cookie.
+        account (Optional[str], optional): Name of the account. Defaults to None,
+            which is the default account.
 
     Returns:
         str: Value of the cookie.
@@ -39,18 +56,25 @@ def get_cookie(name: str) -> str:
     Raises:
         ValueError: If the the cookie does not exists.
     """
-    cookie_exists: bool = True
-    try:
-        with open(COOKIE_STORE_FILEPATH, "r") as f:
-            try:
-                data: dict = json.load(f)
-                if name in data.keys():
-                    return data[name]
-                cookie_exists = False
-            except json.decoder.JSONDecodeError:
-                cookie_exists = False
-    except FileNotFoundError:
-        cookie_exists = False
-
-    if not cookie_exists:
+    data: dict = _load_store()
+    if account is not None:
+        data = data.get("accounts", {}).get(account, {})
+    if name not in data.keys():
         raise ValueError("The cookie " + name + " is not set.")
+    return data[name]
+
+
+def get_tickets() -> Dict[str, str]:
+    """Get the ticket cookie of every account.
+
+    Returns:
+        Dict[str, str]: The ticket by account name, the default account is "default".
+    """
+    data: dict = _load_store()
+    tickets: Dict[str, str] = {}
+    if "ticket" in data.keys():
+        tickets["default"] = data["ticket"]
+    for account, cookies in data.get("accounts", {}).items():
+        if "ticket" in cookies.keys():
+            tickets[account] = cookies["ticket"]
+    return tickets
@@ -1,86 +1,700 @@
 import os
+import secrets
 import subprocess
-from typing import List
-from rich import print
-from rich.progress import track
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import requests
 
 from prd.webex_api import Recording
 from prd.config import Config
 from prd.xlsx import generate_xlsx
+from prd.postprocess import PostProcessor
+from prd.preflight import DiskSpacePolicy, preflight
+from prd.placement import PlacementPolicy, place_recordings, write_output_index
+from prd.store import get_store_filename, group_by_video_id, link_into_place
+from prd.events import emitter, recording_fields
+from prd.executor import TaskGraph
+from prd.autotune import Aria2cRPC, AutoTuner
+from prd.metrics import metrics
+from prd.sources import SourceHistory, SourceMonitor
+from prd.priority import download_priority, get_in_order_marker
+from prd.clip import download_clips
+from prd.reporter import Reporter, ConsoleReporter
 
 
-def generate_download_links_file(recordings: List[Recording], output: str) -> None:
+def generate_download_links_file(
+    recordings: List[Recording], output: str, reporter: Optional[Reporter] = None
+) -> None:
     """Generate the file with the download links.
 
     Args:
         recordings (List[Recording]): List of the recordings.
         output (str): The output folder.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
     """
-    if not os.path.exists(Config.DEFAULT_OUTPUT_FOLDER):
-        os.makedirs(Config.DEFAULT_OUTPUT_FOLDER)
+    reporter = reporter if reporter is not None else ConsoleReporter()
+    os.makedirs(output, exist_ok=True)
     with open(os.path.join(output, Config.DOWNLOAD_INPUT_FILENAME), "w") as f:
-        for r in track(recordings, description="Generating download links file..."):
-            f.write(f"{r.download_url}\n")
+        f.write("".join(f"{r.download_url}\n" for r in recordings))
+    reporter.message("[green]Download links file generated")
 
 
-def generate_aria2c_input_file(recordings: List[Recording], output: str) -> None:
+def generate_aria2c_input_file(
+    recordings: List[Recording],
+    output: str,
+    reporter: Optional[Reporter] = None,
+    get_filename: Callable[[Recording], str] = Recording.get_output_filename,
+    get_url: Callable[[Recording], str] = lambda r: r.download_url,
+    has_fallback: Callable[[Recording], bool] = lambda r: False,
+) -> None:
     """Generate the file which will be passed as input to aria2c.
 
     Args:
         recordings (List[Recording]): List of the recordings.
         output (str): The output folder.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
+        get_filename (Callable[[Recording], str], optional): Get the path where a
+            recording is downloaded, relative to the output folder. Defaults to
+            Recording.get_output_filename.
+        get_url (Callable[[Recording], str], optional): Get the url a recording is
+            downloaded from. Defaults to its download_url.
+        has_fallback (Callable[[Recording], bool], optional): Tell whether a
+            recording has another source to fall back to, the downloads slower than
+            Config.ARIA2C_LOWEST_SPEED_LIMIT are dropped only if it does. Defaults
+            to never.
     """
-    if not os.path.exists(Config.DEFAULT_OUTPUT_FOLDER):
-        os.makedirs(Config.DEFAULT_OUTPUT_FOLDER)
+    reporter = reporter if reporter is not None else ConsoleReporter()
+    os.makedirs(output, exist_ok=True)
     with open(os.path.join(output, Config.DOWNLOAD_INPUT_FILENAME), "w", encoding="utf-8") as f:
-        for r in track(recordings, description="Generating aria2c input file..."):
-            f.write(f"{r.download_url}\n")
-            f.write(
-                f"    out={r.course} {r.academic_year}/{r.recording_datetime.strftime('%Y-%m-%d %H-%M')}.mp4\n"
-            )
+        for r in recordings:
+            f.write(f"{get_url(r)}\n    out={get_filename(r)}\n")
+            if has_fallback(r):
+                f.write(f"    lowest-speed-limit={Config.ARIA2C_LOWEST_SPEED_LIMIT}\n")
+    reporter.message("[green]aria2c input file generated")
 
 
-def start_aria2c_download(recordings: List[Recording], output: str) -> None:
-    """Start download with aria2c.
+def is_download_complete(path: str, expected_size: Optional[int] = None) -> bool:
+    """Check if aria2c has finished downloading a file.
+
+    aria2c keeps a ".aria2" control file next to a download until it completes,
+    and so does a download in order with its marker. An empty file, which aria2c
+    may have just created without its control file yet, is not complete.
+
+    Args:
+        path (str): The path of the downloaded file.
+        expected_size (Optional[int], optional): The size of the complete file, if
+            known. Defaults to None.
+
+    Returns:
+        bool: True if the file is completely downloaded.
+    """
+    if (
+        not os.path.exists(path)
+        or os.path.exists(path + ".aria2")
+        or os.path.exists(get_in_order_marker(path))
+    ):
+        return False
+    size: int = os.path.getsize(path)
+    return size > 0 and (expected_size is None or size == expected_size)
+
+
+def _wait_for_downloads(
+    process: subprocess.Popen,
+    recordings: List[Recording],
+    output: str,
+    on_complete: Callable[[Recording, str], None],
+    get_filename: Callable[[Recording], str] = Recording.get_output_filename,
+    on_poll: Optional[Callable[[], None]] = None,
+) -> None:
+    """Wait for aria2c to exit, reporting each download as soon as it completes.
+
+    While aria2c runs a file is reported only once it looks complete at two
+    consecutive polls, since aria2c creates it before its control file.
+
+    Args:
+        process (subprocess.Popen): The aria2c process.
+        recordings (List[Recording]): The recordings being downloaded.
+        output (str): The output folder.
+        on_complete (Callable[[Recording, str], None]): Called with the recording
+            and the path of the file once it is downloaded.
+        get_filename (Callable[[Recording], str], optional): Get the path where a
+            recording is downloaded, relative to the output folder. Defaults to
+            Recording.get_output_filename.
+        on_poll (Optional[Callable[[], None]], optional): Called at each poll while
+            aria2c downloads. Defaults to None.
+    """
+    pending: List[Recording] = list(recordings)
+    # The size of the files which looked complete at the previous poll
+    candidates: Dict[str, int] = {}
+    while len(pending) > 0:
+        running: bool = process.poll() is None
+        still_pending: List[Recording] = []
+        for r in pending:
+            path: str = os.path.join(output, get_filename(r))
+            if not is_download_complete(path):
+                candidates.pop(path, None)
+                still_pending.append(r)
+            elif not running or candidates.get(path) == os.path.getsize(path):
+                on_complete(r, path)
+            else:
+                candidates[path] = os.path.getsize(path)
+                still_pending.append(r)
+        pending = still_pending
+        metrics.download_queue.set(len(pending), state="pending")
+        if not running:
+            break
+        if on_poll is not None:
+            on_poll()
+        time.sleep(Config.DOWNLOAD_POLL_INTERVAL)
+    process.wait()
+
+
+def _update_download_metrics(rpc: Aria2cRPC) -> None:
+    """Update the metrics of the downloads with the global stats of aria2c.
+
+    Args:
+        rpc (Aria2cRPC): The client of aria2c.
+    """
+    try:
+        stat: Dict[str, str] = rpc.get_global_stat()
+    except requests.exceptions.RequestException:
+        return
+    metrics.download_speed.set(int(stat["downloadSpeed"]))
+    metrics.download_queue.set(int(stat["numActive"]), state="active")
+    metrics.download_queue.set(int(stat["numWaiting"]), state="waiting")
+
+
+def _run_aria2c(
+    recordings: List[Recording],
+    output: str,
+    on_complete: Callable[[Recording, str], None],
+    reporter: Reporter,
+    get_filename: Callable[[Recording], str],
+    get_url: Callable[[Recording], str],
+    auto_tune: bool,
+    rpc_port: int,
+    throttle: Optional[threading.Event] = None,
+    has_fallback: Callable[[Recording], bool] = lambda r: False,
+    monitor: Optional[SourceMonitor] = None,
+) -> None:
+    """Download the recordings with a single aria2c process.
 
     Args:
         recordings (List[Recording]): The recordings to download.
         output (str): The output folder.
+        on_complete (Callable[[Recording, str], None]): Called with the recording
+            and the path of the file once it is downloaded.
+        reporter (Reporter): Where the progress is reported.
+        get_filename (Callable[[Recording], str]): Get the path where a recording
+            is downloaded, relative to the output folder.
+        get_url (Callable[[Recording], str]): Get the url a recording is
+            downloaded from.
+        auto_tune (bool): Tune the concurrent downloads and the connections per
+            server of aria2c.
+        rpc_port (int): The port of the RPC interface of aria2c.
+        throttle (Optional[threading.Event], optional): While it is set the
+            download speed is limited to Config.PRIORITY_BULK_SPEED_LIMIT.
+            Defaults to None.
+        has_fallback (Callable[[Recording], bool], optional): Tell whether a
+            recording has another source to fall back to. Defaults to never.
+        monitor (Optional[SourceMonitor], optional): Measures each download and
+            stops the slow ones, except while throttled. Defaults to None.
     """
-    generate_aria2c_input_file(recordings, output)
-    print("[green]aria2c input file generated")
-    print("Starting aria2c...")
-    subprocess.call(
+    throttled: bool = throttle is not None and throttle.is_set()
+    # A slow download is dropped only if it can be retried from another source,
+    # and never while throttled, when every download is slow
+    speed_limited: bool = Config.ARIA2C_LOWEST_SPEED_LIMIT != "0" and not throttled
+    generate_aria2c_input_file(
+        recordings,
+        output,
+        reporter=reporter,
+        get_filename=get_filename,
+        get_url=get_url,
+        has_fallback=lambda r: speed_limited and has_fallback(r),
+    )
+    rpc_options: List[str] = []
+    rpc: Optional[Aria2cRPC] = None
+    # aria2c is tuned, monitored and throttled through its RPC interface
+    if auto_tune or metrics.enabled or throttled or monitor is not None:
+        secret: str = secrets.token_hex(16)
+        rpc_options = [
+            "--enable-rpc",
+            f"--rpc-listen-port={rpc_port}",
+            f"--rpc-secret={secret}",
+        ]
+        rpc = Aria2cRPC(rpc_port, secret)
+    tuner: Optional[AutoTuner] = None
+    if auto_tune:
+        tuner = AutoTuner(
+            rpc,
+            Config.ARIA2C_CONCURRENT_DOWNLOADS,
+            Config.ARIA2C_CONNECTIONS,
+            reporter=reporter,
+        )
+
+    def on_poll() -> None:
+        nonlocal throttled
+        if metrics.enabled:
+            _update_download_metrics(rpc)
+        if tuner is not None:
+            tuner.tick()
+        if monitor is not None:
+            # Every download is slow while throttled
+            monitor.tick(rpc, switch=not throttled)
+        if throttled and not throttle.is_set():
+            try:
+                rpc.change_global_option({"max-overall-download-limit": 0})
+                throttled = False
+            except requests.exceptions.RequestException:
+                pass
+    reporter.message("Starting aria2c...")
+    process: subprocess.Popen = subprocess.Popen(
         [
             "aria2c",
             f"--input-file={os.path.join(output, Config.DOWNLOAD_INPUT_FILENAME)}",
             f"--dir={output}",
             f"--max-concurrent-downloads={Config.ARIA2C_CONCURRENT_DOWNLOADS}",
             f"--max-connection-per-server={Config.ARIA2C_CONNECTIONS}",
+            f"--file-allocation={Config.ARIA2C_FILE_ALLOCATION}",
+            f"--timeout={Config.ARIA2C_TIMEOUT}",
+            f"--connect-timeout={Config.ARIA2C_CONNECT_TIMEOUT}",
             "--auto-file-renaming=false",
-        ]
+            *rpc_options,
+            *(
+                [f"--max-overall-download-limit={Config.PRIORITY_BULK_SPEED_LIMIT}"]
+                if throttled
+                else []
+            ),
+        ],
+        stdout=None if reporter.show_subprocess_output else subprocess.DEVNULL,
+        stderr=None if reporter.show_subprocess_output else subprocess.DEVNULL,
+    )
+    _wait_for_downloads(
+        process,
+        recordings,
+        output,
+        on_complete,
+        get_filename,
+        on_poll if rpc is not None else None,
+    )
+
+
+def _remove_partial_download(path: str) -> None:
+    """Delete an incomplete download and its aria2c control file or marker.
+
+    Another source may serve a different file, which cannot resume it.
+
+    Args:
+        path (str): The path of the downloaded file.
+    """
+    for p in [path, path + ".aria2", get_in_order_marker(path)]:
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def start_aria2c_download(
+    recordings: List[Recording],
+    output: str,
+    on_complete: Optional[Callable[[Recording, str], None]] = None,
+    reporter: Optional[Reporter] = None,
+    get_filename: Callable[[Recording], str] = Recording.get_output_filename,
+    auto_tune: bool = False,
+    history: Optional[SourceHistory] = None,
+    rpc_port: Optional[int] = None,
+    throttle: Optional[threading.Event] = None,
+) -> None:
+    """Start download with aria2c.
+
+    Each recording is downloaded from the source of its host which was the
+    fastest in the previous runs. The ones which fail, and the ones which have
+    another source and are slower than Config.SOURCE_SWITCH_SPEED after
+    Config.SOURCE_SWITCH_AFTER seconds, are downloaded again from the next source
+    of the recording. The throughput of each download is measured from when it
+    starts, and recorded in the history of its host.
+
+    Args:
+        recordings (List[Recording]): The recordings to download.
+        output (str): The output folder.
+        on_complete (Optional[Callable[[Recording, str], None]], optional): Called
+            with the recording and the path of the file once it is downloaded,
+            while the other downloads continue. Defaults to None.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
+        get_filename (Callable[[Recording], str], optional): Get the path where a
+            recording is downloaded, relative to the output folder. Defaults to
+            Recording.get_output_filename.
+        auto_tune (bool, optional): Tune the concurrent downloads and the
+            connections per server of aria2c during the first minutes of the
+            download. Defaults to False.
+        history (Optional[SourceHistory], optional): The throughput of each host
+            in the previous runs, updated with the downloads. Defaults to None,
+            which uses the persisted one.
+        rpc_port (Optional[int], optional): The port of the RPC interface of
+            aria2c. Defaults to None, which uses Config.ARIA2C_RPC_PORT.
+        throttle (Optional[threading.Event], optional): While it is set the
+            download speed is limited to Config.PRIORITY_BULK_SPEED_LIMIT, to
+            leave the bandwidth to the priority downloads. Defaults to None.
+    """
+    reporter = reporter if reporter is not None else ConsoleReporter()
+    history = history if history is not None else SourceHistory()
+    rpc_port = rpc_port if rpc_port is not None else Config.ARIA2C_RPC_PORT
+    # A download in order cannot be resumed by aria2c
+    for r in recordings:
+        path: str = os.path.join(output, get_filename(r))
+        if os.path.exists(get_in_order_marker(path)):
+            _remove_partial_download(path)
+    sources: Dict[str, List[str]] = {
+        r.video_id: history.order(r.download_urls) for r in recordings
+    }
+    attempt: int = 0
+    pending: List[Recording] = recordings
+    while len(pending) > 0:
+        completed: Set[str] = set()
+        monitor: SourceMonitor = SourceMonitor(
+            {os.path.join(output, get_filename(r)): r.video_id for r in pending},
+            lambda video_id: attempt + 1 < len(sources[video_id]),
+        )
+
+        def get_url(recording: Recording) -> str:
+            return sources[recording.video_id][attempt]
+
+        def on_download_complete(recording: Recording, path: str) -> None:
+            completed.add(recording.video_id)
+            speed: Optional[float] = monitor.get_speed(
+                recording.video_id, os.path.getsize(path)
+            )
+            if speed is not None:
+                history.record(get_url(recording), speed)
+            if on_complete is not None:
+                on_complete(recording, path)
+
+        _run_aria2c(
+            pending,
+            output,
+            on_download_complete,
+            reporter,
+            get_filename,
+            get_url,
+            auto_tune and attempt == 0,
+            rpc_port,
+            throttle,
+            lambda r: attempt + 1 < len(sources[r.video_id]),
+            monitor,
+        )
+        failed: List[Recording] = [r for r in pending if r.video_id not in completed]
+        for r in failed:
+            # A download which never started counts as a throughput of 0
+            history.record(get_url(r), monitor.speeds.get(r.video_id, 0))
+        history.save()
+
+        attempt += 1
+        pending = [r for r in failed if attempt < len(sources[r.video_id])]
+        if len(pending) > 0:
+            reporter.message(
+                f"[yellow]Downloading {len(pending)} failed or slow recordings "
+                "from another source[/yellow]"
+            )
+            for r in pending:
+                _remove_partial_download(os.path.join(output, get_filename(r)))
+
+
+def _add_download_tasks(
+    tasks: TaskGraph,
+    name: str,
+    recordings: List[Recording],
+    output: str,
+    on_recording_complete: Callable[[Recording, str], None],
+    reporter: Reporter,
+    disk_space_policy: DiskSpacePolicy,
+    dedup: bool,
+    auto_tune: bool,
+    rpc_port: int,
+    priority: Optional[List[str]] = None,
+    post_processor: Optional[PostProcessor] = None,
+) -> List[str]:
+    """Add the tasks checking the disk space and downloading the recordings of an
+    output folder with its own aria2c.
+
+    The priority recordings are downloaded one at a time and in order, while
+    aria2c downloads the others with a limited speed. The ones which cannot be
+    downloaded in order are downloaded by aria2c afterwards.
+
+    Args:
+        tasks (TaskGraph): The tasks of the output.
+        name (str): The name of the download task, the preflight task is named
+            after it.
+        recordings (List[Recording]): The recordings of the output folder.
+        output (str): The output folder.
+        on_recording_complete (Callable[[Recording, str], None]): Called with each
+            recording and the path of its file once it is downloaded.
+        reporter (Reporter): Where the progress is reported.
+        disk_space_policy (DiskSpacePolicy): What to do if the recordings do not
+            fit in the free disk space.
+        dedup (bool): True to download the recordings shared by several courses
+            only once in the content store of the output folder.
+        auto_tune (bool): True to tune aria2c.
+        rpc_port (int): The port of the RPC interface of aria2c.
+        priority (Optional[List[str]], optional): The video ids of the recordings
+            downloaded first, in order. Defaults to None.
+        post_processor (Optional[PostProcessor], optional): Post-processes each
+            downloaded file, once even if it is linked into several courses.
+            Defaults to None.
+
+    Returns:
+        List[str]: The names of the tasks downloading the recordings.
+    """
+    get_filename: Callable[[Recording], str] = Recording.get_output_filename
+    groups: Dict[str, List[Recording]] = {}
+    to_download: List[Recording] = recordings
+    if dedup:
+        get_filename = get_store_filename
+        groups = group_by_video_id(recordings)
+        to_download = [g[0] for g in groups.values()]
+        # Recordings downloaded by a previous run without the store seed it
+        for group in groups.values():
+            store_path: str = os.path.join(output, get_store_filename(group[0]))
+            for r in group:
+                target_path: str = os.path.join(output, r.get_output_filename())
+                if not os.path.exists(store_path) and is_download_complete(
+                    target_path
+                ):
+                    link_into_place(target_path, store_path)
+        reporter.message(
+            f"{len(recordings) - len(to_download)} recordings are shared with "
+            "another course and will be downloaded only once"
+        )
+
+    def on_complete(recording: Recording, path: str) -> None:
+        if not dedup:
+            on_recording_complete(recording, path)
+            if post_processor is not None:
+                post_processor.submit(path)
+            return
+        target_paths: List[str] = []
+        for r in groups[recording.video_id]:
+            target_path: str = os.path.join(output, r.get_output_filename())
+            link_into_place(path, target_path)
+            on_recording_complete(r, target_path)
+            target_paths.append(target_path)
+        if post_processor is not None:
+            post_processor.submit(path, target_paths)
+
+    tasks.add(
+        f"{name} preflight",
+        lambda: preflight(
+            to_download,
+            output,
+            policy=disk_space_policy,
+            reporter=reporter,
+            get_filename=get_filename,
+        ),
+    )
+    order: Dict[str, int] = {
+        video_id: i for i, video_id in enumerate(priority if priority is not None else [])
+    }
+    throttle: threading.Event = threading.Event()
+    if any(r.video_id in order for r in to_download):
+        throttle.set()
+    tasks.add(
+        name,
+        lambda to_download: start_aria2c_download(
+            [r for r in to_download if r.video_id not in order],
+            output,
+            on_complete=on_complete,
+            reporter=reporter,
+            get_filename=get_filename,
+            auto_tune=auto_tune,
+            rpc_port=rpc_port,
+            throttle=throttle,
+        ),
+        [f"{name} preflight"],
+    )
+    if not throttle.is_set():
+        return [name]
+
+    def download_first(to_download: List[Recording]) -> List[Recording]:
+        try:
+            return download_priority(
+                sorted(
+                    [r for r in to_download if r.video_id in order],
+                    key=lambda r: order[r.video_id],
+                ),
+                output,
+                on_complete,
+                reporter=reporter,
+                get_filename=get_filename,
+            )
+        finally:
+            throttle.clear()
+
+    tasks.add(f"{name} priority", download_first, [f"{name} preflight"])
+    # aria2c is started again once the other downloads are done
+    tasks.add(
+        f"{name} priority retry",
+        lambda _, failed: start_aria2c_download(
+            failed,
+            output,
+            on_complete=on_complete,
+            reporter=reporter,
+            get_filename=get_filename,
+            rpc_port=rpc_port,
+        )
+        if len(failed) > 0
+        else None,
+        [name, f"{name} priority"],
     )
+    return [name, f"{name} priority retry"]
 
 
 def create_output(
-    recordings: List[Recording], output: str, create_xlsx: bool, aria2c: bool
+    recordings: List[Recording],
+    output: str,
+    create_xlsx: bool,
+    aria2c: bool,
+    postprocess: Optional[str] = None,
+    reporter: Optional[Reporter] = None,
+    disk_space_policy: DiskSpacePolicy = DiskSpacePolicy.refuse,
+    dedup: bool = False,
+    auto_tune: bool = False,
+    extra_outputs: Optional[List[str]] = None,
+    placement_policy: PlacementPolicy = PlacementPolicy.course,
+    priority: Optional[List[Recording]] = None,
+    clip: Optional[Tuple[float, float]] = None,
 ) -> None:
     """Create the output.
 
+    With extra output folders the recordings are spread across all of them by the
+    placement policy, each folder is downloaded by its own aria2c and the folders
+    of each course are recorded in Config.OUTPUT_INDEX_FILENAME in the main one.
+
     Args:
         recordings (List[Recording]): The recordings.
         output (str): The output path.
         create_xlsx (bool): True to create xlsx. Defaults to True.
         aria2c (bool): True to download with aria2c. Defaults to True.
+        postprocess (Optional[str], optional): Name of the ffmpeg preset applied to
+            each recording as soon as it is downloaded. Defaults to None.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
+        disk_space_policy (DiskSpacePolicy, optional): What to do if the recordings
+            do not fit in the free disk space. Defaults to DiskSpacePolicy.refuse.
+        dedup (bool, optional): True to download the recordings shared by several
+            courses only once in the content store, and link them into each course
+            folder. Defaults to False.
+        auto_tune (bool, optional): True to tune the concurrent downloads and the
+            connections per server of aria2c during the first minutes of the
+            download. Defaults to False.
+        extra_outputs (Optional[List[str]], optional): Other output paths the
+            recordings are downloaded to, the xlsx files and the download links
+            file stay in the main one. Defaults to None.
+        placement_policy (PlacementPolicy, optional): How the recordings are
+            spread across the output paths. Defaults to PlacementPolicy.course.
+        priority (Optional[List[Recording]], optional): The recordings downloaded
+            first and in order, so they can be played while they are downloaded,
+            see prd.priority. Defaults to None.
+        clip (Optional[Tuple[float, float]], optional): The start and the end in
+            seconds of the time range downloaded from each recording, instead of
+            the whole recording, see prd.clip. Defaults to None.
+
+    Raises:
+        InsufficientDiskSpaceError: If the recordings do not fit in the free disk
+            space and the policy is refuse.
     """
-    print(f"[green]Found {len(recordings)} recordings.[/green]")
+    reporter = reporter if reporter is not None else ConsoleReporter()
+    reporter.message(f"[green]Found {len(recordings)} recordings.[/green]")
     if len(recordings) > 0:
-        # Generate xlsx
+        # The xlsx files are written while the recordings are downloaded
+        tasks: TaskGraph = TaskGraph()
         if create_xlsx:
-            generate_xlsx(recordings, output)
+            tasks.add("xlsx", lambda: generate_xlsx(recordings, output, reporter=reporter))
+
+        if not aria2c:
+            tasks.add(
+                "links",
+                lambda: generate_download_links_file(recordings, output, reporter=reporter),
+            )
+            tasks.run()
+            return
 
-        # aria2c download
-        if aria2c:
-            start_aria2c_download(recordings, output)
-        else:
-            generate_download_links_file(recordings, output)
+        post_processor: Optional[PostProcessor] = None
+        if postprocess is not None:
+            post_processor = PostProcessor(postprocess, reporter=reporter)
+            reporter.message(
+                f"Post-processing with preset {postprocess} "
+                f"using {post_processor.workers} ffmpeg processes"
+            )
+
+        def run_tasks() -> None:
+            try:
+                tasks.run()
+            finally:
+                # The postprocess task is skipped if the downloads fail
+                if post_processor is not None:
+                    post_processor.close()
+
+        def on_recording_complete(recording: Recording, path: str) -> None:
+            emitter.emit(
+                "download_completed",
+                path=path,
+                size=os.path.getsize(path),
+                **recording_fields(recording),
+            )
+            reporter.download_completed(recording, path)
+            metrics.downloads_completed.inc()
+            metrics.downloaded_bytes.inc(os.path.getsize(path))
+
+        if clip is not None:
+            def on_clip_complete(recording: Recording, path: str) -> None:
+                on_recording_complete(recording, path)
+                if post_processor is not None:
+                    post_processor.submit(path)
+
+            # The clips are small, they are all downloaded in the main output path
+            def download_all_clips() -> None:
+                failed: List[Recording] = download_clips(
+                    recordings, output, clip[0], clip[1], on_clip_complete, reporter
+                )
+                if len(failed) > 0:
+                    reporter.message(
+                        f"[red]The clips of {len(failed)} recordings could not be downloaded.[/red]"
+                    )
+
+            tasks.add("clips", download_all_clips)
+            if post_processor is not None:
+                tasks.add("postprocess", lambda *_: post_processor.wait(), ["clips"])
+            run_tasks()
+            return
+
+        roots: List[str] = [output] + (extra_outputs if extra_outputs is not None else [])
+        placement: Dict[str, List[Recording]] = place_recordings(
+            recordings, roots, placement_policy, reporter=reporter
+        )
+        if len(roots) > 1:
+            write_output_index(output, placement)
+        downloads: List[str] = []
+        for i, (root, root_recordings) in enumerate(placement.items()):
+            if len(root_recordings) == 0:
+                continue
+            name: str = "download" if len(roots) == 1 else f"download {root}"
+            downloads += _add_download_tasks(
+                tasks,
+                name,
+                root_recordings,
+                root,
+                on_recording_complete,
+                reporter,
+                disk_space_policy,
+                dedup,
+                auto_tune,
+                Config.ARIA2C_RPC_PORT + i,
+                [r.video_id for r in priority] if priority is not None else None,
+                post_processor,
+            )
+        if post_processor is not None:
+            tasks.add(
+                "postprocess", lambda *_: post_processor.wait(), downloads
+            )
+        run_tasks()
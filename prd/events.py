@@ -0,0 +1,84 @@
+import os
+import json
+import threading
+from datetime import datetime
+from typing import IO, Optional
+
+from prd.config import Config
+from prd.webex_api import Recording
+
+
+class EventEmitter:
+    """Write machine readable events as newline delimited json."""
+
+    def __init__(self):
+        """Create a disabled emitter."""
+        self._file: Optional[IO] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def open(self, path: str) -> None:
+        """Start appending events to a file.
+
+        Args:
+            path (str): The path of the file.
+        """
+        folder: str = os.path.dirname(path)
+        if folder != "" and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.close()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        """Stop writing events."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def emit(self, event: str, **fields) -> None:
+        """Write an event, if the emitter is enabled.
+
+        Args:
+            event (str): The event type.
+            **fields: The fields of the event, they must be json serializable.
+        """
+        if self._file is None:
+            return
+        line: str = json.dumps(
+            {"event": event, "time": datetime.now().isoformat(), **fields}
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+
+emitter: EventEmitter = EventEmitter()
+
+
+def open_events_file(output: str) -> str:
+    """Enable the events, writing them in the output folder.
+
+    Args:
+        output (str): The output folder.
+
+    Returns:
+        str: The path of the events file.
+    """
+    path: str = os.path.join(output, Config.EVENTS_FILENAME)
+    emitter.open(path)
+    return path
+
+
+def recording_fields(recording: Recording) -> dict:
+    """Get the fields describing a recording in an event.
+
+    Args:
+        recording (Recording): The recording.
+
+    Returns:
+        dict: The fields.
+    """
+    return recording.to_dict()
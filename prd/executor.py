@@ -0,0 +1,65 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class TaskGraph:
+    """Run tasks in threads, each one as soon as its dependencies complete.
+
+    Tasks must be added after their dependencies, so the graph cannot have
+    cycles. A task is called with the results of its dependencies, in order.
+    A task whose dependency failed is not run and fails with the same exception.
+    """
+
+    def __init__(self):
+        """Create an empty graph."""
+        self._tasks: Dict[str, Tuple[Callable[..., Any], List[str]]] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        dependencies: Optional[List[str]] = None,
+    ) -> None:
+        """Add a task.
+
+        Args:
+            name (str): The name of the task.
+            func (Callable[..., Any]): The function run by the task, called with
+                the results of its dependencies.
+            dependencies (Optional[List[str]], optional): The names of the tasks
+                which must complete first. Defaults to None.
+
+        Raises:
+            ValueError: If the name is already used or a dependency does not exist.
+        """
+        dependencies = dependencies if dependencies is not None else []
+        if name in self._tasks.keys():
+            raise ValueError(f"The task {name} already exists.")
+        for d in dependencies:
+            if d not in self._tasks.keys():
+                raise ValueError(f"The task {d} must be added before {name}.")
+        self._tasks[name] = (func, dependencies)
+
+    @staticmethod
+    def _run_after(func: Callable[..., Any], dependencies: List[Future]) -> Any:
+        return func(*[f.result() for f in dependencies])
+
+    def run(self) -> Dict[str, Any]:
+        """Run all the tasks and wait for them.
+
+        Raises:
+            Exception: The exception of the first task, in the order they were
+                added, which failed.
+
+        Returns:
+            Dict[str, Any]: The result of each task.
+        """
+        futures: Dict[str, Future] = {}
+        # A thread per task, so the ones waiting for their dependencies never
+        # starve the others
+        with ThreadPoolExecutor(max_workers=max(1, len(self._tasks))) as executor:
+            for name, (func, dependencies) in self._tasks.items():
+                futures[name] = executor.submit(
+                    self._run_after, func, [futures[d] for d in dependencies]
+                )
+        return {name: f.result() for name, f in futures.items()}
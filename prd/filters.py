@@ -0,0 +1,133 @@
+import re
+from datetime import date, datetime
+from typing import Optional
+
+from prd.webex_api import Recording
+
+
+class RecordingFilter:
+    """Select the recordings to download by date, academic year and subject.
+
+    The parsers evaluate the filter on the information of the listings, before
+    resolving an item, whenever it is available: the items filtered out cost no
+    requests. The recordings resolved without that information are filtered
+    once resolved.
+    """
+
+    def __init__(
+        self,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        academic_year: Optional[str] = None,
+        subject_regex: Optional[str] = None,
+        limit: Optional[int] = None,
+    ):
+        """Create the filter.
+
+        Args:
+            since (Optional[date], optional): Keep the recordings of this day or
+                later. Defaults to None.
+            until (Optional[date], optional): Keep the recordings of this day or
+                earlier. Defaults to None.
+            academic_year (Optional[str], optional): Keep the recordings of this
+                academic year, in the format "2021-22". Defaults to None.
+            subject_regex (Optional[str], optional): Keep the recordings whose
+                subject matches this regular expression, ignoring the case.
+                Defaults to None.
+            limit (Optional[int], optional): Keep at most this many recordings.
+                Defaults to None.
+
+        Raises:
+            ValueError: If the regular expression is not valid.
+        """
+        self.since = since
+        self.until = until
+        self.academic_year = academic_year
+        try:
+            self.subject_regex: Optional[re.Pattern] = (
+                re.compile(subject_regex, re.IGNORECASE)
+                if subject_regex is not None
+                else None
+            )
+        except re.error as e:
+            raise ValueError(f"The subject regex is not valid: {e}")
+        self.limit = limit
+        # Recordings kept so far, counted against the limit
+        self.kept: int = 0
+
+    def is_active(self) -> bool:
+        """Check if the filter keeps only some recordings.
+
+        Returns:
+            bool: False if every recording is kept.
+        """
+        return any(
+            v is not None
+            for v in [
+                self.since,
+                self.until,
+                self.academic_year,
+                self.subject_regex,
+                self.limit,
+            ]
+        )
+
+    def matches(
+        self,
+        recording_datetime: Optional[datetime] = None,
+        academic_year: Optional[str] = None,
+        subject: Optional[str] = None,
+    ) -> bool:
+        """Check the information known about a recording, the missing one matches.
+
+        Args:
+            recording_datetime (Optional[datetime], optional): The datetime of the
+                recording. Defaults to None.
+            academic_year (Optional[str], optional): The academic year. Defaults to
+                None.
+            subject (Optional[str], optional): The subject. Defaults to None.
+
+        Returns:
+            bool: False if the recording is filtered out.
+        """
+        if recording_datetime is not None:
+            if self.since is not None and recording_datetime.date() < self.since:
+                return False
+            if self.until is not None and recording_datetime.date() > self.until:
+                return False
+        if (
+            academic_year is not None
+            and self.academic_year is not None
+            and academic_year.strip() != self.academic_year
+        ):
+            return False
+        if (
+            subject is not None
+            and self.subject_regex is not None
+            and self.subject_regex.search(subject) is None
+        ):
+            return False
+        return True
+
+    def matches_recording(self, recording: Recording) -> bool:
+        """Check a resolved recording.
+
+        Args:
+            recording (Recording): The recording.
+
+        Returns:
+            bool: False if the recording is filtered out.
+        """
+        return self.matches(
+            recording.recording_datetime, recording.academic_year, recording.subject
+        )
+
+    def get_remaining(self) -> Optional[int]:
+        """Get how many recordings can still be kept.
+
+        Returns:
+            Optional[int]: The number of recordings, None if there is no limit.
+        """
+        if self.limit is None:
+            return None
+        return max(0, self.limit - self.kept)
@@ -0,0 +1,124 @@
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Dict, IO, List, Optional
+
+from prd.webex_api import Recording
+
+
+class Journal:
+    """Append-only journal of the resolved and failed items of a run.
+
+    Each line is a json object with the key of the item, its status ("resolved"
+    or "failed") and either the resolved recording (null if the item is not a
+    recording) or the error. Later lines override earlier ones.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        """Open the journal.
+
+        Args:
+            path (str): The path of the journal file.
+            resume (bool, optional): True to keep the items journaled by a previous
+                run, otherwise the journal is started from scratch. Defaults to False.
+        """
+        self.path = path
+        self._entries: Dict[str, dict] = {}
+        self._lock: threading.Lock = threading.Lock()
+        if resume:
+            self._load()
+
+        folder: str = os.path.dirname(path)
+        if folder != "" and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._file: IO = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self) -> None:
+        """Load the entries of a previous run, ignoring a truncated last line."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry: dict = json.loads(line)
+                    except json.decoder.JSONDecodeError:
+                        continue
+                    self._entries[entry["key"]] = entry
+        except FileNotFoundError:
+            pass
+
+    def _append(self, entry: dict) -> None:
+        """Append an entry to the journal.
+
+        Args:
+            entry (dict): The entry.
+        """
+        entry["time"] = datetime.now().isoformat()
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def record_resolved(self, key: str, recording: Optional[Recording]) -> None:
+        """Journal a resolved item.
+
+        Args:
+            key (str): The key of the item.
+            recording (Optional[Recording]): The recording, None if the item is not
+                a recording.
+        """
+        self._append(
+            {
+                "key": key,
+                "status": "resolved",
+                "recording": recording.to_dict() if recording is not None else None,
+            }
+        )
+
+    def record_failed(self, key: str, error: Exception) -> None:
+        """Journal a failed item.
+
+        Args:
+            key (str): The key of the item.
+            error (Exception): The error.
+        """
+        self._append({"key": key, "status": "failed", "error": str(error)})
+
+    def is_resolved(self, key: str) -> bool:
+        """Check if an item has been resolved.
+
+        Args:
+            key (str): The key of the item.
+
+        Returns:
+            bool: True if the item has been resolved.
+        """
+        with self._lock:
+            entry: Optional[dict] = self._entries.get(key)
+        return entry is not None and entry["status"] == "resolved"
+
+    def get_resolved(self, key: str) -> Optional[Recording]:
+        """Get the recording of a resolved item.
+
+        Args:
+            key (str): The key of the item.
+
+        Returns:
+            Optional[Recording]: The recording, None if the item is not a recording.
+        """
+        with self._lock:
+            data: Optional[dict] = self._entries[key]["recording"]
+        return Recording.from_dict(data) if data is not None else None
+
+    def get_failed(self) -> List[str]:
+        """Get the keys of the items whose last attempt failed.
+
+        Returns:
+            List[str]: The keys.
+        """
+        with self._lock:
+            return [k for k, e in self._entries.items() if e["status"] == "failed"]
+
+    def close(self) -> None:
+        """Close the journal file."""
+        self._file.close()
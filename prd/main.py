@@ -1,28 +1,213 @@
+import functools
+import inspect
 import typer
 import pathlib
-from typing import List, Optional
+from enum import Enum
+from typing import Callable, List, NamedTuple, Optional
 from rich import print
 import os
+import requests
+from datetime import datetime
 
-from prd.cookies import save_cookie, get_cookie
-from prd.validation import validate_academic_year, validate_cookie_name
-from prd.webex_api import Recording
+from prd.cookies import save_cookie, get_cookie, get_tickets
+from prd.validation import (
+    validate_academic_year,
+    validate_cookie_name,
+    validate_postprocess_preset,
+    validate_regex,
+    validate_clip,
+)
+from prd.webex_api import Recording, TicketPool
 from prd.config import Config
 from prd.parsers import (
+    Parser,
     ArchivesParser,
     TxtParser,
     WebeepParser,
     WebpageParser,
 )
 from prd.create_output import create_output
+from prd.cache import clear_caches
+from prd.watch import Watcher
+from prd.events import open_events_file
+from prd.journal import Journal
+from prd.preflight import DiskSpacePolicy, InsufficientDiskSpaceError
+from prd.placement import PlacementPolicy
+from prd.priority import select_priority
+from prd.clip import parse_clip
+from prd.plan import Planner, print_plan
+from prd.filters import RecordingFilter
+from prd.metrics import metrics
+from prd.settings import load_settings
+from prd.transport import HTTP2_AVAILABLE
 
 
 app: typer.Typer = typer.Typer(add_completion=False)
 
+# The settings are loaded before the commands are declared, so they also apply
+# to the defaults and the help of their options
+settings_error: Optional[str] = None
+try:
+    load_settings()
+except ValueError as e:
+    settings_error = str(e)
 
-@app.command()
-def archives(
-    url: str = typer.Argument(..., help="The URL to the recordings archive"),
+
+@app.callback()
+def load_config() -> None:
+    """Download Polimi lessons recordings."""
+    if settings_error is not None:
+        print("[red]" + settings_error + "[/red]")
+        raise typer.Exit(1)
+    if len(Config.HTTP2_HOSTS) > 0 and not HTTP2_AVAILABLE:
+        print(
+            "[red]HTTP2_HOSTS is set but httpx is not installed, "
+            'install it with "pip install httpx[http2]".[/red]'
+        )
+        raise typer.Exit(1)
+
+
+class EventsFormat(str, Enum):
+    none = "none"
+    ndjson = "ndjson"
+
+
+def setup_events(events: EventsFormat, output: str) -> None:
+    """Enable the machine readable events if requested.
+
+    Args:
+        events (EventsFormat): The events format.
+        output (str): The output path.
+    """
+    if events == EventsFormat.ndjson:
+        path: str = open_events_file(output)
+        print(f"Writing events to {path}")
+
+
+def open_journal(output: str, resume: bool) -> Journal:
+    """Open the journal of the run in the output folder.
+
+    Args:
+        output (str): The output path.
+        resume (bool): True to skip the items resolved by a previous run.
+
+    Returns:
+        Journal: The journal.
+    """
+    journal: Journal = Journal(os.path.join(output, Config.JOURNAL_FILENAME), resume)
+    failed: int = len(journal.get_failed())
+    if resume and failed > 0:
+        print(f"Retrying {failed} items which failed in the previous run")
+    return journal
+
+
+def get_ticket_pool() -> Optional[TicketPool]:
+    """Get the pool of the tickets if more than one account is set.
+
+    Returns:
+        Optional[TicketPool]: The pool, None if there is only one ticket.
+    """
+    tickets = get_tickets()
+    if len(tickets) < 2:
+        return None
+    print(f"Spreading the requests to the Webex API across {len(tickets)} accounts")
+    return TicketPool(tickets)
+
+
+def get_recording_filter(
+    since: Optional[datetime],
+    until: Optional[datetime],
+    academic_year: Optional[str],
+    subject_regex: Optional[str],
+    limit: Optional[int],
+) -> Optional[RecordingFilter]:
+    """Get the filter of the recordings from the options.
+
+    Args:
+        since (Optional[datetime]): The --since option.
+        until (Optional[datetime]): The --until option.
+        academic_year (Optional[str]): The academic year to keep.
+        subject_regex (Optional[str]): The --subject-regex option.
+        limit (Optional[int]): The --limit option.
+
+    Returns:
+        Optional[RecordingFilter]: The filter, None if every recording is kept.
+    """
+    recording_filter: RecordingFilter = RecordingFilter(
+        since=since.date() if since is not None else None,
+        until=until.date() if until is not None else None,
+        academic_year=academic_year,
+        subject_regex=subject_regex,
+        limit=limit,
+    )
+    return recording_filter if recording_filter.is_active() else None
+
+
+def setup_metrics(
+    metrics_port: Optional[int], sessions: List[requests.Session]
+) -> None:
+    """Serve the metrics if requested, counting the requests of some sessions.
+
+    Args:
+        metrics_port (Optional[int]): The port, None to not serve the metrics.
+        sessions (List[requests.Session]): The sessions whose requests are counted.
+    """
+    if metrics_port is None:
+        return
+    for session in sessions:
+        metrics.attach(session)
+    try:
+        url: str = metrics.start_server(metrics_port)
+    except OSError as e:
+        print(f"[red]Unable to serve the metrics on port {metrics_port}: {e}[/red]")
+        raise typer.Exit(1)
+    print(f"Serving metrics at {url}")
+
+
+def report_ticket_pool(ticket_pool: Optional[TicketPool]) -> None:
+    """Print the counters of each account of the pool.
+
+    Args:
+        ticket_pool (Optional[TicketPool]): The pool.
+    """
+    if ticket_pool is None:
+        return
+    for account, counters in ticket_pool.get_counters().items():
+        status: str = "[red]expired[/red]" if counters["expired"] else "[green]ok[/green]"
+        print(
+            f"Account {account}: {counters['requests']} requests, "
+            f"throttled {counters['throttled']} times, {status}"
+        )
+
+
+class RunOptions(NamedTuple):
+    """The options shared by the commands which parse recordings and create the
+    output, see run_options."""
+
+    output: str
+    aria2c: bool
+    create_xlsx: bool
+    postprocess: Optional[str]
+    events: EventsFormat
+    resume: bool
+    batch_metadata: bool
+    disk_space_policy: DiskSpacePolicy
+    dedup: bool
+    auto_tune: bool
+    extra_output: Optional[List[str]]
+    placement: PlacementPolicy
+    priority_newest: Optional[int]
+    priority_subject_regex: Optional[str]
+    clip: Optional[str]
+    plan: bool
+    since: Optional[datetime]
+    until: Optional[datetime]
+    subject_regex: Optional[str]
+    limit: Optional[int]
+    metrics_port: Optional[int]
+
+
+def run_options(
     output: str = typer.Option(
         os.path.join(pathlib.Path().resolve(), Config.DEFAULT_OUTPUT_FOLDER),
         help="The output path",
@@ -31,71 +216,262 @@ def archives(
         True, help="Download with aria2c or just create a file with the download links"
     ),
     create_xlsx: bool = typer.Option(True, help="Generate xlsx"),
-) -> None:
-    """Download Polimi lessons recordings from the recordings archives url."""
-    # Get cookies
+    postprocess: Optional[str] = typer.Option(
+        None,
+        callback=validate_postprocess_preset,
+        help="ffmpeg preset applied to each recording as soon as it is downloaded",
+    ),
+    events: EventsFormat = typer.Option(
+        EventsFormat.none,
+        help=f"Write an event for each resolved recording, failure and completed download in {Config.EVENTS_FILENAME} in the output folder",
+    ),
+    resume: bool = typer.Option(
+        False,
+        help=f"Skip the items already resolved in {Config.JOURNAL_FILENAME} in the output folder by a previous run",
+    ),
+    batch_metadata: bool = typer.Option(
+        False,
+        help="Get the information about the videos from the pages of the Webex recordings listing, falling back to a request per video",
+    ),
+    disk_space_policy: DiskSpacePolicy = typer.Option(
+        DiskSpacePolicy.refuse,
+        help="What to do if the recordings do not fit in the free disk space: refuse the run, download only the ones which fit or skip the check",
+    ),
+    dedup: bool = typer.Option(
+        False,
+        help=f"Download the recordings shared by several courses only once in {Config.STORE_FOLDER} in the output folder and hardlink them into each course folder",
+    ),
+    auto_tune: bool = typer.Option(
+        False,
+        help="Measure the throughput during the first minutes of the download and tune the concurrent downloads and the connections per server of aria2c",
+    ),
+    extra_output: Optional[List[str]] = typer.Option(
+        None,
+        help=f"Another output path the recordings are spread across, each one downloaded by its own aria2c. It can be repeated, the xlsx files and {Config.OUTPUT_INDEX_FILENAME} stay in the output path",
+    ),
+    placement: PlacementPolicy = typer.Option(
+        PlacementPolicy.course,
+        help="How the recordings are spread across the output paths: each course in the one with the fewest recordings, each recording in turn or each recording in the one with the most free space",
+    ),
+    priority_newest: Optional[int] = typer.Option(
+        None,
+        min=1,
+        help="Download first this many of the newest recordings, one at a time and in order so they can be played while they are downloaded",
+    ),
+    priority_subject_regex: Optional[str] = typer.Option(
+        None,
+        callback=validate_regex,
+        help="Download first the recordings whose subject matches this regular expression, one at a time and in order so they can be played while they are downloaded",
+    ),
+    clip: Optional[str] = typer.Option(
+        None,
+        callback=validate_clip,
+        help='Download only this time range of each recording, in the format "START-END", for example "1:00:00-1:20:00". The clip starts at the keyframe before START',
+    ),
+    plan: bool = typer.Option(
+        False,
+        help=f"Only estimate the requests, the bytes and the time of the run, resolving {Config.PLAN_SAMPLE_SIZE} recordings of each course",
+    ),
+    since: Optional[datetime] = typer.Option(
+        None,
+        formats=["%Y-%m-%d"],
+        help="Keep only the recordings of this day or later",
+    ),
+    until: Optional[datetime] = typer.Option(
+        None,
+        formats=["%Y-%m-%d"],
+        help="Keep only the recordings of this day or earlier",
+    ),
+    subject_regex: Optional[str] = typer.Option(
+        None,
+        callback=validate_regex,
+        help="Keep only the recordings whose subject matches this regular expression, ignoring the case",
+    ),
+    limit: Optional[int] = typer.Option(
+        None, min=1, help="Keep at most this many recordings"
+    ),
+    metrics_port: Optional[int] = typer.Option(
+        None,
+        help="Serve metrics in the Prometheus text format at http://127.0.0.1:<port>/metrics",
+    ),
+) -> RunOptions:
+    """The options shared by the commands which parse recordings and create the
+    output. Only its signature is used, by with_run_options."""
+    return RunOptions(**locals())
+
+
+def with_run_options(command: Callable[..., None]) -> Callable[..., None]:
+    """Add the options of run_options to a command.
+
+    The command gets them as a RunOptions in its keyword-only "options" parameter.
+
+    Args:
+        command (Callable[..., None]): The command.
+
+    Returns:
+        Callable[..., None]: The command with the shared options, to register in
+            the app.
+    """
+    shared: List[inspect.Parameter] = list(
+        inspect.signature(run_options).parameters.values()
+    )
+    own: List[inspect.Parameter] = [
+        p for p in inspect.signature(command).parameters.values() if p.name != "options"
+    ]
+
+    @functools.wraps(command)
+    def wrapper(**kwargs) -> None:
+        options: RunOptions = RunOptions(**{p.name: kwargs.pop(p.name) for p in shared})
+        command(options=options, **kwargs)
+
+    wrapper.__signature__ = inspect.Signature(
+        [p.replace(kind=inspect.Parameter.KEYWORD_ONLY) for p in own + shared]
+    )
+    wrapper.__annotations__ = {p.name: p.annotation for p in own + shared}
+    return wrapper
+
+
+def get_cookies(*names: str) -> List[str]:
+    """Get the values of some cookies, exiting if one is not set.
+
+    Returns:
+        List[str]: The values, in the order of the names.
+    """
     try:
-        cookie_SSL_JSESSIONID: str = get_cookie("SSL_JSESSIONID")
-        cookie_ticket: str = get_cookie("ticket")
+        return [get_cookie(name) for name in names]
     except ValueError as e:
         print("[red]" + str(e) + "[/red]")
         raise typer.Exit(1)
 
+
+def run(
+    options: RunOptions,
+    source: str,
+    create_parser: Callable[..., Parser],
+    parse: Callable[[Parser], List[Recording]],
+    academic_year: Optional[str] = None,
+) -> None:
+    """Parse the recordings and create the output, or only estimate the run.
+
+    Args:
+        options (RunOptions): The shared options of the command.
+        source (str): What is parsed, for the messages.
+        create_parser (Callable[..., Parser]): Create the parser, given the
+            journal, batch_metadata and the ticket pool as keyword arguments.
+        parse (Callable[[Parser], List[Recording]]): Parse the recordings.
+        academic_year (Optional[str], optional): Keep only the recordings of this
+            academic year. Defaults to None.
+    """
+    if not options.plan:
+        setup_events(options.events, options.output)
+
     # Get recordings
-    print("Recordings parsing from archives URL started")
-    parser: ArchivesParser = ArchivesParser(
-        cookie_SSL_JSESSIONID=cookie_SSL_JSESSIONID,
-        cookie_ticket=cookie_ticket,
+    print(f"Recordings parsing from {source} started")
+    parser: Parser = create_parser(
+        # A plan does not touch the output folder, nor the journal of a run to resume
+        journal=open_journal(options.output, options.resume) if not options.plan else None,
+        batch_metadata=options.batch_metadata,
+        ticket_pool=get_ticket_pool(),
+    )
+    parser.recording_filter = get_recording_filter(
+        options.since, options.until, academic_year, options.subject_regex, options.limit
     )
+    setup_metrics(options.metrics_port, [parser.session])
+    planner: Optional[Planner] = Planner(parser) if options.plan else None
     try:
-        recordings: List[Recording] = parser.parse(url)
+        recordings: List[Recording] = parse(parser)
     except Exception as e:
         print("[red]" + str(e) + "[/red]")
         raise typer.Exit(1)
 
-    create_output(
-        recordings=recordings, output=output, create_xlsx=create_xlsx, aria2c=aria2c
+    if planner is not None:
+        print_plan(planner.estimate(recordings, options.output))
+        raise typer.Exit()
+    report_ticket_pool(parser.ticket_pool)
+
+    try:
+        create_output(
+            recordings=recordings,
+            output=options.output,
+            create_xlsx=options.create_xlsx,
+            aria2c=options.aria2c,
+            postprocess=options.postprocess,
+            disk_space_policy=options.disk_space_policy,
+            dedup=options.dedup,
+            auto_tune=options.auto_tune,
+            extra_outputs=options.extra_output,
+            placement_policy=options.placement,
+            priority=select_priority(
+                recordings, options.priority_newest, options.priority_subject_regex
+            ),
+            clip=parse_clip(options.clip) if options.clip is not None else None,
+        )
+    except InsufficientDiskSpaceError as e:
+        print("[red]" + str(e) + "[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+@with_run_options
+def archives(
+    url: str = typer.Argument(..., help="The URL to the recordings archive"),
+    academic_year: Optional[str] = typer.Option(
+        None,
+        callback=validate_academic_year,
+        help='Keep only the recordings of this academic year, in the format "2021-22"',
+    ),
+    *,
+    options: RunOptions,
+) -> None:
+    """Download Polimi lessons recordings from the recordings archives url."""
+    cookie_SSL_JSESSIONID, cookie_ticket = get_cookies("SSL_JSESSIONID", "ticket")
+    run(
+        options,
+        "archives URL",
+        lambda **kwargs: ArchivesParser(
+            cookie_SSL_JSESSIONID=cookie_SSL_JSESSIONID,
+            cookie_ticket=cookie_ticket,
+            **kwargs,
+        ),
+        lambda parser: parser.parse(url),
+        academic_year=academic_year,
     )
 
 
 @app.command()
+@with_run_options
 def webeep(
     url: str = typer.Argument(..., help="The webeep URL"),
-    output: str = typer.Option(
-        os.path.join(pathlib.Path().resolve(), Config.DEFAULT_OUTPUT_FOLDER),
-        help="The output path",
+    depth: int = typer.Option(
+        0,
+        min=0,
+        help="How many levels of sections, pages, folders and books of the course linked by the page are crawled for links to recordings",
     ),
-    aria2c: bool = typer.Option(
-        True, help="Download with aria2c or just create a file with the download links"
+    academic_year: Optional[str] = typer.Option(
+        None,
+        callback=validate_academic_year,
+        help='Keep only the recordings of this academic year, in the format "2021-22"',
     ),
-    create_xlsx: bool = typer.Option(True, help="Generate xlsx"),
+    *,
+    options: RunOptions,
 ) -> None:
     """Download Polimi lessons recordings from a Webeep URL."""
-    # Get cookies
-    try:
-        cookie_ticket: str = get_cookie("ticket")
-        cookie_MoodleSession: str = get_cookie("MoodleSession")
-    except ValueError as e:
-        print("[red]" + str(e) + "[/red]")
-        raise typer.Exit(1)
-
-    # Get recordings
-    print("Recordings parsing from Webeep page started")
-    parser: WebeepParser = WebeepParser(
-        cookie_ticket=cookie_ticket, cookie_MoodleSession=cookie_MoodleSession
-    )
-    try:
-        recordings: List[Recording] = parser.parse(url)
-    except Exception as e:
-        print("[red]" + str(e) + "[/red]")
-        raise typer.Exit(1)
-
-    create_output(
-        recordings=recordings, output=output, create_xlsx=create_xlsx, aria2c=aria2c
+    cookie_ticket, cookie_MoodleSession = get_cookies("ticket", "MoodleSession")
+    run(
+        options,
+        "Webeep page",
+        lambda **kwargs: WebeepParser(
+            cookie_ticket=cookie_ticket,
+            cookie_MoodleSession=cookie_MoodleSession,
+            **kwargs,
+        ),
+        lambda parser: parser.parse(url, depth),
+        academic_year=academic_year,
     )
 
 
 @app.command()
+@with_run_options
 def txt(
     file: pathlib.Path = typer.Argument(
         ..., exists=True, file_okay=True, readable=True, help="The input txt file"
@@ -106,89 +482,56 @@ def txt(
         callback=validate_academic_year,
         help='The course academic year in the format "2021-22"',
     ),
-    output: str = typer.Option(
-        os.path.join(pathlib.Path().resolve(), Config.DEFAULT_OUTPUT_FOLDER),
-        help="The output path",
-    ),
-    aria2c: bool = typer.Option(
-        True,
-        help="Download with aria2c or just create a file with the download links or video ids",
-    ),
-    create_xlsx: bool = typer.Option(True, help="Generate xlsx"),
+    *,
+    options: RunOptions,
 ) -> None:
     """Download Polimi lessons recordings from txt file with the list of urls."""
-    # Get cookies
-    try:
-        cookie_ticket: str = get_cookie("ticket")
-    except ValueError as e:
-        print("[red]" + str(e) + "[/red]")
-        raise typer.Exit(1)
-
-    # Get recordings
-    print("Recordings parsing from txt file started")
-    parser: TxtParser = TxtParser(
-        cookie_ticket=cookie_ticket,
-    )
-    try:
-        recordings: List[Recording] = parser.parse(file, course, academic_year)
-    except Exception as e:
-        print("[red]" + str(e) + "[/red]")
-        raise typer.Exit(1)
-
-    create_output(
-        recordings=recordings, output=output, create_xlsx=create_xlsx, aria2c=aria2c
+    (cookie_ticket,) = get_cookies("ticket")
+    run(
+        options,
+        "txt file",
+        lambda **kwargs: TxtParser(cookie_ticket=cookie_ticket, **kwargs),
+        lambda parser: parser.parse(file, course, academic_year),
     )
 
 
 @app.command()
+@with_run_options
 def webpage_url(
     url: str = typer.Argument(..., help="The URL of the webpage"),
+    depth: int = typer.Option(
+        0,
+        min=0,
+        help="How many levels of pages of the same site linked by the page are crawled for links to recordings",
+    ),
     course: str = typer.Option(..., prompt="Course name", help="The course name"),
     academic_year: Optional[str] = typer.Option(
         None,
         callback=validate_academic_year,
         help='The course academic year in the format "2021-22"',
     ),
-    output: str = typer.Option(
-        os.path.join(pathlib.Path().resolve(), Config.DEFAULT_OUTPUT_FOLDER),
-        help="The output path",
-    ),
-    aria2c: bool = typer.Option(
-        True,
-        help="Download with aria2c or just create a file with the download links or video ids",
-    ),
-    create_xlsx: bool = typer.Option(True, help="Generate xlsx"),
+    *,
+    options: RunOptions,
 ) -> None:
     """Download Polimi lessons recordings from a webpage url."""
-    # Get cookies
-    try:
-        cookie_ticket: str = get_cookie("ticket")
-    except ValueError as e:
-        print("[red]" + str(e) + "[/red]")
-        raise typer.Exit(1)
-
-    # Get recordings
-    print("Recordings parsing from webpage url started")
-    parser: WebpageParser = WebpageParser(cookie_ticket=cookie_ticket)
-    try:
-        recordings: List[Recording] = parser.parse_url(url, course, academic_year)
-    except Exception as e:
-        print("[red]" + str(e) + "[/red]")
-        raise typer.Exit(1)
-
-    create_output(
-        recordings=recordings, output=output, create_xlsx=create_xlsx, aria2c=aria2c
+    (cookie_ticket,) = get_cookies("ticket")
+    run(
+        options,
+        "webpage url",
+        lambda **kwargs: WebpageParser(cookie_ticket=cookie_ticket, **kwargs),
+        lambda parser: parser.parse_url(url, course, academic_year, depth),
     )
 
 
 @app.command()
+@with_run_options
 def webpage_html(
-    file: pathlib.Path = typer.Argument(
+    files: List[pathlib.Path] = typer.Argument(
         ...,
         exists=True,
         file_okay=True,
         readable=True,
-        help="The path to the HTML file",
+        help="The paths to the HTML files, parsed in parallel",
     ),
     course: str = typer.Option(..., prompt="Course name", help="The course name"),
     academic_year: Optional[str] = typer.Option(
@@ -196,36 +539,89 @@ def webpage_html(
         callback=validate_academic_year,
         help='The course academic year in the format "2021-22"',
     ),
+    *,
+    options: RunOptions,
+) -> None:
+    """Download Polimi lessons recordings from a webpage html."""
+    (cookie_ticket,) = get_cookies("ticket")
+    run(
+        options,
+        "webpage file",
+        lambda **kwargs: WebpageParser(cookie_ticket=cookie_ticket, **kwargs),
+        lambda parser: parser.parse_files(files, course, academic_year),
+    )
+
+
+@app.command()
+def watch(
+    urls: List[str] = typer.Argument(
+        ..., help="The archives or Webeep URLs to watch"
+    ),
+    interval: int = typer.Option(60, min=1, help="Minutes between two polls"),
+    baseline: bool = typer.Option(
+        False,
+        help="On the first poll only remember the current recordings, without downloading them",
+    ),
     output: str = typer.Option(
         os.path.join(pathlib.Path().resolve(), Config.DEFAULT_OUTPUT_FOLDER),
         help="The output path",
     ),
     aria2c: bool = typer.Option(
-        True,
-        help="Download with aria2c or just create a file with the download links or video ids",
+        True, help="Download with aria2c or just create a file with the download links"
+    ),
+    postprocess: Optional[str] = typer.Option(
+        None,
+        callback=validate_postprocess_preset,
+        help="ffmpeg preset applied to each recording as soon as it is downloaded",
+    ),
+    events: EventsFormat = typer.Option(
+        EventsFormat.none,
+        help=f"Write an event for each resolved recording, failure and completed download in {Config.EVENTS_FILENAME} in the output folder",
+    ),
+    metrics_port: Optional[int] = typer.Option(
+        None,
+        help="Serve metrics in the Prometheus text format at http://127.0.0.1:<port>/metrics",
     ),
-    create_xlsx: bool = typer.Option(True, help="Generate xlsx"),
 ) -> None:
-    """Download Polimi lessons recordings from a webpage html."""
+    """Poll archives and Webeep URLs and download only the new recordings."""
     # Get cookies
     try:
         cookie_ticket: str = get_cookie("ticket")
+        cookie_SSL_JSESSIONID: Optional[str] = None
+        cookie_MoodleSession: Optional[str] = None
+        if any(not url.startswith("https://webeep.polimi.it/") for url in urls):
+            cookie_SSL_JSESSIONID = get_cookie("SSL_JSESSIONID")
+        if any(url.startswith("https://webeep.polimi.it/") for url in urls):
+            cookie_MoodleSession = get_cookie("MoodleSession")
     except ValueError as e:
         print("[red]" + str(e) + "[/red]")
         raise typer.Exit(1)
 
-    # Get recordings
-    print("Recordings parsing from webpage file started")
-    parser: WebpageParser = WebpageParser(cookie_ticket=cookie_ticket)
+    setup_events(events, output)
     try:
-        recordings: List[Recording] = parser.parse_file(file, course, academic_year)
-    except Exception as e:
+        watcher: Watcher = Watcher(
+            urls=urls,
+            output=output,
+            aria2c=aria2c,
+            postprocess=postprocess,
+            cookie_ticket=cookie_ticket,
+            cookie_SSL_JSESSIONID=cookie_SSL_JSESSIONID,
+            cookie_MoodleSession=cookie_MoodleSession,
+        )
+    except ValueError as e:
         print("[red]" + str(e) + "[/red]")
         raise typer.Exit(1)
 
-    create_output(
-        recordings=recordings, output=output, create_xlsx=create_xlsx, aria2c=aria2c
+    setup_metrics(
+        metrics_port,
+        [watcher.fetcher.session]
+        + [
+            p.session
+            for p in [watcher.archives_parser, watcher.webeep_parser]
+            if p is not None
+        ],
     )
+    watcher.run(interval=interval * 60, baseline=baseline)
 
 
 @app.command()
@@ -236,10 +632,24 @@ def set_cookie(
         callback=validate_cookie_name,
     ),
     value: str = typer.Argument(..., help="Cookie value."),
+    account: Optional[str] = typer.Option(
+        None,
+        help="Name of the account. The requests to the Webex API are spread across the tickets of all the accounts",
+    ),
 ) -> None:
     """Set the value of a cookie."""
-    save_cookie(name, value)
-    print(f"[green]Cookie {name} set to {value}.[/green]")
+    save_cookie(name, value, account)
+    if account is None:
+        print(f"[green]Cookie {name} set to {value}.[/green]")
+    else:
+        print(f"[green]Cookie {name} of account {account} set to {value}.[/green]")
+
+
+@app.command()
+def clear_cache() -> None:
+    """Delete the cached links and video ids."""
+    deleted: List[str] = clear_caches()
+    print(f"[green]Deleted {len(deleted)} caches.[/green]")
 
 
 if __name__ == "__main__":
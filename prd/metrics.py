@@ -0,0 +1,332 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import requests
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    """Format the labels of a sample in the Prometheus text format.
+
+    Args:
+        names (Tuple[str, ...]): The names of the labels.
+        values (Tuple[str, ...]): The values of the labels.
+
+    Returns:
+        str: The labels between braces, empty if there are none.
+    """
+    if len(names) == 0:
+        return ""
+    escaped: List[str] = [
+        v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for v in values
+    ]
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class Metric:
+    """A metric with a value for each combination of its labels."""
+
+    TYPE: str = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        """Create the metric.
+
+        Args:
+            name (str): The name of the metric.
+            description (str): The description of the metric.
+            labels (Tuple[str, ...], optional): The names of the labels. Defaults to ().
+        """
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._lock: threading.Lock = threading.Lock()
+
+    def _samples(self) -> List[str]:
+        """Get the lines of the samples of the metric.
+
+        Returns:
+            List[str]: The lines.
+        """
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric in the Prometheus text format.
+
+        Returns:
+            str: The HELP and TYPE lines followed by the samples.
+        """
+        with self._lock:
+            samples: List[str] = self._samples()
+        return "\n".join(
+            [
+                f"# HELP {self.name} {self.description}",
+                f"# TYPE {self.name} {self.TYPE}",
+                *samples,
+            ]
+        )
+
+
+class Counter(Metric):
+    """A value which only increases."""
+
+    TYPE: str = "counter"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Increase the value.
+
+        Args:
+            amount (float, optional): The increment. Defaults to 1.
+            **labels (str): The values of the labels.
+        """
+        key: Tuple[str, ...] = tuple(str(labels[n]) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        """Get the value.
+
+        Args:
+            **labels (str): The values of the labels.
+
+        Returns:
+            float: The value, 0 if it was never increased.
+        """
+        key: Tuple[str, ...] = tuple(str(labels[n]) for n in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, k)} {v}"
+            for k, v in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    """A value which can go up and down."""
+
+    TYPE: str = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the value.
+
+        Args:
+            value (float): The value.
+            **labels (str): The values of the labels.
+        """
+        key: Tuple[str, ...] = tuple(str(labels[n]) for n in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """The distribution of observed values in cumulative buckets."""
+
+    TYPE: str = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    ):
+        """Create the histogram.
+
+        Args:
+            name (str): The name of the metric.
+            description (str): The description of the metric.
+            labels (Tuple[str, ...], optional): The names of the labels. Defaults to ().
+            buckets (Tuple[float, ...], optional): The upper bounds of the buckets,
+                in increasing order. Defaults to bounds suited to HTTP latencies in
+                seconds.
+        """
+        super().__init__(name, description, labels)
+        self.buckets = buckets
+        # The count of each bucket, the sum and the count of each label combination
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Observe a value.
+
+        Args:
+            value (float): The value.
+            **labels (str): The values of the labels.
+        """
+        key: Tuple[str, ...] = tuple(str(labels[n]) for n in self.labels)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def _samples(self) -> List[str]:
+        lines: List[str] = []
+        for key, (counts, total, count) in self._values.items():
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels: str = _format_labels(
+                    self.labels + ("le",), key + (str(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.labels + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+def get_resolution_stage(url: str) -> Optional[str]:
+    """Get the stage of the resolution of a recording a request belongs to.
+
+    Args:
+        url (str): The url of the request.
+
+    Returns:
+        Optional[str]: "recman_redirect", "ldr" or "stream_api", None if the
+            request is not part of the resolution.
+    """
+    # The other pages of recman_frontend are the archives listings
+    if "/recman_frontend/" in url and "ListActivity.do" not in url:
+        return "recman_redirect"
+    if "/ldr.php" in url:
+        return "ldr"
+    if "/webappng/api/" in url and url.split("?")[0].endswith("/stream"):
+        return "stream_api"
+    return None
+
+
+class MetricsRegistry:
+    """The metrics of the application, exported in the Prometheus text format."""
+
+    def __init__(self):
+        """Create the metrics."""
+        self.http_requests: Counter = Counter(
+            "prd_http_requests_total",
+            "HTTP requests by host and status.",
+            ("host", "status"),
+        )
+        self.http_request_duration: Histogram = Histogram(
+            "prd_http_request_duration_seconds",
+            "Latency of the HTTP requests.",
+            ("host",),
+        )
+        self.resolution_stage_duration: Histogram = Histogram(
+            "prd_resolution_stage_duration_seconds",
+            "Latency of the requests of each stage of the resolution of a recording.",
+            ("stage",),
+        )
+        self.recordings_resolved: Counter = Counter(
+            "prd_recordings_resolved_total", "Recordings resolved."
+        )
+        self.resolutions_failed: Counter = Counter(
+            "prd_resolutions_failed_total", "Items whose resolution failed."
+        )
+        self.resolution_queue: Gauge = Gauge(
+            "prd_resolution_queue_depth", "Items waiting to be resolved."
+        )
+        self.downloads_completed: Counter = Counter(
+            "prd_downloads_completed_total", "Recordings downloaded."
+        )
+        self.downloaded_bytes: Counter = Counter(
+            "prd_downloaded_bytes_total", "Bytes of the downloaded recordings."
+        )
+        self.download_speed: Gauge = Gauge(
+            "prd_download_speed_bytes",
+            "Current download throughput of aria2c in bytes per second.",
+        )
+        self.download_queue: Gauge = Gauge(
+            "prd_download_queue_depth",
+            "Downloads of aria2c by state: active, waiting or pending completion.",
+            ("state",),
+        )
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.server is not None
+
+    def get_metrics(self) -> List[Metric]:
+        """Get all the metrics.
+
+        Returns:
+            List[Metric]: The metrics.
+        """
+        return [m for m in vars(self).values() if isinstance(m, Metric)]
+
+    def render(self) -> str:
+        """Render all the metrics in the Prometheus text format.
+
+        Returns:
+            str: The metrics.
+        """
+        return "\n".join(m.render() for m in self.get_metrics()) + "\n"
+
+    def attach(self, session: requests.Session) -> None:
+        """Count the requests of a session.
+
+        Args:
+            session (requests.Session): The session.
+        """
+        session.hooks["response"].append(self._on_response)
+
+    def _on_response(self, res: requests.Response, *args, **kwargs) -> None:
+        host: str = urlparse(res.url).netloc
+        elapsed: float = res.elapsed.total_seconds()
+        self.http_requests.inc(host=host, status=str(res.status_code))
+        self.http_request_duration.observe(elapsed, host=host)
+        # The stage of a redirected request is the one of the first url
+        first_url: str = res.history[0].url if len(res.history) > 0 else res.url
+        stage: Optional[str] = get_resolution_stage(first_url)
+        if stage is not None:
+            self.resolution_stage_duration.observe(elapsed, stage=stage)
+
+    def start_server(self, port: int, host: str = "127.0.0.1") -> str:
+        """Serve the metrics at /metrics from a daemon thread.
+
+        Args:
+            port (int): The port.
+            host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+
+        Returns:
+            str: The url of the metrics.
+        """
+        registry: MetricsRegistry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body: bytes = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self.stop_server()
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}/metrics"
+
+    def stop_server(self) -> None:
+        """Stop serving the metrics."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+metrics: MetricsRegistry = MetricsRegistry()
@@ -0,0 +1,791 @@
+import struct
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import requests
+
+# Boxes whose payload is a sequence of boxes, the others are kept as bytes
+CONTAINER_BOXES: Tuple[str, ...] = ("moov", "trak", "mdia", "minf", "stbl", "edts", "dinf")
+
+
+class Mp4Error(ValueError):
+    """Raised when a file is not a supported MP4 or cannot be read by ranges."""
+
+
+class Box:
+    """A box of an MP4 file, with its children if it is a container."""
+
+    def __init__(
+        self,
+        type: str,
+        payload: bytes = b"",
+        children: Optional[List["Box"]] = None,
+    ):
+        """Create the box.
+
+        Args:
+            type (str): The four characters type of the box.
+            payload (bytes, optional): The content of a leaf box, after the header.
+                Defaults to b"".
+            children (Optional[List[Box]], optional): The children of a container
+                box. Defaults to None, which makes a leaf box.
+        """
+        self.type = type
+        self.payload = payload
+        self.children = children
+
+    def find(self, type: str) -> Optional["Box"]:
+        """Get the first child of a type.
+
+        Args:
+            type (str): The type of the child.
+
+        Returns:
+            Optional[Box]: The child, None if there is none.
+        """
+        return next((c for c in self.children or [] if c.type == type), None)
+
+    def find_all(self, type: str) -> List["Box"]:
+        """Get the children of a type.
+
+        Args:
+            type (str): The type of the children.
+
+        Returns:
+            List[Box]: The children, in order.
+        """
+        return [c for c in self.children or [] if c.type == type]
+
+    def walk(self) -> Iterator["Box"]:
+        """Iterate over the box and all its descendants.
+
+        Yields:
+            Iterator[Box]: The boxes, depth first.
+        """
+        yield self
+        for child in self.children or []:
+            yield from child.walk()
+
+    def to_bytes(self) -> bytes:
+        """Serialize the box, computing its size.
+
+        Returns:
+            bytes: The box with its header.
+        """
+        payload: bytes = (
+            b"".join(c.to_bytes() for c in self.children)
+            if self.children is not None
+            else self.payload
+        )
+        size: int = 8 + len(payload)
+        if size > 0xFFFFFFFF:
+            return (
+                struct.pack(">I4sQ", 1, self.type.encode("latin-1"), size + 8)
+                + payload
+            )
+        return struct.pack(">I4s", size, self.type.encode("latin-1")) + payload
+
+
+def parse_box_header(data: bytes, offset: int = 0) -> Tuple[str, int, int]:
+    """Parse the header of a box.
+
+    Args:
+        data (bytes): The data containing the box.
+        offset (int, optional): Where the box starts in the data. Defaults to 0.
+
+    Raises:
+        Mp4Error: If the header is truncated.
+
+    Returns:
+        Tuple[str, int, int]: The type, the size of the whole box, 0 if it extends
+            to the end of the file, and the size of the header.
+    """
+    if len(data) < offset + 8:
+        raise Mp4Error("Truncated MP4 box header.")
+    size, type = struct.unpack_from(">I4s", data, offset)
+    if size == 1:
+        if len(data) < offset + 16:
+            raise Mp4Error("Truncated MP4 box header.")
+        return (type.decode("latin-1"), struct.unpack_from(">Q", data, offset + 8)[0], 16)
+    return (type.decode("latin-1"), size, 8)
+
+
+def parse_boxes(data: bytes) -> List[Box]:
+    """Parse a sequence of boxes, descending into the containers.
+
+    Args:
+        data (bytes): The boxes.
+
+    Raises:
+        Mp4Error: If a box is truncated.
+
+    Returns:
+        List[Box]: The boxes.
+    """
+    boxes: List[Box] = []
+    offset: int = 0
+    while offset < len(data):
+        type, size, header_size = parse_box_header(data, offset)
+        size = size if size != 0 else len(data) - offset
+        if size < header_size or offset + size > len(data):
+            raise Mp4Error(f"Truncated MP4 box {type}.")
+        payload: bytes = data[offset + header_size : offset + size]
+        if type in CONTAINER_BOXES:
+            boxes.append(Box(type, children=parse_boxes(payload)))
+        else:
+            boxes.append(Box(type, payload))
+        offset += size
+    return boxes
+
+
+class RangeReader:
+    """Read parts of a remote file with HTTP range requests."""
+
+    def __init__(self, url: str, session: Optional[requests.Session] = None):
+        """Create the reader.
+
+        Args:
+            url (str): The url of the file.
+            session (Optional[requests.Session], optional): The session used for the
+                requests. Defaults to None, which creates a new one.
+        """
+        self.url = url
+        self.session: requests.Session = (
+            session if session is not None else requests.Session()
+        )
+        self.size: Optional[int] = None
+
+    def read(self, start: int, length: int) -> bytes:
+        """Read a part of the file.
+
+        Args:
+            start (int): The offset of the first byte.
+            length (int): The number of bytes, fewer are returned at the end of
+                the file.
+
+        Raises:
+            Mp4Error: If the server does not support range requests.
+
+        Returns:
+            bytes: The bytes.
+        """
+        res: requests.Response = self.session.get(
+            self.url, headers={"Range": f"bytes={start}-{start + length - 1}"}
+        )
+        if res.status_code != 206:
+            raise Mp4Error(
+                f"The server does not support range requests, got status {res.status_code}."
+            )
+        content_range: str = res.headers.get("Content-Range", "")
+        if "/" in content_range and content_range.split("/")[1].isdigit():
+            self.size = int(content_range.split("/")[1])
+        return res.content
+
+    def get_size(self) -> int:
+        """Get the size of the file.
+
+        Returns:
+            int: The size in bytes.
+        """
+        if self.size is None:
+            self.read(0, 1)
+        if self.size is None:
+            raise Mp4Error("The server does not tell the size of the file.")
+        return self.size
+
+    def iter_range(
+        self, start: int, end: int, chunk_size: int
+    ) -> Iterator[bytes]:
+        """Stream a part of the file.
+
+        Args:
+            start (int): The offset of the first byte.
+            end (int): The offset after the last byte.
+            chunk_size (int): The size of the chunks.
+
+        Raises:
+            Mp4Error: If the server does not support range requests.
+
+        Yields:
+            Iterator[bytes]: The chunks.
+        """
+        with self.session.get(
+            self.url, headers={"Range": f"bytes={start}-{end - 1}"}, stream=True
+        ) as res:
+            if res.status_code != 206:
+                raise Mp4Error(
+                    f"The server does not support range requests, got status {res.status_code}."
+                )
+            yield from res.iter_content(chunk_size=chunk_size)
+
+
+class TopLevelBox(NamedTuple):
+    """The position of a top level box in a file."""
+
+    type: str
+    offset: int
+    size: int
+
+
+def get_top_level_boxes(reader: RangeReader) -> List[TopLevelBox]:
+    """Locate the top level boxes of a remote MP4 reading only their headers.
+
+    Args:
+        reader (RangeReader): The reader of the file.
+
+    Raises:
+        Mp4Error: If the file is not an MP4.
+
+    Returns:
+        List[TopLevelBox]: The boxes, in the order of the file.
+    """
+    size: int = reader.get_size()
+    boxes: List[TopLevelBox] = []
+    offset: int = 0
+    while offset < size:
+        type, box_size, header_size = parse_box_header(reader.read(offset, 16))
+        box_size = box_size if box_size != 0 else size - offset
+        if box_size < header_size or not type.isprintable():
+            raise Mp4Error("The file is not an MP4.")
+        boxes.append(TopLevelBox(type, offset, box_size))
+        offset += box_size
+    if "moov" not in [b.type for b in boxes]:
+        raise Mp4Error("The MP4 has no moov box.")
+    return boxes
+
+
+def relocate_chunk_offsets(moov: Box, relocate: Callable[[int], int]) -> None:
+    """Change the chunk offsets of all the tracks, converting the 32 bit tables to
+    64 bit ones where an offset does not fit.
+
+    Args:
+        moov (Box): The moov box.
+        relocate (Callable[[int], int]): Map an offset to the new one.
+    """
+    for box in moov.walk():
+        if box.type not in ("stco", "co64"):
+            continue
+        count: int = struct.unpack_from(">I", box.payload, 4)[0]
+        format: str = ">I" if box.type == "stco" else ">Q"
+        offsets: List[int] = [
+            relocate(o)
+            for o in struct.unpack_from(f">{count}{format[1]}", box.payload, 8)
+        ]
+        if box.type == "stco" and any(o > 0xFFFFFFFF for o in offsets):
+            box.type = "co64"
+        box.payload = (
+            box.payload[:8]
+            + struct.pack(f">{count}{'I' if box.type == 'stco' else 'Q'}", *offsets)
+        )
+
+
+def build_faststart_header(
+    reader: RangeReader, boxes: List[TopLevelBox]
+) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """Build the beginning of a copy of a remote MP4 with its moov box first.
+
+    The copy is the ftyp box, the moov box and then the other top level boxes in
+    their order, with the chunk offsets moved accordingly. A player can open it
+    as soon as the header is written and play it while the rest is appended.
+
+    Args:
+        reader (RangeReader): The reader of the file.
+        boxes (List[TopLevelBox]): The top level boxes of the file.
+
+    Returns:
+        Tuple[bytes, List[Tuple[int, int]]]: The header, and the ranges of the
+            file to append after it, as start and end offsets.
+    """
+    ftyp: bytes = b""
+    for b in boxes:
+        if b.type == "ftyp":
+            ftyp = reader.read(b.offset, b.size)
+    moov_position: TopLevelBox = next(b for b in boxes if b.type == "moov")
+    moov_data: bytes = reader.read(moov_position.offset, moov_position.size)
+
+    # Adjacent boxes are appended with a single request
+    ranges: List[Tuple[int, int]] = []
+    for b in boxes:
+        if b.type in ("ftyp", "moov"):
+            continue
+        if len(ranges) > 0 and ranges[-1][1] == b.offset:
+            ranges[-1] = (ranges[-1][0], b.offset + b.size)
+        else:
+            ranges.append((b.offset, b.offset + b.size))
+
+    moov_size: int = len(moov_data)
+    while True:
+        # Where each range starts in the copy
+        starts: List[int] = []
+        position: int = len(ftyp) + moov_size
+        for start, end in ranges:
+            starts.append(position)
+            position += end - start
+
+        def relocate(offset: int) -> int:
+            for (start, end), new_start in zip(ranges, starts):
+                if start <= offset < end:
+                    return offset - start + new_start
+            raise Mp4Error(f"A chunk offset {offset} is outside of the media data.")
+
+        moov: Box = parse_boxes(moov_data)[0]
+        relocate_chunk_offsets(moov, relocate)
+        header: bytes = ftyp + moov.to_bytes()
+        # Converting a table to 64 bit makes the moov box bigger
+        if len(header) - len(ftyp) == moov_size:
+            return (header, ranges)
+        moov_size = len(header) - len(ftyp)
+
+
+def _full_box(type: str, version: int, payload: bytes) -> Box:
+    """Create a box with a version and no flags.
+
+    Args:
+        type (str): The type of the box.
+        version (int): The version.
+        payload (bytes): The content after the version and the flags.
+
+    Returns:
+        Box: The box.
+    """
+    return Box(type, struct.pack(">I", version << 24) + payload)
+
+
+def _get_duration_field(box: Box) -> Tuple[int, str]:
+    """Get where the duration of a mvhd, tkhd or mdhd box is.
+
+    Args:
+        box (Box): The box.
+
+    Returns:
+        Tuple[int, str]: The offset in the payload and the struct format.
+    """
+    # The times of version 1 are 64 bit, a tkhd box has a track id and a
+    # reserved field before the duration instead of a timescale
+    if box.payload[0] == 1:
+        return (28 if box.type == "tkhd" else 24, ">Q")
+    return (20 if box.type == "tkhd" else 16, ">I")
+
+
+def _get_duration(box: Box) -> int:
+    """Get the duration of a mvhd, tkhd or mdhd box.
+
+    Args:
+        box (Box): The box.
+
+    Returns:
+        int: The duration in the timescale of the box.
+    """
+    offset, format = _get_duration_field(box)
+    return struct.unpack_from(format, box.payload, offset)[0]
+
+
+def _set_duration(box: Box, duration: int) -> None:
+    """Set the duration of a mvhd, tkhd or mdhd box.
+
+    Args:
+        box (Box): The box.
+        duration (int): The duration in the timescale of the box.
+    """
+    offset, format = _get_duration_field(box)
+    payload: bytearray = bytearray(box.payload)
+    struct.pack_into(
+        format, payload, offset, min(duration, 0xFFFFFFFF) if format == ">I" else duration
+    )
+    box.payload = bytes(payload)
+
+
+def _get_timescale(box: Box) -> int:
+    """Get the timescale of a mvhd or mdhd box.
+
+    Args:
+        box (Box): The box.
+
+    Returns:
+        int: The units per second.
+    """
+    return struct.unpack_from(">I", box.payload, 20 if box.payload[0] == 1 else 12)[0]
+
+
+def _unpack_table(box: Box, format: str, fields: int, offset: int = 8) -> List[int]:
+    """Unpack the entries of a sample table box.
+
+    Args:
+        box (Box): The box, whose entry count is right before the entries.
+        format (str): The struct format of a field, such as "I".
+        fields (int): The fields of each entry.
+        offset (int, optional): Where the entries start in the payload. Defaults
+            to 8, after the version, the flags and the entry count.
+
+    Returns:
+        List[int]: The fields of all the entries.
+    """
+    count: int = struct.unpack_from(">I", box.payload, offset - 4)[0]
+    return list(struct.unpack_from(f">{count * fields}{format}", box.payload, offset))
+
+
+def _run_length(values: List[int]) -> List[Tuple[int, int]]:
+    """Encode values as runs of equal values.
+
+    Args:
+        values (List[int]): The values.
+
+    Returns:
+        List[Tuple[int, int]]: The length and the value of each run.
+    """
+    runs: List[Tuple[int, int]] = []
+    for v in values:
+        if len(runs) > 0 and runs[-1][1] == v:
+            runs[-1] = (runs[-1][0] + 1, v)
+        else:
+            runs.append((1, v))
+    return runs
+
+
+class Track:
+    """The samples of a track of an MP4, expanded from its sample tables."""
+
+    def __init__(self, trak: Box):
+        """Read the sample tables of a track.
+
+        Args:
+            trak (Box): The trak box.
+
+        Raises:
+            Mp4Error: If the track uses sample tables which are not supported.
+        """
+        self.trak = trak
+        mdia: Box = trak.find("mdia")
+        self.handler: str = mdia.find("hdlr").payload[8:12].decode("latin-1")
+        self.timescale: int = _get_timescale(mdia.find("mdhd"))
+        stbl: Box = mdia.find("minf").find("stbl")
+        if stbl.find("stsz") is None:
+            raise Mp4Error("Only the stsz sample size table is supported.")
+
+        stsz: Box = stbl.find("stsz")
+        sample_size, count = struct.unpack_from(">II", stsz.payload, 4)
+        self.sizes: List[int] = (
+            [sample_size] * count if sample_size != 0 else _unpack_table(stsz, "I", 1, 12)
+        )
+
+        self.durations: List[int] = []
+        stts: List[int] = _unpack_table(stbl.find("stts"), "I", 2)
+        for i in range(0, len(stts), 2):
+            self.durations += [stts[i + 1]] * stts[i]
+        self.times: List[int] = []
+        time: int = 0
+        for d in self.durations:
+            self.times.append(time)
+            time += d
+
+        ctts: Optional[Box] = stbl.find("ctts")
+        self.composition_offsets: Optional[List[int]] = None
+        self.ctts_version: int = 0
+        if ctts is not None:
+            self.ctts_version = ctts.payload[0]
+            entries: List[int] = _unpack_table(
+                ctts, "i" if self.ctts_version == 1 else "I", 2
+            )
+            self.composition_offsets = []
+            for i in range(0, len(entries), 2):
+                self.composition_offsets += [entries[i + 1]] * entries[i]
+
+        stss: Optional[Box] = stbl.find("stss")
+        # Without a sync sample table every sample is a sync sample
+        self.sync: Optional[List[bool]] = None
+        if stss is not None:
+            self.sync = [False] * count
+            for n in _unpack_table(stss, "I", 1):
+                if n <= count:
+                    self.sync[n - 1] = True
+
+        chunk_offsets: List[int] = (
+            _unpack_table(stbl.find("stco"), "I", 1)
+            if stbl.find("stco") is not None
+            else _unpack_table(stbl.find("co64"), "Q", 1)
+        )
+        stsc: List[int] = _unpack_table(stbl.find("stsc"), "I", 3)
+        self.offsets: List[int] = []
+        self.description_indexes: List[int] = []
+        for e in range(0, len(stsc), 3):
+            first_chunk, samples_per_chunk, description_index = stsc[e : e + 3]
+            last_chunk: int = (
+                stsc[e + 3] - 1 if e + 3 < len(stsc) else len(chunk_offsets)
+            )
+            for chunk in range(first_chunk - 1, last_chunk):
+                offset: int = chunk_offsets[chunk]
+                for _ in range(samples_per_chunk):
+                    if len(self.offsets) == count:
+                        break
+                    self.offsets.append(offset)
+                    self.description_indexes.append(description_index)
+                    offset += self.sizes[len(self.offsets) - 1]
+        if len(self.offsets) != count or len(self.durations) != count:
+            raise Mp4Error("The sample tables of the track are inconsistent.")
+
+    def is_sync(self, sample: int) -> bool:
+        """Check if a sample can start the playback.
+
+        Args:
+            sample (int): The index of the sample.
+
+        Returns:
+            bool: True if it is a sync sample.
+        """
+        return self.sync is None or self.sync[sample]
+
+    def select(self, start: int, end: int) -> range:
+        """Get the samples decoded between two times.
+
+        Args:
+            start (int): The start time in the timescale of the track.
+            end (int): The end time in the timescale of the track.
+
+        Returns:
+            range: The indexes of the samples.
+        """
+        return range(bisect_left(self.times, start), bisect_left(self.times, end))
+
+    def select_from_sync(self, start: int, end: int) -> range:
+        """Get the samples decoded between two times, starting from the last sync
+        sample before the start so the first frames can be decoded.
+
+        Args:
+            start (int): The start time in the timescale of the track.
+            end (int): The end time in the timescale of the track.
+
+        Returns:
+            range: The indexes of the samples.
+        """
+        first: int = max(0, bisect_right(self.times, start) - 1)
+        while first > 0 and not self.is_sync(first):
+            first -= 1
+        return range(first, max(first, bisect_left(self.times, end)))
+
+    def build_trak(
+        self, samples: range, offsets: List[int], movie_timescale: int, large: bool
+    ) -> Box:
+        """Build the trak box of a clip of the track.
+
+        Args:
+            samples (range): The samples of the clip.
+            offsets (List[int]): The offset of each sample in the clip file.
+            movie_timescale (int): The timescale of the mvhd box.
+            large (bool): True to use 64 bit chunk offsets.
+
+        Returns:
+            Box: The trak box.
+        """
+        # Samples following each other in the file make a chunk, whose offset,
+        # end, number of samples and sample description are kept
+        chunks: List[List[int]] = []
+        for i, offset in zip(samples, offsets):
+            description_index: int = self.description_indexes[i]
+            if (
+                len(chunks) > 0
+                and chunks[-1][1] == offset
+                and chunks[-1][3] == description_index
+            ):
+                chunks[-1][1] += self.sizes[i]
+                chunks[-1][2] += 1
+            else:
+                chunks.append([offset, offset + self.sizes[i], 1, description_index])
+        stsc: List[Tuple[int, int, int]] = []
+        for n, (_, _, count, description_index) in enumerate(chunks):
+            if len(stsc) == 0 or stsc[-1][1:] != (count, description_index):
+                stsc.append((n + 1, count, description_index))
+
+        durations: List[int] = [self.durations[i] for i in samples]
+        stts: List[Tuple[int, int]] = _run_length(durations)
+        tables: List[Box] = [
+            self.trak.find("mdia").find("minf").find("stbl").find("stsd"),
+            _full_box(
+                "stts",
+                0,
+                struct.pack(f">I{2 * len(stts)}I", len(stts), *[v for e in stts for v in e]),
+            ),
+        ]
+        first_composition_offset: int = 0
+        if self.composition_offsets is not None:
+            ctts: List[Tuple[int, int]] = _run_length(
+                [self.composition_offsets[i] for i in samples]
+            )
+            tables.append(
+                _full_box(
+                    "ctts",
+                    self.ctts_version,
+                    struct.pack(
+                        f">I{2 * len(ctts)}{'i' if self.ctts_version == 1 else 'I'}",
+                        len(ctts),
+                        *[v for e in ctts for v in e],
+                    ),
+                )
+            )
+            if len(samples) > 0:
+                first_composition_offset = min(
+                    self.composition_offsets[i] + self.times[i] - self.times[samples[0]]
+                    for i in samples
+                )
+        if self.sync is not None:
+            sync: List[int] = [n + 1 for n, i in enumerate(samples) if self.sync[i]]
+            tables.append(
+                _full_box("stss", 0, struct.pack(f">I{len(sync)}I", len(sync), *sync))
+            )
+        sizes: List[int] = [self.sizes[i] for i in samples]
+        tables.append(
+            _full_box("stsz", 0, struct.pack(f">II{len(sizes)}I", 0, len(sizes), *sizes))
+        )
+        tables.append(
+            _full_box(
+                "stsc",
+                0,
+                struct.pack(f">I{3 * len(stsc)}I", len(stsc), *[v for e in stsc for v in e]),
+            )
+        )
+        tables.append(
+            _full_box(
+                "co64" if large else "stco",
+                0,
+                struct.pack(
+                    f">I{len(chunks)}{'Q' if large else 'I'}",
+                    len(chunks),
+                    *[c[0] for c in chunks],
+                ),
+            )
+        )
+
+        mdia: Box = self.trak.find("mdia")
+        minf: Box = mdia.find("minf")
+        mdhd: Box = Box("mdhd", mdia.find("mdhd").payload)
+        media_duration: int = sum(durations)
+        _set_duration(mdhd, media_duration)
+        tkhd: Box = Box("tkhd", self.trak.find("tkhd").payload)
+        duration: int = media_duration * movie_timescale // self.timescale
+        _set_duration(tkhd, duration)
+        # The edit list starts the presentation at the first composed sample
+        edts: Box = Box(
+            "edts",
+            children=[
+                _full_box(
+                    "elst",
+                    0,
+                    struct.pack(">IIiHH", 1, duration, first_composition_offset, 1, 0),
+                )
+            ],
+        )
+        return Box(
+            "trak",
+            children=[tkhd, edts]
+            + [c for c in self.trak.children if c.type not in ("tkhd", "edts", "mdia")]
+            + [
+                Box(
+                    "mdia",
+                    children=[
+                        mdhd if c.type == "mdhd" else c
+                        for c in mdia.children
+                        if c.type != "minf"
+                    ]
+                    + [
+                        Box(
+                            "minf",
+                            children=[c for c in minf.children if c.type != "stbl"]
+                            + [Box("stbl", children=tables)],
+                        )
+                    ],
+                )
+            ],
+        )
+
+
+class Clip(NamedTuple):
+    """A clip of an MP4: its header and the samples to copy after it."""
+
+    header: bytes
+    # The offset and the size of each sample in the source, in the order of the clip
+    samples: List[Tuple[int, int]]
+
+
+def build_clip(ftyp: bytes, moov_data: bytes, start: float, end: float) -> Clip:
+    """Build a standalone MP4 with the samples of a time range of another one.
+
+    The range starts at the last sync sample of the video track before the
+    start, so the clip can be decoded from its first frame, and the samples of
+    the other tracks decoded in the same range are kept. The samples keep their
+    order in the file, the clip is the ftyp box, the moov box and the mdat box.
+
+    Args:
+        ftyp (bytes): The ftyp box of the source, empty if it has none.
+        moov_data (bytes): The moov box of the source.
+        start (float): The start of the clip in seconds.
+        end (float): The end of the clip in seconds.
+
+    Raises:
+        Mp4Error: If the MP4 is fragmented or it is not supported.
+
+    Returns:
+        Clip: The clip.
+    """
+    moov: Box = parse_boxes(moov_data)[0]
+    if moov.find("mvex") is not None:
+        raise Mp4Error("Fragmented MP4 files are not supported.")
+    tracks: List[Track] = [Track(t) for t in moov.find_all("trak")]
+    if len(tracks) == 0:
+        raise Mp4Error("The MP4 has no tracks.")
+    reference: Track = next((t for t in tracks if t.handler == "vide"), tracks[0])
+    first: range = reference.select_from_sync(
+        round(start * reference.timescale), round(end * reference.timescale)
+    )
+    if len(first) == 0:
+        raise Mp4Error("The clip is outside of the recording.")
+    start = reference.times[first[0]] / reference.timescale
+    selections: List[range] = [
+        first
+        if t is reference
+        else t.select(round(start * t.timescale), round(end * t.timescale))
+        for t in tracks
+    ]
+
+    # The samples in the order of the source file
+    order: List[Tuple[int, int, int]] = sorted(
+        (t.offsets[i], n, i) for n, t in enumerate(tracks) for i in selections[n]
+    )
+    data_size: int = sum(tracks[n].sizes[i] for _, n, i in order)
+    movie_timescale: int = _get_timescale(moov.find("mvhd"))
+
+    def build_moov(base: int, large: bool) -> bytes:
+        positions: Dict[Tuple[int, int], int] = {}
+        position: int = base
+        for _, n, i in order:
+            positions[(n, i)] = position
+            position += tracks[n].sizes[i]
+        traks: List[Box] = [
+            t.build_trak(
+                selections[n],
+                [positions[(n, i)] for i in selections[n]],
+                movie_timescale,
+                large,
+            )
+            for n, t in enumerate(tracks)
+        ]
+        mvhd: Box = Box("mvhd", moov.find("mvhd").payload)
+        _set_duration(mvhd, max(_get_duration(t.find("tkhd")) for t in traks))
+        return Box(
+            "moov",
+            children=[mvhd]
+            + traks
+            + [c for c in moov.children if c.type not in ("mvhd", "trak")],
+        ).to_bytes()
+
+    # The size of the moov box depends only on the width of the chunk offsets
+    large: bool = len(ftyp) + len(moov_data) * 2 + data_size > 0xFFFFFFFF
+    mdat_header_size: int = 16 if large else 8
+    moov_size: int = len(build_moov(0, large))
+    base: int = len(ftyp) + moov_size + mdat_header_size
+    mdat_header: bytes = (
+        struct.pack(">I4sQ", 1, b"mdat", data_size + 16)
+        if large
+        else struct.pack(">I4s", data_size + 8, b"mdat")
+    )
+    return Clip(
+        ftyp + build_moov(base, large) + mdat_header,
+        [(tracks[n].offsets[i], tracks[n].sizes[i]) for _, n, i in order],
+    )
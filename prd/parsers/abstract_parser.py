@@ -1,2 +1,539 @@
+import threading
+from datetime import datetime
+from multiprocessing.pool import ThreadPool
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import requests
+
+from prd.config import Config
+from prd.events import emitter, recording_fields
+from prd.filters import RecordingFilter
+from prd.metrics import metrics
+from prd.reporter import Reporter, ConsoleReporter
+from prd.journal import Journal
+from prd.cache import PersistentCache, get_cache
+from prd.transport import create_session
+from prd.webex_api import (
+    Recording,
+    RecordingsListing,
+    SessionExpiredError,
+    ThrottledError,
+    TicketPool,
+    check_ticket,
+    generate_recording_from_id,
+)
+
+# Result of the items skipped after the session expired or the limit was reached
+_SKIPPED = object()
+
+# The datetime, the academic year and the subject of an item, None where unknown
+ItemInfo = Tuple[Optional[datetime], Optional[str], Optional[str]]
+
+# The "active" attribute is True in a thread while it resolves an item
+resolving: threading.local = threading.local()
+
+
 class Parser:
     """Abstract class of a parser."""
+
+    _pool: Optional[ThreadPool] = None
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        reporter: Optional[Reporter] = None,
+        journal: Optional[Journal] = None,
+        batch_metadata: bool = False,
+        ticket_pool: Optional[TicketPool] = None,
+    ):
+        """Create the parser.
+
+        Args:
+            session (Optional[requests.Session], optional): The session used for all
+                the requests. Defaults to None, which creates a new one reaching
+                Config.HTTP2_HOSTS over HTTP/2.
+            reporter (Optional[Reporter], optional): Where the progress is reported.
+                Defaults to None, which prints to the terminal.
+            journal (Optional[Journal], optional): Where the resolved and failed
+                items are journaled. Defaults to None.
+            batch_metadata (bool, optional): True to get the information about the
+                videos from the pages of the recordings listing, falling back to a
+                request per video. Defaults to False.
+            ticket_pool (Optional[TicketPool], optional): The tickets of several
+                accounts across which the requests to the Webex API are spread.
+                Defaults to None, which uses only the ticket of the parser.
+        """
+        self.session: requests.Session = (
+            session if session is not None else create_session()
+        )
+        self.reporter: Reporter = reporter if reporter is not None else ConsoleReporter()
+        self.journal: Optional[Journal] = journal
+        self.ldr_cache: PersistentCache = get_cache("ldr_links")
+        self.batch_metadata = batch_metadata
+        self._recordings_listing: Optional[RecordingsListing] = None
+        self.ticket_pool: Optional[TicketPool] = ticket_pool
+        self._credentials_checked: bool = False
+        # Set to only resolve a sample of the items of each course, see prd.plan
+        self.plan_sample: Optional[int] = None
+        self.planned_items: Dict[str, int] = {}
+        self.sampled_items: Dict[str, int] = {}
+        # Keys of the items which failed, never cleared by the parser
+        self.failed_keys: List[str] = []
+        # Set to only keep some of the recordings, see prd.filters
+        self.recording_filter: Optional[RecordingFilter] = None
+
+    def _get_caches(self) -> List[PersistentCache]:
+        """Get the persistent caches used by the parser.
+
+        Returns:
+            List[PersistentCache]: The caches.
+        """
+        return [self.ldr_cache]
+
+    def save_caches(self) -> None:
+        """Persist the caches used by the parser."""
+        for cache in self._get_caches():
+            cache.save()
+
+    def get_pool(self) -> ThreadPool:
+        """Get the thread pool of the parser.
+
+        The pool is created on first use and reused by the following parses, so a
+        long running process keeps it warm.
+
+        Returns:
+            ThreadPool: The thread pool.
+        """
+        if self._pool is None:
+            self._pool = ThreadPool(Config.PARSER_WORKERS)
+        return self._pool
+
+    def check_credentials(self) -> None:
+        """Check that the ticket is valid with a cheap request, before any fan-out.
+
+        The check is done only the first time. With a ticket pool, the expired
+        accounts are left out of the rotation.
+
+        Raises:
+            SessionExpiredError: If the ticket, or every ticket of the pool, expired.
+        """
+        if self._credentials_checked:
+            return
+        if self.ticket_pool is not None:
+            expired: List[str] = self.ticket_pool.probe(
+                lambda ticket: check_ticket(ticket, session=self.session)
+            )
+            for account in expired:
+                self.reporter.message(
+                    f"[yellow]The ticket of the account {account} expired, "
+                    "it will not be used.[/yellow]"
+                )
+        else:
+            try:
+                check_ticket(self.cookie_ticket, session=self.session)
+            except ThrottledError:
+                pass
+        self._credentials_checked = True
+
+    def _get_recordings_listing(self) -> Optional[RecordingsListing]:
+        """Get the batched provider of the information about the videos.
+
+        Returns:
+            Optional[RecordingsListing]: The provider, None if batch_metadata is False.
+        """
+        if self.batch_metadata and self._recordings_listing is None:
+            self._recordings_listing = RecordingsListing(
+                ticket=self.cookie_ticket,
+                session=self.session,
+                ticket_pool=self.ticket_pool,
+            )
+        return self._recordings_listing
+
+    def _prefetch_metadata(self, video_ids: List[str]) -> None:
+        """Fetch in batch the information about some videos, if batch_metadata is True.
+
+        Args:
+            video_ids (List[str]): The ids of the videos.
+        """
+        recordings_listing: Optional[RecordingsListing] = self._get_recordings_listing()
+        if recordings_listing is not None and len(video_ids) > 0:
+            covered: int = recordings_listing.prefetch(video_ids)
+            self.reporter.message(
+                f"{covered} of {len(video_ids)} videos found in "
+                f"{recordings_listing.pages_fetched} pages of the recordings listing"
+            )
+
+    def _generate_recording_from_id(
+        self,
+        video_id: str,
+        course: str,
+        academic_year: Optional[str] = None,
+        subject: Optional[str] = None,
+        recording_datetime: Optional[datetime] = None,
+    ) -> Recording:
+        """Generate a Recording given a video id, using the session of the parser,
+        the recordings listing if batch_metadata is True and the tickets of the
+        pool if any.
+
+        Args:
+            video_id (str): Id of the video.
+            course (str): Name of the course.
+            academic_year (Optional[str], optional): The academic year of the course.
+                Defaults to None, which infers it from the recording.
+            subject (Optional[str], optional): The subjet of the recording. Defaults
+                to None, which uses the title of the recording.
+            recording_datetime (Optional[datetime], optional): The datetime of the
+                recording. Defaults to None, which gets it from the API.
+
+        Returns:
+            Recording: The Recording object.
+        """
+        recordings_listing: Optional[RecordingsListing] = self._get_recordings_listing()
+        if recordings_listing is not None:
+            recording: Optional[Recording] = recordings_listing.generate_recording(
+                video_id=video_id,
+                course=course,
+                academic_year=academic_year,
+                subject=subject,
+                recording_datetime=recording_datetime,
+            )
+            if recording is not None:
+                return recording
+
+        def resolve(ticket: str) -> Recording:
+            return generate_recording_from_id(
+                video_id=video_id,
+                ticket=ticket,
+                course=course,
+                academic_year=academic_year,
+                subject=subject,
+                recording_datetime=recording_datetime,
+                session=self.session,
+            )
+
+        if self.ticket_pool is not None:
+            return self.ticket_pool.call(resolve)
+        return resolve(self.cookie_ticket)
+
+    def _sample(
+        self, items: List[Tuple], course: Callable[[Tuple], str]
+    ) -> List[Tuple]:
+        """Keep an evenly spaced sample of plan_sample items of each course,
+        counting the items of each course.
+
+        Args:
+            items (List[Tuple]): The arguments of each call.
+            course (Callable[[Tuple], str]): Get the course of an item from its arguments.
+
+        Returns:
+            List[Tuple]: The sampled items.
+        """
+        groups: Dict[str, List[Tuple]] = {}
+        for args in items:
+            groups.setdefault(course(args), []).append(args)
+
+        sampled: List[Tuple] = []
+        for name, group in groups.items():
+            step: int = max(1, len(group) // self.plan_sample)
+            group_sample: List[Tuple] = group[::step][: self.plan_sample]
+            self.planned_items[name] = self.planned_items.get(name, 0) + len(group)
+            self.sampled_items[name] = (
+                self.sampled_items.get(name, 0) + len(group_sample)
+            )
+            sampled += group_sample
+        return sampled
+
+    def _filter(
+        self, items: List[Tuple], info: Optional[Callable[[Tuple], ItemInfo]]
+    ) -> List[Tuple]:
+        """Drop the items filtered out by the information known before resolving
+        them.
+
+        The limit is applied too if the datetime, the academic year and the
+        subject of every item are known.
+
+        Args:
+            items (List[Tuple]): The arguments of each call.
+            info (Optional[Callable[[Tuple], ItemInfo]]): Get the datetime, the
+                academic year and the subject of an item from its arguments, None
+                where unknown.
+
+        Returns:
+            List[Tuple]: The items to resolve.
+        """
+        if self.recording_filter is None or info is None:
+            return items
+        infos: List[ItemInfo] = [info(args) for args in items]
+        kept: List[Tuple] = [
+            args for args, i in zip(items, infos) if self.recording_filter.matches(*i)
+        ]
+        remaining: Optional[int] = self.recording_filter.get_remaining()
+        if remaining is not None and all(None not in i for i in infos):
+            kept = kept[:remaining]
+        if len(kept) < len(items):
+            self.reporter.message(
+                f"{len(items) - len(kept)} items filtered out before resolving them"
+            )
+        return kept
+
+    def _keep(self, result: Any) -> bool:
+        """Check a resolved result against the filter, counting it against the limit.
+
+        Args:
+            result (Any): The result.
+
+        Returns:
+            bool: False if the result is a Recording filtered out.
+        """
+        if self.recording_filter is None or not isinstance(result, Recording):
+            return True
+        if not self.recording_filter.matches_recording(result):
+            return False
+        if self.recording_filter.get_remaining() == 0:
+            return False
+        self.recording_filter.kept += 1
+        return True
+
+    def _imap(
+        self,
+        func: Callable[..., Any],
+        items: Iterable[Tuple],
+        description: str,
+        key: Optional[Callable[[Tuple], str]] = None,
+        course: Optional[Callable[[Tuple], str]] = None,
+        info: Optional[Callable[[Tuple], ItemInfo]] = None,
+        resolution: bool = True,
+    ) -> Iterator[Any]:
+        """Call a function on each item in the thread pool, yielding the results in
+        completion order while reporting the progress.
+
+        A Recording returned is reported as resolved. A failing item is reported
+        and skipped, without aborting the others. When an item fails because the
+        session expired no other item is started, since they would fail too, and
+        SessionExpiredError is raised once the running ones complete.
+
+        If a key function is given and the parser has a journal, the function must
+        return an Optional[Recording]: each result and failure is journaled as it
+        happens and the items already resolved in the journal are not processed
+        again.
+
+        If the parser has a recording_filter, the items are filtered with the
+        information given by the info function before being processed, and the
+        Recordings returned are filtered too. Once the limit of the filter is
+        reached no other item is started.
+
+        If a course function is given and plan_sample is set, only a sample of
+        the items of each course is processed.
+
+        Args:
+            func (Callable[..., Any]): The function.
+            items (Iterable[Tuple]): The arguments of each call.
+            description (str): The description of the task.
+            key (Optional[Callable[[Tuple], str]], optional): Get the journal key
+                of an item from its arguments. Defaults to None.
+            course (Optional[Callable[[Tuple], str]], optional): Get the course of
+                an item from its arguments. Defaults to None.
+            info (Optional[Callable[[Tuple], ItemInfo]], optional): Get the
+                datetime, the academic year and the subject of an item from its
+                arguments, None where unknown. Defaults to None.
+            resolution (bool, optional): False if the items are not resolutions of
+                recordings, such as the pages of a crawl: their failures are only
+                reported as messages, without counting them as failed resolutions,
+                and the limit of the filter does not apply. Defaults to True.
+
+        Raises:
+            SessionExpiredError: If the session expired during the run.
+
+        Yields:
+            Iterator[Any]: The results, in completion order.
+        """
+        items = self._filter(list(items), info)
+        if self.plan_sample is not None and course is not None:
+            items = self._sample(items, course)
+        expired: threading.Event = threading.Event()
+        limit_reached: threading.Event = threading.Event()
+        if (
+            resolution
+            and self.recording_filter is not None
+            and self.recording_filter.get_remaining() == 0
+        ):
+            limit_reached.set()
+        journal: Optional[Journal] = self.journal if key is not None else None
+
+        def get_key(args: Tuple) -> str:
+            return key(args) if key is not None else str(args[0])
+
+        def call(args: Tuple) -> Tuple[bool, Any]:
+            if expired.is_set() or limit_reached.is_set():
+                return (False, _SKIPPED)
+            resolving.active = key is not None
+            try:
+                result: Any = func(*args)
+            except Exception as e:
+                if isinstance(e, SessionExpiredError):
+                    expired.set()
+                if not resolution:
+                    self.reporter.message(
+                        f"[yellow]{get_key(args)} failed: {e}[/yellow]"
+                    )
+                    return (False, e)
+                emitter.emit("resolution_failed", item=get_key(args), error=str(e))
+                metrics.resolutions_failed.inc()
+                self.reporter.resolution_failed(get_key(args), e)
+                if journal is not None:
+                    journal.record_failed(get_key(args), e)
+                self.failed_keys.append(get_key(args))
+                return (False, e)
+            finally:
+                resolving.active = False
+            if isinstance(result, Recording):
+                emitter.emit("recording_resolved", **recording_fields(result))
+                metrics.recordings_resolved.inc()
+                self.reporter.recording_resolved(result)
+            if journal is not None:
+                journal.record_resolved(get_key(args), result)
+            return (True, result)
+
+        to_process: List[Tuple] = items
+        if journal is not None:
+            to_process = []
+            journaled: int = 0
+            for args in items:
+                if journal.is_resolved(get_key(args)):
+                    journaled += 1
+                    if self._keep(journal.get_resolved(get_key(args))):
+                        yield journal.get_resolved(get_key(args))
+                else:
+                    to_process.append(args)
+            if journaled > 0:
+                self.reporter.message(f"{journaled} items already resolved in the journal")
+
+        failed: int = 0
+        skipped: int = 0
+        self.reporter.progress_start(description, len(to_process))
+        queued: int = len(to_process)
+        if resolution:
+            metrics.resolution_queue.set(queued)
+        try:
+            for ok, result in self.get_pool().imap_unordered(call, to_process):
+                self.reporter.progress_advance()
+                queued -= 1
+                if resolution:
+                    metrics.resolution_queue.set(queued)
+                if ok:
+                    if self._keep(result):
+                        yield result
+                    if resolution and self.recording_filter is not None and (
+                        self.recording_filter.get_remaining() == 0
+                    ):
+                        limit_reached.set()
+                elif result is _SKIPPED:
+                    skipped += 1
+                else:
+                    failed += 1
+        finally:
+            self.reporter.progress_stop()
+            metrics.resolution_queue.set(0)
+            self.save_caches()
+
+        if expired.is_set():
+            message: str = (
+                f"The session expired: {failed} items failed and {skipped} were not "
+                "started. Refresh the cookies"
+            )
+            if journal is not None:
+                message += f" and resume the run, the progress is saved in {journal.path}"
+            raise SessionExpiredError(message + ".")
+
+        if failed > 0 and resolution:
+            message: str = f"[red]{failed} items failed.[/red]"
+            if journal is not None:
+                message += f" They are journaled in {journal.path}, resume the run to retry only them."
+            self.reporter.message(message)
+
+    def _map(
+        self,
+        func: Callable[..., Any],
+        items: Iterable[Tuple],
+        description: str,
+        key: Optional[Callable[[Tuple], str]] = None,
+        course: Optional[Callable[[Tuple], str]] = None,
+        info: Optional[Callable[[Tuple], ItemInfo]] = None,
+    ) -> List[Any]:
+        """Call a function on each item in the thread pool, see _imap.
+
+        Args:
+            func (Callable[..., Any]): The function.
+            items (Iterable[Tuple]): The arguments of each call.
+            description (str): The description of the task.
+            key (Optional[Callable[[Tuple], str]], optional): Get the journal key
+                of an item from its arguments. Defaults to None.
+            course (Optional[Callable[[Tuple], str]], optional): Get the course of
+                an item from its arguments. Defaults to None.
+            info (Optional[Callable[[Tuple], ItemInfo]], optional): Get the
+                datetime, the academic year and the subject of an item from its
+                arguments, None where unknown. Defaults to None.
+
+        Returns:
+            List[Any]: The results, in completion order.
+        """
+        return list(self._imap(func, items, description, key, course, info))
+
+    def _crawl(
+        self,
+        links: List[str],
+        depth: int,
+        fetch_links: Callable[[str], List[str]],
+        is_page: Callable[[str], bool],
+        visited: Optional[Set[str]] = None,
+    ) -> List[str]:
+        """Crawl the pages linked by a page breadth first, up to a depth.
+
+        The pages of each level are fetched concurrently in the thread pool. A
+        page which cannot be fetched is reported and skipped, and at most
+        Config.CRAWL_MAX_PAGES pages are fetched.
+
+        Args:
+            links (List[str]): The links of the first page.
+            depth (int): How many levels of linked pages are crawled, 0 to crawl
+                nothing.
+            fetch_links (Callable[[str], List[str]]): Get the absolute links of a page.
+            is_page (Callable[[str], bool]): Check if a link is a page in the scope
+                of the crawl.
+            visited (Optional[Set[str]], optional): The pages already fetched, such
+                as the first page. Defaults to None.
+
+        Raises:
+            SessionExpiredError: If the session expired during the crawl.
+
+        Returns:
+            List[str]: The links of all the pages, without duplicates, in the order
+                they were found.
+        """
+        visited = set(visited) if visited is not None else set()
+        found: Dict[str, None] = dict.fromkeys(links)
+        new_links: List[str] = list(found.keys())
+        for level in range(1, depth + 1):
+            budget: int = Config.CRAWL_MAX_PAGES - len(visited)
+            frontier: List[str] = [
+                link for link in new_links if link not in visited and is_page(link)
+            ]
+            frontier = list(dict.fromkeys(frontier))[: max(0, budget)]
+            if len(frontier) == 0:
+                break
+            visited.update(frontier)
+            new_links = []
+            for page_links in self._imap(
+                fetch_links,
+                zip(frontier),
+                description=f"Crawling {len(frontier)} pages at depth {level}...",
+                resolution=False,
+            ):
+                for link in page_links:
+                    if link not in found:
+                        found[link] = None
+                        new_links.append(link)
+        if depth > 0:
+            self.reporter.message(
+                f"Crawled {len(visited)} pages, found {len(found)} links"
+            )
+        return list(found.keys())
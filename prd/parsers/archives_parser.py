@@ -1,15 +1,26 @@
 from datetime import datetime
 from itertools import repeat
-from multiprocessing.pool import ThreadPool
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 import requests
 import re
-from bs4 import BeautifulSoup, Tag
-from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
 
 from prd.utils import extract_academic_year_from_datetime
 from prd.parsers import Parser
-from prd.webex_api import Recording, extract_id_from_url, generate_recording_from_id
+from prd.parsers.abstract_parser import ItemInfo
+from prd.parsers.html_extraction import (
+    ArchivesRow,
+    extract_archives_rows,
+    iter_response_chunks,
+)
+from prd.reporter import Reporter
+from prd.journal import Journal
+from prd.cache import PersistentCache, get_cache
+from prd.webex_api import (
+    Recording,
+    SessionExpiredError,
+    TicketPool,
+    extract_id_from_url,
+)
 
 
 class ArchivesParser(Parser):
@@ -18,17 +29,43 @@ class ArchivesParser(Parser):
     def __init__(
         self,
         cookie_ticket: str,
-        cookie_SSL_JSESSIONID: str
+        cookie_SSL_JSESSIONID: str,
+        session: Optional[requests.Session] = None,
+        reporter: Optional[Reporter] = None,
+        journal: Optional[Journal] = None,
+        batch_metadata: bool = False,
+        ticket_pool: Optional[TicketPool] = None,
     ):
         """Create the parser.
 
         Args:
             cookie_ticket (str): The ticket cookie.
             cookie_SSL_JSESSIONID (str): The SSL_JSESSIONID cookie.
+            session (Optional[requests.Session], optional): The session used for all
+                the requests. Defaults to None.
+            reporter (Optional[Reporter], optional): Where the progress is reported.
+                Defaults to None, which prints to the terminal.
+            journal (Optional[Journal], optional): Where the resolved and failed
+                items are journaled. Defaults to None.
+            batch_metadata (bool, optional): True to get the information about the
+                videos from the pages of the recordings listing. Defaults to False.
+            ticket_pool (Optional[TicketPool], optional): The tickets of several
+                accounts across which the requests to the Webex API are spread.
+                Defaults to None.
         """
+        super().__init__(
+            session=session,
+            reporter=reporter,
+            journal=journal,
+            batch_metadata=batch_metadata,
+            ticket_pool=ticket_pool,
+        )
         self.cookie_ticket = cookie_ticket
         self.cookie_SSL_JSESSIONID = cookie_SSL_JSESSIONID
+        self.recman_cache: PersistentCache = get_cache("recman_links")
 
+    def _get_caches(self) -> List[PersistentCache]:
+        return super()._get_caches() + [self.recman_cache]
 
     def parse(self, url: str) -> List[Recording]:
         """Parse an url of the recording archives.
@@ -43,7 +80,45 @@ class ArchivesParser(Parser):
         Returns:
             List[Recording]: The list of recordings.
         """
-        # Option check
+        return list(self.iter_parse(url))
+
+    def iter_parse(self, url: str) -> Iterator[Recording]:
+        """Parse an url of the recording archives lazily.
+
+        Args:
+            url (str): The url of the recording archives.
+
+        Raises:
+            ValueError: If the url is not correct.
+            SessionExpiredError: If the ticket or the SSL_JSESSIONID cookie expired.
+            RuntimeError: If no recordings are found in the page.
+
+        Yields:
+            Iterator[Recording]: The recordings, in the order they are resolved.
+        """
+        self.check_url(url)
+        self.check_credentials()
+
+        with self.session.get(
+            url, cookies={"SSL_JSESSIONID": self.cookie_SSL_JSESSIONID}, stream=True
+        ) as res:
+            # Checked before downloading the page
+            self.check_session(res)
+            rows: List[ArchivesRow] = self.get_rows(iter_response_chunks(res))
+        self.reporter.message(f"There are {len(rows)} rows in the page")
+
+        yield from self.iter_parse_rows(rows, self.is_UserListActivity(url))
+
+    @staticmethod
+    def check_url(url: str) -> None:
+        """Check that an url is an url of the recording archives.
+
+        Args:
+            url (str): The url.
+
+        Raises:
+            ValueError: If the url is not correct.
+        """
         if not url.startswith(
             "https://www11.ceda.polimi.it/recman_frontend/recman_frontend/controller/"
         ):
@@ -51,78 +126,204 @@ class ArchivesParser(Parser):
                 f"The url must start with 'https://www11.ceda.polimi.it/recman_frontend/recman_frontend/controller/'."
             )
 
-        res: requests.Response = requests.get(
-            url, cookies={"SSL_JSESSIONID": self.cookie_SSL_JSESSIONID}
+    @staticmethod
+    def check_session(res: requests.Response) -> None:
+        """Check that a response of the archives was not redirected to the login.
+
+        Args:
+            res (requests.Response): The response.
+
+        Raises:
+            SessionExpiredError: If the SSL_JSESSIONID cookie expired.
+        """
+        if len(res.history) > 0 and not res.url.startswith(
+            "https://www11.ceda.polimi.it/recman_frontend/"
+        ):
+            raise SessionExpiredError(
+                "The SSL_JSESSIONID cookie expired, set it again."
+            )
+
+    @staticmethod
+    def is_UserListActivity(url: str) -> bool:
+        """Check if an archives url is a UserListActivity.do page.
+
+        Args:
+            url (str): The url of the recording archives.
+
+        Returns:
+            bool: True if the page is a UserListActivity.do page, False if it is an
+                ArchivioListActivity.do page.
+        """
+        return url.startswith(
+            "https://www11.ceda.polimi.it/recman_frontend/recman_frontend/controller/UserListActivity.do"
         )
-        soup: BeautifulSoup = BeautifulSoup(res.content, "html.parser")
-        rows: List[Tag] = soup.select("tbody.TableDati-tbody tr")
+
+    @staticmethod
+    def get_rows(content: Union[bytes, Iterable[str]]) -> List[ArchivesRow]:
+        """Get the rows of the recordings table of an archives page.
+
+        Args:
+            content (Union[bytes, Iterable[str]]): The content of the archives page,
+                or its decoded chunks.
+
+        Raises:
+            RuntimeError: If no recordings are found in the page.
+
+        Returns:
+            List[ArchivesRow]: The rows of the recordings table.
+        """
+        if isinstance(content, bytes):
+            content = [content]
+        rows: List[ArchivesRow] = extract_archives_rows(content)
 
         if len(rows) == 0:
             raise RuntimeError(
                 "Zero recordings were found, make sure SSL_JSESSIONID is correct."
             )
-        print(f"There are {len(rows)} rows in the page")
+        return rows
 
-        # Need to work for both UserListActivity.do and ArchivioListActivity.do
-        is_UserListActivity: bool = url.startswith(
-            "https://www11.ceda.polimi.it/recman_frontend/recman_frontend/controller/UserListActivity.do"
-        )
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            TimeElapsedColumn(),
-        ) as progress:
-            progress.add_task(
-                description="Generating recording download links...", total=None
-            )
-            pool: ThreadPool = ThreadPool()
-            recordings: List[Recording] = pool.starmap(
-                self._generate_recording_from_row,
-                zip(rows, repeat(is_UserListActivity)),
-            )
+    @staticmethod
+    def get_row_key(row: ArchivesRow) -> str:
+        """Get a key identifying a row of the recordings table.
 
-        return recordings
+        Args:
+            row (ArchivesRow): Row of the recordings table.
 
-    def _generate_recording_from_row(
-        self, row: Tag, is_UserListActivity: bool
-    ) -> Recording:
-        """Create a Recording object from a row of the recordings table.
+        Returns:
+            str: The recman redirection link of the row.
+        """
+        return row.link
+
+    @staticmethod
+    def get_row_course(row: ArchivesRow, is_UserListActivity: bool) -> str:
+        """Get the course of a row of the recordings table.
 
         Args:
-            row (Tag): Row of the recordings table.
+            row (ArchivesRow): Row of the recordings table.
             is_UserListActivity (bool): If the row is from a UserListActivity page.
 
         Returns:
-            Recording: Generated recording object.
+            str: The name of the course.
         """
-        cells = row.select("td")
+        return row.cells[2 if is_UserListActivity else 3].replace("\n", " ")
 
-        video_url: str = self._get_video_url_from_recman_redirection_link(
-            "https://www11.ceda.polimi.it" + cells[0].select_one("a.Link")["href"]
-        )
-        video_id: str = extract_id_from_url(video_url, ticket=self.cookie_ticket)
+    @staticmethod
+    def get_row_info(
+        row: ArchivesRow, is_UserListActivity: bool
+    ) -> Tuple[datetime, str, str]:
+        """Get the datetime, the academic year and the subject of a row of the
+        recordings table.
 
+        Args:
+            row (ArchivesRow): Row of the recordings table.
+            is_UserListActivity (bool): If the row is from a UserListActivity page.
+
+        Raises:
+            ValueError: If the datetime of the row is not valid.
+
+        Returns:
+            Tuple[datetime, str, str]: The datetime, the academic year and the
+                subject of the recording.
+        """
+        cells = row.cells
         if not is_UserListActivity:
             recording_datetime: datetime = datetime.strptime(
-                cells[2].text.strip(), "%d/%m/%Y %H:%M"
+                cells[2].strip(), "%d/%m/%Y %H:%M"
             )
-            course: str = cells[3].text
-            subject: str = cells[5].text
-            academic_year: str = cells[1].text.replace(" / ", "-")
+            subject: str = cells[5]
+            academic_year: str = cells[1].replace(" / ", "-")
         else:
             recording_datetime: datetime = datetime.strptime(
-                cells[1].text.strip(), "%d/%m/%Y %H:%M"
+                cells[1].strip(), "%d/%m/%Y %H:%M"
             )
-            course: str = cells[2].text.replace("\n", " ")
-            subject: str = cells[4].text.replace("\n", " ")
+            subject: str = cells[4]
             academic_year = extract_academic_year_from_datetime(recording_datetime)
+        return (recording_datetime, academic_year, subject.replace("\n", " "))
 
-        course: str = course.replace("\n", " ")
-        subject: str = subject.replace("\n", " ")
+    def _get_known_row_info(
+        self, row: ArchivesRow, is_UserListActivity: bool
+    ) -> ItemInfo:
+        """Get the information of a row used to filter it before resolving it.
 
-        recording: Recording = generate_recording_from_id(
-            video_id=video_id,
+        Args:
+            row (ArchivesRow): Row of the recordings table.
+            is_UserListActivity (bool): If the row is from a UserListActivity page.
+
+        Returns:
+            ItemInfo: The datetime, the academic year and the subject, None if the
+                row is not valid, so that it is filtered once resolved.
+        """
+        try:
+            return self.get_row_info(row, is_UserListActivity)
+        except (ValueError, IndexError):
+            return (None, None, None)
+
+    def parse_rows(
+        self, rows: List[ArchivesRow], is_UserListActivity: bool
+    ) -> List[Recording]:
+        """Generate the recordings from the rows of the recordings table.
+
+        Args:
+            rows (List[ArchivesRow]): Rows of the recordings table.
+            is_UserListActivity (bool): If the rows are from a UserListActivity page.
+
+        Returns:
+            List[Recording]: The list of recordings.
+        """
+        return list(self.iter_parse_rows(rows, is_UserListActivity))
+
+    def iter_parse_rows(
+        self, rows: List[ArchivesRow], is_UserListActivity: bool
+    ) -> Iterator[Recording]:
+        """Generate the recordings from the rows of the recordings table lazily.
+
+        Args:
+            rows (List[ArchivesRow]): Rows of the recordings table.
+            is_UserListActivity (bool): If the rows are from a UserListActivity page.
+
+        Yields:
+            Iterator[Recording]: The recordings, in the order they are resolved.
+        """
+        self.check_credentials()
+        yield from self._imap(
+            self._generate_recording_from_row,
+            zip(rows, repeat(is_UserListActivity)),
+            description="Generating recording download links...",
+            key=lambda args: self.get_row_key(args[0]),
+            course=lambda args: self.get_row_course(*args),
+            info=lambda args: self._get_known_row_info(*args),
+        )
+
+    def _generate_recording_from_row(
+        self, row: ArchivesRow, is_UserListActivity: bool
+    ) -> Recording:
+        """Create a Recording object from a row of the recordings table.
+
+        Args:
+            row (ArchivesRow): Row of the recordings table.
+            is_UserListActivity (bool): If the row is from a UserListActivity page.
+
+        Returns:
+            Recording: Generated recording object.
+        """
+        video_url: str = self._get_video_url_from_recman_redirection_link(
+            "https://www11.ceda.polimi.it" + row.link
+        )
+        video_id: str = extract_id_from_url(
+            video_url,
             ticket=self.cookie_ticket,
+            session=self.session,
+            cache=self.ldr_cache,
+            ticket_pool=self.ticket_pool,
+        )
+
+        recording_datetime, academic_year, subject = self.get_row_info(
+            row, is_UserListActivity
+        )
+        course: str = self.get_row_course(row, is_UserListActivity)
+
+        recording: Recording = self._generate_recording_from_id(
+            video_id=video_id,
             academic_year=academic_year,
             recording_datetime=recording_datetime,
             course=course,
@@ -141,9 +342,13 @@ class ArchivesParser(Parser):
             str: The url of the video.
 
         Raises:
+            SessionExpiredError: If the SSL_JSESSIONID cookie expired.
             RuntimeError: If unable to extract url from redirection link.
         """
-        res = requests.get(link, cookies={"SSL_JSESSIONID": self.cookie_SSL_JSESSIONID})
+        if link in self.recman_cache:
+            return self.recman_cache.get(link)
+        res = self.session.get(link, cookies={"SSL_JSESSIONID": self.cookie_SSL_JSESSIONID})
+        self.check_session(res)
         id_search = re.search(
             "location\.href='(.*)';",
             res.text,
@@ -152,4 +357,5 @@ class ArchivesParser(Parser):
             raise RuntimeError(
                 "Was not able to extract video url from recman redirection link. Retry."
             )
+        self.recman_cache.set(link, id_search.group(1))
         return id_search.group(1)
@@ -0,0 +1,336 @@
+import codecs
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from urllib.parse import urldefrag, urljoin
+import requests
+from bs4 import BeautifulSoup, Tag
+
+from prd.config import Config
+
+T = TypeVar("T")
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock: threading.Lock = threading.Lock()
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET: re.Pattern = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?([A-Za-z0-9_.:-]+)""", re.IGNORECASE
+)
+# The bytes at the beginning of a page where the <meta> charset is looked for
+_META_CHARSET_WINDOW: int = 1024
+
+
+class ArchivesRow(NamedTuple):
+    """A row of the recordings table of an archives page."""
+
+    cells: Tuple[str, ...]
+    link: str
+
+
+class _ArchivesRowsExtractor(HTMLParser):
+    """Incremental parser keeping only the rows of the recordings table."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows: List[ArchivesRow] = []
+        self._in_tbody: bool = False
+        self._in_row: bool = False
+        self._cell: Optional[List[str]] = None
+        self._cells: List[str] = []
+        self._link: Optional[str] = None
+
+    def _end_cell(self) -> None:
+        if self._cell is not None:
+            self._cells.append("".join(self._cell))
+            self._cell = None
+
+    def _end_row(self) -> None:
+        self._end_cell()
+        if self._in_row and self._link is not None:
+            self.rows.append(ArchivesRow(tuple(self._cells), self._link))
+        self._in_row = False
+        self._cells = []
+        self._link = None
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "tbody":
+            classes: str = dict(attrs).get("class") or ""
+            self._in_tbody = "TableDati-tbody" in classes.split()
+        elif not self._in_tbody:
+            return
+        elif tag == "tr":
+            self._end_row()
+            self._in_row = True
+        elif tag == "td" and self._in_row:
+            self._end_cell()
+            self._cell = []
+        elif tag == "a" and self._cell is not None and self._link is None:
+            attributes = dict(attrs)
+            classes: str = attributes.get("class") or ""
+            if "Link" in classes.split() and attributes.get("href") is not None:
+                self._link = attributes["href"]
+
+    def handle_endtag(self, tag: str) -> None:
+        if not self._in_tbody:
+            return
+        if tag == "td":
+            self._end_cell()
+        elif tag == "tr":
+            self._end_row()
+        elif tag == "tbody":
+            self._end_row()
+            self._in_tbody = False
+
+    def handle_data(self, data: str) -> None:
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+class _LinksExtractor(HTMLParser):
+    """Incremental parser keeping only the href of the anchors."""
+
+    def __init__(self):
+        super().__init__()
+        self.links: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "a":
+            href: Optional[str] = dict(attrs).get("href")
+            if href is not None:
+                self.links.append(href)
+
+
+def get_meta_charset(head: bytes) -> Optional[str]:
+    """Find the charset declared by a <meta> tag of a page.
+
+    Args:
+        head (bytes): The beginning of the page.
+
+    Returns:
+        Optional[str]: The charset, None if it is not declared or not known.
+    """
+    match: Optional[re.Match] = _META_CHARSET.search(head)
+    if match is None:
+        return None
+    charset: str = match.group(1).decode("ascii")
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
+
+
+def iter_response_chunks(res: requests.Response) -> Iterator[str]:
+    """Decode the content of a streamed response a chunk at a time.
+
+    The charset of the Content-Type header is used if there is one, otherwise
+    the one of the <meta> tag in the first kilobytes, otherwise utf-8. requests
+    assumes ISO-8859-1 for any text without a charset, which is not used.
+
+    Args:
+        res (requests.Response): The response, requested with stream=True.
+
+    Yields:
+        Iterator[str]: The decoded chunks.
+    """
+    chunks: Iterator[bytes] = res.iter_content(chunk_size=Config.HTML_CHUNK_SIZE)
+    head: bytes = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= _META_CHARSET_WINDOW:
+            break
+    encoding: Optional[str] = None
+    if "charset" in res.headers.get("content-type", "").lower():
+        encoding = res.encoding
+    if encoding is None:
+        encoding = get_meta_charset(head) or "utf-8"
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    yield decoder.decode(head)
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def iter_file_chunks(f: IO[str]) -> Iterator[str]:
+    """Read a text file a chunk at a time.
+
+    Args:
+        f (IO[str]): The file.
+
+    Yields:
+        Iterator[str]: The chunks.
+    """
+    while True:
+        chunk: str = f.read(Config.HTML_CHUNK_SIZE)
+        if chunk == "":
+            return
+        yield chunk
+
+
+def _feed(parser: HTMLParser, chunks: Iterable[Union[str, bytes]]) -> None:
+    """Feed the chunks of a page to an incremental parser.
+
+    Args:
+        parser (HTMLParser): The parser.
+        chunks (Iterable[Union[str, bytes]]): The chunks, bytes are decoded as utf-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        parser.feed(chunk)
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+
+
+def extract_archives_rows(chunks: Iterable[Union[str, bytes]]) -> List[ArchivesRow]:
+    """Extract the rows of the recordings table of an archives page.
+
+    The page is parsed incrementally and no tree is built: only the text of the
+    cells and the recman redirection link of each row are kept.
+
+    Args:
+        chunks (Iterable[Union[str, bytes]]): The chunks of the page.
+
+    Returns:
+        List[ArchivesRow]: The rows with a link, in the order of the page.
+    """
+    parser: _ArchivesRowsExtractor = _ArchivesRowsExtractor()
+    _feed(parser, chunks)
+    return parser.rows
+
+
+def extract_links(chunks: Iterable[Union[str, bytes]]) -> List[str]:
+    """Extract the href of the anchors of a webpage.
+
+    The page is parsed incrementally and no tree is built.
+
+    Args:
+        chunks (Iterable[Union[str, bytes]]): The chunks of the page.
+
+    Returns:
+        List[str]: The links, in the order of the page.
+    """
+    parser: _LinksExtractor = _LinksExtractor()
+    _feed(parser, chunks)
+    return parser.links
+
+
+def extract_file_links(path: str) -> List[str]:
+    """Extract the href of the anchors of an HTML file.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        List[str]: The links, in the order of the page.
+    """
+    with open(path) as f:
+        return extract_links(iter_file_chunks(f))
+
+
+def extract_webeep_main_links(content: bytes, url: str) -> List[str]:
+    """Extract the links in the main region of a Webeep page.
+
+    Args:
+        content (bytes): The content of the Webeep page.
+        url (str): The url of the page.
+
+    Returns:
+        List[str]: The absolute links of the page.
+    """
+    soup: BeautifulSoup = BeautifulSoup(content, "html.parser")
+    return [
+        urldefrag(urljoin(url, a["href"]))[0]
+        for a in soup.select("#region-main a")
+        if a.has_attr("href")
+    ]
+
+
+def extract_webeep_recording(content: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """Extract the link to the video and the subject of a Webeep redirection page.
+
+    Args:
+        content (bytes): The content of the redirection page.
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: The link to the video, None if the page
+            is not a recording, and the subject.
+    """
+    soup: BeautifulSoup = BeautifulSoup(content, "html.parser")
+    video_url_anchor: Optional[Tag] = soup.select_one(".urlworkaround a", href=True)
+    if video_url_anchor is None:
+        return (None, None)
+    return (video_url_anchor["href"], soup.select_one("#page-header h4").text)
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Get the process pool the HTML extraction runs in.
+
+    The pool is created on first use and shared by the whole process, the
+    workers are spawned so they do not inherit the threads of the parsers.
+
+    Returns:
+        Optional[ProcessPoolExecutor]: The pool, None if
+            Config.HTML_EXTRACTION_PROCESSES is 0.
+    """
+    global _process_pool
+    if Config.HTML_EXTRACTION_PROCESSES == 0:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                Config.HTML_EXTRACTION_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def run_extraction(func: Callable[..., T], *args: Any) -> T:
+    """Run an extraction function in the process pool.
+
+    The calling thread waits without holding the GIL, so the other threads keep
+    doing their requests while the page is parsed on another core.
+
+    Args:
+        func (Callable[..., T]): The function, defined at the top level of a module.
+        *args (Any): The arguments, they must be picklable.
+
+    Returns:
+        T: The result of the function.
+    """
+    pool: Optional[ProcessPoolExecutor] = get_process_pool()
+    if pool is None:
+        return func(*args)
+    return pool.submit(func, *args).result()
+
+
+def map_extraction(func: Callable[..., T], *iterables: Iterable[Any]) -> List[T]:
+    """Run an extraction function on many inputs in parallel in the process pool.
+
+    Args:
+        func (Callable[..., T]): The function, defined at the top level of a module.
+        *iterables (Iterable[Any]): The arguments of each call, as in map().
+
+    Returns:
+        List[T]: The results, in the order of the inputs.
+    """
+    pool: Optional[ProcessPoolExecutor] = get_process_pool()
+    if pool is None:
+        return list(map(func, *iterables))
+    return list(pool.map(func, *iterables))
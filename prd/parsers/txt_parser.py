@@ -1,12 +1,13 @@
-from multiprocessing.pool import ThreadPool
 from itertools import repeat
 from pathlib import Path
-from typing import List, Optional
-from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+from typing import Iterator, List, Optional
+import requests
 
-from prd.webex_api import Recording
-from prd.webex_api import extract_id_from_url, generate_recording_from_id
+from prd.webex_api import Recording, TicketPool
+from prd.webex_api import extract_id_from_url
 from prd.parsers import Parser
+from prd.reporter import Reporter
+from prd.journal import Journal
 
 
 class TxtParser(Parser):
@@ -14,16 +15,38 @@ class TxtParser(Parser):
 
     def __init__(
         self,
-        cookie_ticket: str
+        cookie_ticket: str,
+        session: Optional[requests.Session] = None,
+        reporter: Optional[Reporter] = None,
+        journal: Optional[Journal] = None,
+        batch_metadata: bool = False,
+        ticket_pool: Optional[TicketPool] = None,
     ):
         """Create the parser.
 
         Args:
             cookie_ticket (str): The ticket cookie.
+            session (Optional[requests.Session], optional): The session used for all
+                the requests. Defaults to None.
+            reporter (Optional[Reporter], optional): Where the progress is reported.
+                Defaults to None, which prints to the terminal.
+            journal (Optional[Journal], optional): Where the resolved and failed
+                items are journaled. Defaults to None.
+            batch_metadata (bool, optional): True to get the information about the
+                videos from the pages of the recordings listing. Defaults to False.
+            ticket_pool (Optional[TicketPool], optional): The tickets of several
+                accounts across which the requests to the Webex API are spread.
+                Defaults to None.
         """
+        super().__init__(
+            session=session,
+            reporter=reporter,
+            journal=journal,
+            batch_metadata=batch_metadata,
+            ticket_pool=ticket_pool,
+        )
         self.cookie_ticket = cookie_ticket
 
-
     def parse(self, file: Path, course: str, academic_year: Optional[str] = None) -> List[Recording]:
         """Get the recordings from the TXT file.
 
@@ -35,32 +58,43 @@ class TxtParser(Parser):
         Returns:
             List[Recording]: Recording objects extracted from the file.
         """
+        return list(self.iter_parse(file, course, academic_year))
+
+    def iter_parse(self, file: Path, course: str, academic_year: Optional[str] = None) -> Iterator[Recording]:
+        """Get the recordings from the TXT file lazily.
+
+        Args:
+            file (Path): The file containing the html of the recman page.
+            course (str): The course name.
+            academic_year (Optional[str], optional): The academic year in the format "2021-22". Defaults to None.
+
+        Yields:
+            Iterator[Recording]: Recording objects, in the order they are resolved.
+        """
+        self.check_credentials()
+
         # Get video ids from file
         video_ids: List[str] = []
         with open(file) as f:
             for i, line in enumerate(f):
                 line = line.rstrip()
                 if line.startswith("http"):
-                    video_ids.append(extract_id_from_url(url=line, ticket=self.cookie_ticket))
+                    video_ids.append(extract_id_from_url(url=line, ticket=self.cookie_ticket, session=self.session, cache=self.ldr_cache, ticket_pool=self.ticket_pool))
                 elif len(line) == 32:
                     video_ids.append(line)
                 elif len(line) != 32 and len(line) > 0:
-                    print(
+                    self.reporter.message(
                         f'[red]Invalid line found, line number {i+1} is "{line}",[/red] Continuing...'
                     )
 
-        print(f"Found {len(video_ids)} urls in the input file")
-
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            TimeElapsedColumn(),
-        ) as progress:
-            progress.add_task(description="Generating recording download links...", total=None)
-            pool: ThreadPool = ThreadPool()
-            recordings: List[Recording] = pool.starmap(
-                generate_recording_from_id,
-                zip(video_ids, repeat(self.cookie_ticket), repeat(course), repeat(academic_year)),
-            )
+        self.reporter.message(f"Found {len(video_ids)} urls in the input file")
+        self._prefetch_metadata(video_ids)
 
-        return recordings
+        yield from self._imap(
+            self._generate_recording_from_id,
+            zip(video_ids, repeat(course), repeat(academic_year)),
+            description="Generating recording download links...",
+            key=lambda args: f"{args[1]} {args[0]}",
+            course=lambda args: args[1],
+            info=lambda args: (None, args[2], None),
+        )
@@ -1,14 +1,27 @@
-from multiprocessing.pool import ThreadPool
 from itertools import repeat
-from typing import List, Tuple, Optional
+from urllib.parse import parse_qs, urlparse
+from typing import Iterator, List, Tuple, Optional
 import requests
 import re
-from bs4 import BeautifulSoup, Tag
-from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+from bs4 import BeautifulSoup
 
 
+from prd.config import Config
+from prd.cache import PersistentCache, get_cache
 from prd.parsers import Parser
-from prd.webex_api import Recording, extract_id_from_url, generate_recording_from_id
+from prd.parsers.html_extraction import (
+    extract_webeep_main_links,
+    extract_webeep_recording,
+    run_extraction,
+)
+from prd.reporter import Reporter
+from prd.journal import Journal
+from prd.webex_api import (
+    Recording,
+    SessionExpiredError,
+    TicketPool,
+    extract_id_from_url,
+)
 
 
 class WebeepParser(Parser):
@@ -18,64 +31,320 @@ class WebeepParser(Parser):
         self,
         cookie_ticket: str,
         cookie_MoodleSession: str,
+        session: Optional[requests.Session] = None,
+        reporter: Optional[Reporter] = None,
+        journal: Optional[Journal] = None,
+        batch_metadata: bool = False,
+        ticket_pool: Optional[TicketPool] = None,
     ):
         """Create the parser.
 
         Args:
             cookie_ticket (str): The ticket cookie.
             cookie_MoodleSession (str): The MoodleSession cookie.
+            session (Optional[requests.Session], optional): The session used for all
+                the requests. Defaults to None.
+            reporter (Optional[Reporter], optional): Where the progress is reported.
+                Defaults to None, which prints to the terminal.
+            journal (Optional[Journal], optional): Where the resolved and failed
+                items are journaled. Defaults to None.
+            batch_metadata (bool, optional): True to get the information about the
+                videos from the pages of the recordings listing. Defaults to False.
+            ticket_pool (Optional[TicketPool], optional): The tickets of several
+                accounts across which the requests to the Webex API are spread.
+                Defaults to None.
         """
+        super().__init__(
+            session=session,
+            reporter=reporter,
+            journal=journal,
+            batch_metadata=batch_metadata,
+            ticket_pool=ticket_pool,
+        )
         self.cookie_ticket = cookie_ticket
         self.cookie_MoodleSession = cookie_MoodleSession
+        self.cache: PersistentCache = get_cache("webeep_links")
 
-    def _generate_recording_from_redirection_link(
-        self, link: str, course: str, academic_year: str
-    ) -> Tuple[bool, Optional[Recording]]:
-        """Create a Recording object from a Webeep redirection link.
+    def _get_caches(self) -> List[PersistentCache]:
+        return super()._get_caches() + [self.cache]
+
+    @staticmethod
+    def _is_possible_recording_link(link: str) -> bool:
+        """Pre-classify a Webeep link from the module type in its url.
+
+        Recordings are linked with "url" modules, so links to other modules
+        (resources, forums, quizzes...) and to the other Webeep pages are never
+        recordings.
+
+        Args:
+            link (str): Webeep link.
+
+        Returns:
+            bool: False if the link is surely not a recording.
+        """
+        module_search = re.search(r"/mod/([a-z]+)/", link)
+        if module_search is None:
+            return not link.startswith("https://webeep.polimi.it/")
+        return module_search.group(1) in Config.WEBEEP_RECORDING_MODULES
+
+    @staticmethod
+    def _is_course_page(link: str, url: str) -> bool:
+        """Check if a link is a page of the same course of a Webeep url, which can
+        link recordings: a section of the course, a page, a folder or a book.
+
+        Args:
+            link (str): Webeep link.
+            url (str): The url of the course page.
+
+        Returns:
+            bool: True if the link should be crawled.
+        """
+        if re.match(
+            r"https://webeep\.polimi\.it/mod/(page|folder|book)/view\.php", link
+        ):
+            return True
+        course_id = parse_qs(urlparse(url).query).get("id")
+        return (
+            link.startswith("https://webeep.polimi.it/course/view.php")
+            and parse_qs(urlparse(link).query).get("id") == course_id
+        )
+
+    def _fetch_links(self, url: str) -> List[str]:
+        """Get the links in the main region of a Webeep page.
+
+        Args:
+            url (str): The url of the page.
+
+        Raises:
+            SessionExpiredError: If the MoodleSession cookie expired.
+            RuntimeError: If the page cannot be opened.
+
+        Returns:
+            List[str]: The absolute links of the page.
+        """
+        res: requests.Response = self.session.get(
+            url,
+            cookies={"MoodleSession": self.cookie_MoodleSession},
+            allow_redirects=False,
+        )
+        if res.status_code == 303:
+            raise SessionExpiredError("The MoodleSession cookie expired, set it again.")
+        if res.status_code != 200:
+            raise RuntimeError(f"Unable to open the page, got status {res.status_code}.")
+        return run_extraction(extract_webeep_main_links, res.content, url)
+
+    @staticmethod
+    def get_page_links(content: bytes, url: str) -> List[str]:
+        """Get the links in the main region of a Webeep page.
+
+        Args:
+            content (bytes): The content of the Webeep page.
+            url (str): The url of the page.
+
+        Returns:
+            List[str]: The absolute links of the page.
+        """
+        return extract_webeep_main_links(content, url)
+
+    def _get_video_id_from_redirection_link(self, link: str) -> Optional[dict]:
+        """Get the video id and the subject of a Webeep redirection link.
+
+        The result is cached: a link is mapped either to None, if it is not a
+        recording, or to the video id and the subject.
 
         Args:
             link (str): Webeep redirection link to the recording.
-            course (str): The name of the course.
-            academic_year (str): The course academic year in the format "2021-22".
+
+        Raises:
+            SessionExpiredError: If the MoodleSession cookie expired.
 
         Returns:
-            Tuple(bool, Optional[Recording]): The first element indicates if a
-                recording has been found, the second is the Recording object.
+            Optional[dict]: None if the link is not a recording, otherwise a
+                dict with the keys "video_id" and "subject".
         """
-        res: requests.Response = requests.get(
+        if not self._is_possible_recording_link(link):
+            return None
+        if link in self.cache:
+            return self.cache.get(link)
+
+        # A Webex link found by the crawl, the subject is the title of the video
+        if not link.startswith("https://webeep.polimi.it/"):
+            try:
+                video_id: str = extract_id_from_url(
+                    url=link,
+                    ticket=self.cookie_ticket,
+                    session=self.session,
+                    cache=self.ldr_cache,
+                    ticket_pool=self.ticket_pool,
+                )
+            except ValueError:
+                self.cache.set(link, None)
+                return None
+            self.cache.set(link, {"video_id": video_id, "subject": None})
+            return self.cache.get(link)
+
+        res: requests.Response = self.session.get(
             link, cookies={"MoodleSession": self.cookie_MoodleSession}
         )
-        soup = BeautifulSoup(res.content, "html.parser")
-
-        video_url_anchor: Tag | None = soup.select_one(".urlworkaround a", href=True)
-        if video_url_anchor is None:
-            return (False, None)
+        if res.url.startswith("https://webeep.polimi.it/login/"):
+            raise SessionExpiredError("The MoodleSession cookie expired, set it again.")
+        # A redirection means the session expired: never cache it
+        is_cacheable: bool = res.status_code == 200 and len(res.history) == 0
+        # Parsed in another process, the other threads keep doing requests
+        video_url, subject = run_extraction(extract_webeep_recording, res.content)
+        if video_url is None:
+            if is_cacheable:
+                self.cache.set(link, None)
+            return None
 
-        video_url: str = soup.select_one(".urlworkaround a", href=True)["href"]
         try:
             video_id: str = extract_id_from_url(
-                url=video_url, ticket=self.cookie_ticket
+                url=video_url,
+                ticket=self.cookie_ticket,
+                session=self.session,
+                cache=self.ldr_cache,
+                ticket_pool=self.ticket_pool,
             )
         except ValueError:
-            return (False, None)
+            self.cache.set(link, None)
+            return None
 
-        subject: str = soup.select_one("#page-header h4").text
+        result: dict = {
+            "video_id": video_id,
+            "subject": subject,
+        }
+        self.cache.set(link, result)
+        return result
 
-        recording: Recording = generate_recording_from_id(
-            video_id=video_id,
-            ticket=self.cookie_ticket,
+    def _get_cached_subject(self, link: str) -> Optional[str]:
+        """Get the subject of a recording from the cache, without any request.
+
+        Args:
+            link (str): Webeep redirection link to the recording.
+
+        Returns:
+            Optional[str]: The subject, None if the link is not cached.
+        """
+        result: Optional[dict] = self.cache.get(link) if link in self.cache else None
+        return result["subject"] if result is not None else None
+
+    def _generate_recording_from_redirection_link(
+        self, link: str, course: str, academic_year: str
+    ) -> Optional[Recording]:
+        """Create a Recording object from a Webeep redirection link.
+
+        Args:
+            link (str): Webeep redirection link to the recording.
+            course (str): The name of the course.
+            academic_year (str): The course academic year in the format "2021-22".
+
+        Returns:
+            Optional[Recording]: The Recording object, None if the link is not a
+                recording.
+        """
+        result: Optional[dict] = self._get_video_id_from_redirection_link(link)
+        if result is None:
+            return None
+
+        recording: Recording = self._generate_recording_from_id(
+            video_id=result["video_id"],
             academic_year=academic_year,
             course=course,
-            subject=subject,
+            subject=result["subject"],
         )
 
-        return (True, recording)
+        return recording
+
+    @staticmethod
+    def check_url(url: str) -> None:
+        """Check that an url is a Webeep url.
+
+        Args:
+            url (str): The url.
+
+        Raises:
+            ValueError: If the url is not correct.
+        """
+        if not url.startswith("https://webeep.polimi.it/"):
+            raise ValueError("The url must start with 'https://webeep.polimi.it/'.")
+
+    @staticmethod
+    def get_links(content: bytes) -> Tuple[str, str, List[str]]:
+        """Get the course and the links of a Webeep page.
+
+        Args:
+            content (bytes): The content of the Webeep page.
+
+        Returns:
+            Tuple[str, str, List[str]]: The course name, the academic year and the
+                redirection links of the page.
+        """
+        soup: BeautifulSoup = BeautifulSoup(content, "html.parser")
+        course: str = soup.select_one("#page-header h2").text
+        academic_year: str = re.search('\s\[(\d+-\d+)\]', course).group(1)
+        course = re.sub(r'\s\[\d+-\d+\]', '', course)
+
+        redirection_links: List[str] = []
+        for a in soup.select(".single-section a.aalink", href=True):
+            redirection_links.append(a["href"])
+        return (course, academic_year, redirection_links)
+
+    def parse_links(
+        self, redirection_links: List[str], course: str, academic_year: str
+    ) -> List[Recording]:
+        """Generate the recordings from Webeep redirection links.
+
+        Args:
+            redirection_links (List[str]): Webeep redirection links.
+            course (str): The name of the course.
+            academic_year (str): The course academic year in the format "2021-22".
+
+        Returns:
+            List[Recording]: Recording objects.
+        """
+        return list(self.iter_parse_links(redirection_links, course, academic_year))
+
+    def iter_parse_links(
+        self, redirection_links: List[str], course: str, academic_year: str
+    ) -> Iterator[Recording]:
+        """Generate the recordings from Webeep redirection links lazily.
+
+        Args:
+            redirection_links (List[str]): Webeep redirection links.
+            course (str): The name of the course.
+            academic_year (str): The course academic year in the format "2021-22".
+
+        Yields:
+            Iterator[Recording]: Recording objects, in the order they are resolved.
+        """
+        self.check_credentials()
+        # Known non-recording links are cached as None
+        redirection_links = [
+            link
+            for link in redirection_links
+            if self.cache.get(link, True) is not None
+            and self._is_possible_recording_link(link)
+        ]
+        self.reporter.message(f"{len(redirection_links)} links could be recordings.")
+
+        for recording in self._imap(
+            self._generate_recording_from_redirection_link,
+            zip(redirection_links, repeat(course), repeat(academic_year)),
+            description="Generating recording download links...",
+            key=lambda args: args[0],
+            course=lambda args: args[1],
+            info=lambda args: (None, args[2], self._get_cached_subject(args[0])),
+        ):
+            if recording is not None:
+                yield recording
 
-    def parse(self, url: str) -> List[Recording]:
+    def parse(self, url: str, depth: int = 0) -> List[Recording]:
         """Get the recordings from the Webeep page.
 
         Args:
             url (str): The Webeep url containing the links to the recordings.
+            depth (int, optional): How many levels of sections, pages, folders and
+                books of the course linked by the page are crawled. Defaults to 0.
 
         Raises:
             RuntimeError: if unable to open the Webeep page.
@@ -84,44 +353,50 @@ class WebeepParser(Parser):
         Returns:
             List[Recording]: Recording objects.
         """
-        if not url.startswith("https://webeep.polimi.it/"):
-            raise ValueError("The url must start with 'https://webeep.polimi.it/'.")
+        return list(self.iter_parse(url, depth))
 
-        redirection_links: List[str] = []
-        res: requests.Response = requests.get(
+    def iter_parse(self, url: str, depth: int = 0) -> Iterator[Recording]:
+        """Get the recordings from the Webeep page lazily.
+
+        The links found in all the crawled pages are resolved together.
+
+        Args:
+            url (str): The Webeep url containing the links to the recordings.
+            depth (int, optional): How many levels of sections, pages, folders and
+                books of the course linked by the page are crawled. Defaults to 0.
+
+        Raises:
+            SessionExpiredError: If the ticket or the MoodleSession cookie expired.
+            ValueError: If the url is not correct.
+
+        Yields:
+            Iterator[Recording]: Recording objects, in the order they are resolved.
+        """
+        self.check_url(url)
+        self.check_credentials()
+
+        res: requests.Response = self.session.get(
             url,
             cookies={"MoodleSession": self.cookie_MoodleSession},
             allow_redirects=False,
         )
         if res.status_code == 303:
-            raise RuntimeError(
+            raise SessionExpiredError(
                 "Unable to open the Webeep page, check MoodleSession cookie."
             )
-        soup: BeautifulSoup = BeautifulSoup(res.content, "html.parser")
-        course: str = soup.select_one("#page-header h2").text
-        academic_year: str = re.search('\s\[(\d+-\d+)\]', course).group(1)
-        course = re.sub(r'\s\[\d+-\d+\]', '', course)
-
-        for a in soup.select(".single-section a.aalink", href=True):
-            redirection_links.append(a["href"])
-        print(
+        course, academic_year, redirection_links = self.get_links(res.content)
+        self.reporter.message(
             f"Found {len(redirection_links)} links in the page (not all are recordings)."
         )
-
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            TimeElapsedColumn(),
-        ) as progress:
-            progress.add_task(
-                description="Generating recording download links...", total=None
-            )
-            pool: ThreadPool = ThreadPool()
-            recordings: List[Tuple(bool, Optional[Recording])] = pool.starmap(
-                self._generate_recording_from_redirection_link,
-                zip(redirection_links, repeat(course), repeat(academic_year)),
+        if depth > 0:
+            is_page = lambda link: self._is_course_page(link, url)
+            links: List[str] = self._crawl(
+                redirection_links + self.get_page_links(res.content, url),
+                depth,
+                self._fetch_links,
+                is_page,
+                visited={url},
             )
-            recordings = list(filter(lambda item: item[0] == True, recordings))
-            recordings = [r[1] for r in recordings]
+            redirection_links = [link for link in links if not is_page(link)]
 
-        return recordings
+        yield from self.iter_parse_links(redirection_links, course, academic_year)
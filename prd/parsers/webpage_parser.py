@@ -1,85 +1,126 @@
 from pathlib import Path
-from typing import List, Tuple, Optional
-from multiprocessing.pool import ThreadPool
+from typing import Iterator, List, Optional, Tuple
 from itertools import repeat
+from urllib.parse import urldefrag, urljoin, urlparse
 import re
 import requests
-from bs4 import BeautifulSoup, Tag
-from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+from bs4 import BeautifulSoup
 
 from prd.parsers import Parser
-from prd.webex_api import Recording
-from prd.webex_api import extract_id_from_url, generate_recording_from_id
+from prd.parsers.html_extraction import (
+    extract_file_links,
+    extract_links,
+    iter_response_chunks,
+    map_extraction,
+    run_extraction,
+)
+from prd.reporter import Reporter
+from prd.journal import Journal
+from prd.webex_api import Recording, TicketPool
+from prd.webex_api import extract_id_from_url
 
 
 class WebpageParser(Parser):
     """Class to parse webpages."""
 
-    def __init__(self, cookie_ticket: str):
+    # Links which are never followed by the crawl
+    FILE_EXTENSIONS: Tuple[str, ...] = (
+        ".pdf",
+        ".zip",
+        ".mp4",
+        ".mp3",
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".ppt",
+        ".pptx",
+        ".doc",
+        ".docx",
+        ".xls",
+        ".xlsx",
+    )
+
+    def __init__(
+        self,
+        cookie_ticket: str,
+        session: Optional[requests.Session] = None,
+        reporter: Optional[Reporter] = None,
+        journal: Optional[Journal] = None,
+        batch_metadata: bool = False,
+        ticket_pool: Optional[TicketPool] = None,
+    ):
         """Create the parser.
 
         Args:
             cookie_ticket (str): The ticket cookie.
+            session (Optional[requests.Session], optional): The session used for all
+                the requests. Defaults to None.
+            reporter (Optional[Reporter], optional): Where the progress is reported.
+                Defaults to None, which prints to the terminal.
+            journal (Optional[Journal], optional): Where the resolved and failed
+                items are journaled. Defaults to None.
+            batch_metadata (bool, optional): True to get the information about the
+                videos from the pages of the recordings listing. Defaults to False.
+            ticket_pool (Optional[TicketPool], optional): The tickets of several
+                accounts across which the requests to the Webex API are spread.
+                Defaults to None.
         """
+        super().__init__(
+            session=session,
+            reporter=reporter,
+            journal=journal,
+            batch_metadata=batch_metadata,
+            ticket_pool=ticket_pool,
+        )
         self.cookie_ticket = cookie_ticket
 
-    def _get_id_from_anchor(self, anchor: Tag) -> Tuple[bool, Optional[str]]:
+    def _get_id_from_link(self, link: str) -> Optional[str]:
         """
-        Get a video id from an anchor, if the link is to Webex.
+        Get a video id from a link, if the link is to Webex.
 
         Args:
-            anchor (Tag): The anchor tag.
+            link (str): The href of an anchor.
 
         Returns:
-            Tuple(bool, Optional[Recording]): The first element indicates if an id
-            has been found, the second is the id itself.
+            Optional[str]: The video id, None if the link is not to a Webex recording.
         """
-        if not anchor.has_attr("href"):
-            return (False, None)
-
         pattern_google_redirect = re.compile(
             "https?\:\/\/www\.google\.com\/url\?q\=(https?\:\/\/politecnicomilano.webex.com\/[^&]*)&.*"
         )
         try:
-            direct_url: str = anchor["href"]
-            if pattern_google_redirect.match(anchor["href"]):
-                direct_url = pattern_google_redirect.search(anchor["href"]).group(1)
+            direct_url: str = link
+            if pattern_google_redirect.match(link):
+                direct_url = pattern_google_redirect.search(link).group(1)
 
-            return (
-                True,
-                extract_id_from_url(url=direct_url, ticket=self.cookie_ticket),
+            return extract_id_from_url(
+                url=direct_url,
+                ticket=self.cookie_ticket,
+                session=self.session,
+                cache=self.ldr_cache,
+                ticket_pool=self.ticket_pool,
             )
         except ValueError:
-            return (False, None)
+            return None
 
-    def _get_video_ids_from_soup(self, soup: BeautifulSoup) -> List[str]:
-        """Get the video ids in the links in a webpage from the soup.
+    def _get_video_ids_from_links(self, links: List[str]) -> List[str]:
+        """Get the video ids in the links of a webpage.
 
         Args:
-            soup (BeautifulSoup): The BeautifulSoup object of a webpage.
+            links (List[str]): The href of the anchors of a webpage.
 
         Returns:
             List[str]: List of video ids.
         """
-        anchors = soup.select("a", href=True)
-        print(f"Found {len(anchors)} links in the page")
-
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            TimeElapsedColumn(),
-        ) as progress:
-            progress.add_task(description="Filtering only Webex links...", total=None)
-            pool: ThreadPool = ThreadPool()
-            video_ids: List[str] = pool.starmap(
-                self._get_id_from_anchor,
-                zip(anchors),
-            )
+        self.reporter.message(f"Found {len(links)} links in the page")
 
-            video_ids = list(filter(lambda item: item[0] == True, video_ids))
-            video_ids = [v[1] for v in video_ids]
+        video_ids: List[Optional[str]] = self._map(
+            self._get_id_from_link,
+            zip(links),
+            description="Filtering only Webex links...",
+        )
 
-        return video_ids
+        return [v for v in video_ids if v is not None]
 
     def parse(
         self, soup: BeautifulSoup, course: str, academic_year: Optional[str] = None
@@ -94,49 +135,137 @@ class WebpageParser(Parser):
         Returns:
             List[Recording]: The list of the recording objects.
         """
-        video_ids: List[str] = self._get_video_ids_from_soup(soup)
-        print(f"Found {len(video_ids)} links to Webex in the page")
-
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            TimeElapsedColumn(),
-        ) as progress:
-            progress.add_task(
-                description="Generating recording download links...", total=None
-            )
-            pool: ThreadPool = ThreadPool()
-            recordings: List[Recording] = pool.starmap(
-                generate_recording_from_id,
-                zip(
-                    video_ids,
-                    repeat(self.cookie_ticket),
-                    repeat(course),
-                    repeat(academic_year),
-                ),
-            )
+        return list(self.iter_parse(soup, course, academic_year))
+
+    def iter_parse(
+        self, soup: BeautifulSoup, course: str, academic_year: Optional[str] = None
+    ) -> Iterator[Recording]:
+        """Get the recordings from a webpage soup lazily.
+
+        Args:
+            soup (BeautifulSoup): The soup.
+            course (str): The course name.
+            academic_year (Optional[str], optional): The academic year in the format "2021-22". Defaults to None.
+
+        Yields:
+            Iterator[Recording]: The recording objects, in the order they are resolved.
+        """
+        links: List[str] = [a["href"] for a in soup.select("a") if a.has_attr("href")]
+        yield from self.iter_parse_links(links, course, academic_year)
+
+    def iter_parse_links(
+        self, links: List[str], course: str, academic_year: Optional[str] = None
+    ) -> Iterator[Recording]:
+        """Get the recordings from the links of a webpage lazily.
+
+        Args:
+            links (List[str]): The href of the anchors of the webpage.
+            course (str): The course name.
+            academic_year (Optional[str], optional): The academic year in the format "2021-22". Defaults to None.
+
+        Yields:
+            Iterator[Recording]: The recording objects, in the order they are resolved.
+        """
+        self.check_credentials()
+        video_ids: List[str] = self._get_video_ids_from_links(links)
+        self.reporter.message(f"Found {len(video_ids)} links to Webex in the page")
+        self._prefetch_metadata(video_ids)
+
+        yield from self._imap(
+            self._generate_recording_from_id,
+            zip(video_ids, repeat(course), repeat(academic_year)),
+            description="Generating recording download links...",
+            key=lambda args: f"{args[1]} {args[0]}",
+            course=lambda args: args[1],
+            info=lambda args: (None, args[2], None),
+        )
+
+    def _fetch_links(self, url: str) -> List[str]:
+        """Get the links of a webpage.
+
+        Args:
+            url (str): The url of the webpage.
+
+        Raises:
+            RuntimeError: If the page cannot be opened.
 
-        return recordings
+        Returns:
+            List[str]: The absolute links of the page, none if it is not an HTML page.
+        """
+        with self.session.get(url, stream=True) as res:
+            if res.status_code != 200:
+                raise RuntimeError(
+                    f"Unable to open the page, got status {res.status_code}."
+                )
+            # Only the headers are downloaded for the files linked by the pages
+            if "html" not in res.headers.get("Content-Type", "text/html"):
+                return []
+            content: str = "".join(iter_response_chunks(res))
+        # Parsed in another process, the other threads keep doing requests
+        links: List[str] = run_extraction(extract_links, [content])
+        return [urldefrag(urljoin(res.url, link))[0] for link in links]
+
+    @staticmethod
+    def _is_same_site_page(link: str, url: str) -> bool:
+        """Check if a link is a page of the same site of an url.
+
+        Args:
+            link (str): The link.
+            url (str): The url of the first page of the crawl.
+
+        Returns:
+            bool: True if the link is an http page on the same host, which is not a
+                known file type.
+        """
+        parsed = urlparse(link)
+        return (
+            parsed.scheme in ["http", "https"]
+            and parsed.netloc == urlparse(url).netloc
+            and not parsed.path.lower().endswith(WebpageParser.FILE_EXTENSIONS)
+        )
 
-    def parse_url(self, url: str, course: str, academic_year: str) -> List[Recording]:
+    def parse_url(
+        self, url: str, course: str, academic_year: str, depth: int = 0
+    ) -> List[Recording]:
         """Get the recordings from a webpage URL.
 
         Args:
             url (str): The url containing the links to the recordings.
             course (str): The course name.
             academic_year (str): The course academic year in the format "2021-22".
+            depth (int, optional): How many levels of pages of the same site linked
+                by the page are crawled. Defaults to 0.
 
         Returns:
             List[Recording]: Recording objects.
         """
-        res: requests.Response = requests.get(url)
-        if res.status_code != 200:
-            raise RuntimeError(
-                f"Unable to open the page, got status {res.status_code}."
-            )
-        soup: BeautifulSoup = BeautifulSoup(res.content, "html.parser")
+        return list(self.iter_parse_url(url, course, academic_year, depth))
+
+    def iter_parse_url(
+        self, url: str, course: str, academic_year: str, depth: int = 0
+    ) -> Iterator[Recording]:
+        """Get the recordings from a webpage URL lazily.
 
-        return self.parse(soup, course, academic_year)
+        The links found in all the crawled pages are resolved together.
+
+        Args:
+            url (str): The url containing the links to the recordings.
+            course (str): The course name.
+            academic_year (str): The course academic year in the format "2021-22".
+            depth (int, optional): How many levels of pages of the same site linked
+                by the page are crawled. Defaults to 0.
+
+        Yields:
+            Iterator[Recording]: Recording objects, in the order they are resolved.
+        """
+        links: List[str] = self._crawl(
+            self._fetch_links(url),
+            depth,
+            self._fetch_links,
+            lambda link: self._is_same_site_page(link, url),
+            visited={url},
+        )
+        yield from self.iter_parse_links(links, course, academic_year)
 
     def parse_file(
         self, file: Path, course: str, academic_year: str
@@ -151,7 +280,56 @@ class WebpageParser(Parser):
         Returns:
             List[Recording]: Recording objects.
         """
-        with open(file) as f:
-            soup = BeautifulSoup(f, "html.parser")
+        return list(self.iter_parse_file(file, course, academic_year))
+
+    def iter_parse_file(
+        self, file: Path, course: str, academic_year: str
+    ) -> Iterator[Recording]:
+        """Get the recordings from an HTML file lazily.
+
+        Args:
+            file (str): The path to the file.
+            course (str): The course name.
+            academic_year (str): The course academic year in the format "2021-22".
+
+        Yields:
+            Iterator[Recording]: Recording objects, in the order they are resolved.
+        """
+        yield from self.iter_parse_files([file], course, academic_year)
+
+    def parse_files(
+        self, files: List[Path], course: str, academic_year: str
+    ) -> List[Recording]:
+        """Get the recordings from several HTML files.
+
+        Args:
+            files (List[Path]): The paths to the files.
+            course (str): The course name.
+            academic_year (str): The course academic year in the format "2021-22".
+
+        Returns:
+            List[Recording]: Recording objects.
+        """
+        return list(self.iter_parse_files(files, course, academic_year))
+
+    def iter_parse_files(
+        self, files: List[Path], course: str, academic_year: str
+    ) -> Iterator[Recording]:
+        """Get the recordings from several HTML files lazily.
+
+        The files are parsed in parallel in the process pool of the HTML
+        extraction, and the links of all of them are resolved together.
+
+        Args:
+            files (List[Path]): The paths to the files.
+            course (str): The course name.
+            academic_year (str): The course academic year in the format "2021-22".
+
+        Yields:
+            Iterator[Recording]: Recording objects, in the order they are resolved.
+        """
+        links: List[str] = []
+        for file_links in map_extraction(extract_file_links, [str(f) for f in files]):
+            links.extend(file_links)
 
-        return self.parse(soup, course, academic_year)
+        yield from self.iter_parse_links(links, course, academic_year)
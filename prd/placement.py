@@ -0,0 +1,189 @@
+import os
+import json
+import shutil
+from enum import Enum
+from typing import Dict, List, Optional
+
+from prd.config import Config
+from prd.preflight import get_existing_ancestor, get_expected_sizes
+from prd.reporter import Reporter, ConsoleReporter
+from prd.webex_api import Recording
+
+
+class PlacementPolicy(str, Enum):
+    """How the recordings are spread across several output folders."""
+
+    course = "course"
+    round_robin = "round-robin"
+    most_free = "most-free"
+
+
+def get_course_folder(recording: Recording) -> str:
+    """Get the folder of the course of a recording, relative to the output folder.
+
+    Args:
+        recording (Recording): The recording.
+
+    Returns:
+        str: The course folder.
+    """
+    return os.path.dirname(recording.get_output_filename())
+
+
+def read_output_index(output: str) -> Dict[str, List[str]]:
+    """Read the index of the output folders of each course.
+
+    Args:
+        output (str): The main output folder, where the index is.
+
+    Returns:
+        Dict[str, List[str]]: The output folders of each course folder, empty if
+            there is no index.
+    """
+    try:
+        with open(os.path.join(output, Config.OUTPUT_INDEX_FILENAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        return {}
+
+
+def write_output_index(output: str, placement: Dict[str, List[Recording]]) -> None:
+    """Add the output folders of the placed courses to the index.
+
+    Args:
+        output (str): The main output folder, where the index is.
+        placement (Dict[str, List[Recording]]): The recordings of each output folder.
+    """
+    index: Dict[str, List[str]] = read_output_index(output)
+    for root, recordings in placement.items():
+        for r in recordings:
+            roots: List[str] = index.setdefault(get_course_folder(r), [])
+            if os.path.abspath(root) not in roots:
+                roots.append(os.path.abspath(root))
+    os.makedirs(output, exist_ok=True)
+    tmp_filepath: str = os.path.join(output, Config.OUTPUT_INDEX_FILENAME + ".tmp")
+    with open(tmp_filepath, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_filepath, os.path.join(output, Config.OUTPUT_INDEX_FILENAME))
+
+
+def _get_free_space(roots: List[str]) -> Dict[str, int]:
+    """Get the free space of each output folder.
+
+    Args:
+        roots (List[str]): The output folders.
+
+    Returns:
+        Dict[str, int]: The free bytes of the disk of each folder.
+    """
+    return {
+        root: shutil.disk_usage(get_existing_ancestor(root)).free for root in roots
+    }
+
+
+def _get_device(root: str) -> int:
+    """Get the disk of an output folder.
+
+    Args:
+        root (str): The output folder.
+
+    Returns:
+        int: The id of the device of the folder.
+    """
+    return os.stat(get_existing_ancestor(root)).st_dev
+
+
+def place_recordings(
+    recordings: List[Recording],
+    roots: List[str],
+    policy: PlacementPolicy = PlacementPolicy.course,
+    reporter: Optional[Reporter] = None,
+    sizes: Optional[List[Optional[int]]] = None,
+) -> Dict[str, List[Recording]]:
+    """Choose the output folder of each recording.
+
+    A recording already downloaded, even partially, in one of the folders stays
+    there, and with the course policy so do the other recordings of a course
+    already in the index. The others are placed by the policy:
+    - course: each course goes to the folder with the fewest recordings so far
+    - round-robin: each recording goes to the next folder in turn
+    - most-free: each recording goes to the folder with the most free space,
+      counting the recordings already placed on its disk
+
+    Args:
+        recordings (List[Recording]): The recordings.
+        roots (List[str]): The output folders, the first one is the main one.
+        policy (PlacementPolicy, optional): The placement policy. Defaults to
+            PlacementPolicy.course.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
+        sizes (Optional[List[Optional[int]]], optional): The expected size of each
+            recording, used by the most-free policy. Defaults to None, which gets
+            them with HEAD requests.
+
+    Returns:
+        Dict[str, List[Recording]]: The recordings of each output folder.
+    """
+    reporter = reporter if reporter is not None else ConsoleReporter()
+    placement: Dict[str, List[Recording]] = {root: [] for root in roots}
+    if len(roots) == 1:
+        placement[roots[0]] = list(recordings)
+        return placement
+
+    index: Dict[str, List[str]] = read_output_index(roots[0])
+    absolute_roots: Dict[str, str] = {os.path.abspath(root): root for root in roots}
+    courses: Dict[str, str] = {}
+    free: Dict[str, int] = {}
+    if policy == PlacementPolicy.most_free:
+        if sizes is None:
+            sizes = get_expected_sizes(recordings, reporter=reporter)
+        known: List[int] = [s for s in sizes if s is not None]
+        default_size: int = (
+            sum(known) // len(known) if len(known) > 0 else Config.PLACEMENT_UNKNOWN_SIZE
+        )
+        free = _get_free_space(roots)
+        devices: Dict[str, int] = {root: _get_device(root) for root in roots}
+    else:
+        sizes = [None] * len(recordings)
+
+    turn: int = 0
+    for recording, size in zip(recordings, sizes):
+        course_folder: str = get_course_folder(recording)
+        root: Optional[str] = next(
+            (
+                r
+                for r in roots
+                if os.path.exists(os.path.join(r, recording.get_output_filename()))
+            ),
+            None,
+        )
+        if root is None and policy == PlacementPolicy.course:
+            if course_folder not in courses:
+                indexed: List[str] = [
+                    absolute_roots[r]
+                    for r in index.get(course_folder, [])
+                    if r in absolute_roots
+                ]
+                courses[course_folder] = (
+                    indexed[0]
+                    if len(indexed) > 0
+                    else min(roots, key=lambda r: len(placement[r]))
+                )
+            root = courses[course_folder]
+        elif root is None and policy == PlacementPolicy.round_robin:
+            root = roots[turn % len(roots)]
+            turn += 1
+        elif root is None:
+            root = max(roots, key=lambda r: free[r])
+        # The other recordings of the course follow it
+        courses.setdefault(course_folder, root)
+        if policy == PlacementPolicy.most_free:
+            # The roots on the same disk share its free space
+            for r in roots:
+                if devices[r] == devices[root]:
+                    free[r] -= size if size is not None else default_size
+        placement[root].append(recording)
+
+    for root, placed in placement.items():
+        reporter.message(f"{len(placed)} recordings will be downloaded in {root}")
+    return placement
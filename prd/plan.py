@@ -0,0 +1,270 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+import requests
+from rich import print
+from rich.table import Table
+
+from prd.config import Config
+from prd.create_output import is_download_complete
+from prd.parsers import Parser
+from prd.parsers.abstract_parser import resolving
+from prd.preflight import get_expected_sizes
+from prd.reporter import Reporter
+from prd.utils import format_size, replace_illegal_characters
+from prd.webex_api import Recording
+
+
+class RequestStats:
+    """Count the requests made by a session and their latency.
+
+    The requests made while the parser resolves an item are counted apart.
+    """
+
+    def __init__(self):
+        """Create the counters."""
+        self.requests: int = 0
+        self.resolution_requests: int = 0
+        self.elapsed: float = 0.0
+        self._lock: threading.Lock = threading.Lock()
+
+    def attach(self, session: requests.Session) -> None:
+        """Count the requests of a session.
+
+        Args:
+            session (requests.Session): The session.
+        """
+        session.hooks["response"].append(self._on_response)
+
+    def _on_response(self, res: requests.Response, *args, **kwargs) -> None:
+        with self._lock:
+            self.requests += 1
+            if getattr(resolving, "active", False):
+                self.resolution_requests += 1
+            self.elapsed += res.elapsed.total_seconds()
+
+    def get_mean_latency(self) -> float:
+        """Get the mean latency of the requests.
+
+        Returns:
+            float: The latency in seconds, 0 if no request was made.
+        """
+        with self._lock:
+            return self.elapsed / self.requests if self.requests > 0 else 0.0
+
+
+def measure_bandwidth(
+    url: str, session: Optional[requests.Session] = None
+) -> Optional[float]:
+    """Measure the bandwidth downloading the first bytes of a file.
+
+    Args:
+        url (str): The url of the file.
+        session (Optional[requests.Session], optional): The session used for the
+            request. Defaults to None, which creates a new one.
+
+    Returns:
+        Optional[float]: The bandwidth in bytes per second, None if it could not
+            be measured.
+    """
+    session = session if session is not None else requests.Session()
+    started: float = time.monotonic()
+    received: int = 0
+    try:
+        with session.get(
+            url,
+            headers={"Range": f"bytes=0-{Config.PLAN_BANDWIDTH_SAMPLE_BYTES - 1}"},
+            stream=True,
+        ) as res:
+            if res.status_code not in [200, 206]:
+                return None
+            for chunk in res.iter_content(chunk_size=64 * 1024):
+                received += len(chunk)
+                if received >= Config.PLAN_BANDWIDTH_SAMPLE_BYTES:
+                    break
+    except requests.exceptions.RequestException:
+        return None
+    elapsed: float = time.monotonic() - started
+    if received == 0 or elapsed <= 0:
+        return None
+    return received / elapsed
+
+
+class CoursePlan:
+    """Estimate of the cost of downloading the recordings of a course."""
+
+    def __init__(
+        self, course: str, recordings: int, requests: int, size: int, seconds: float
+    ) -> None:
+        """Create the estimate.
+
+        Args:
+            course (str): The course name.
+            recordings (int): The estimated number of recordings.
+            requests (int): The estimated number of HTTP requests.
+            size (int): The estimated bytes to download.
+            seconds (float): The estimated duration in seconds.
+        """
+        self.course = course
+        self.recordings = recordings
+        self.requests = requests
+        self.size = size
+        self.seconds = seconds
+
+
+class Planner:
+    """Estimate the cost of a run resolving only a sample of the recordings.
+
+    The parser resolves Config.PLAN_SAMPLE_SIZE items of each course: the
+    requests it makes, the size of the sampled recordings and the bandwidth
+    measured on one of them are extrapolated to all the items.
+    """
+
+    def __init__(self, parser: Parser, sample_size: Optional[int] = None):
+        """Put a parser in planning mode.
+
+        Args:
+            parser (Parser): The parser.
+            sample_size (Optional[int], optional): Number of items resolved for each
+                course. Defaults to None, which uses Config.PLAN_SAMPLE_SIZE.
+        """
+        self.parser = parser
+        self.parser.plan_sample = (
+            sample_size if sample_size is not None else Config.PLAN_SAMPLE_SIZE
+        )
+        self.stats: RequestStats = RequestStats()
+        self.stats.attach(parser.session)
+
+    def estimate(
+        self,
+        recordings: List[Recording],
+        output: str,
+        reporter: Optional[Reporter] = None,
+    ) -> List[CoursePlan]:
+        """Estimate the cost of the run from the sampled recordings.
+
+        Args:
+            recordings (List[Recording]): The recordings resolved by the parser.
+            output (str): The output folder.
+            reporter (Optional[Reporter], optional): Where the progress is reported.
+                Defaults to None, which prints to the terminal.
+
+        Returns:
+            List[CoursePlan]: The estimate of each course.
+        """
+        sampled_total: int = sum(self.parser.sampled_items.values())
+        requests_per_item: float = (
+            self.stats.resolution_requests / sampled_total if sampled_total > 0 else 0.0
+        )
+        latency: float = self.stats.get_mean_latency()
+        # The concurrency of the thread pool of the parser
+        workers: int = Config.PARSER_WORKERS or os.cpu_count() or 1
+
+        sizes: List[Optional[int]] = get_expected_sizes(recordings, reporter=reporter)
+        known = [(r, s) for r, s in zip(recordings, sizes) if s is not None]
+        bandwidth: Optional[float] = None
+        if len(known) > 0:
+            bandwidth = measure_bandwidth(max(known, key=lambda k: k[1])[0].download_url)
+
+        by_course: Dict[str, List[Recording]] = {}
+        size_by_video: Dict[str, Optional[int]] = {}
+        for r, s in zip(recordings, sizes):
+            by_course.setdefault(r.course, []).append(r)
+            size_by_video[r.video_id] = s
+
+        # Requests made to parse the listings, before resolving the items
+        listing_requests: int = self.stats.requests - self.stats.resolution_requests
+        plans: List[CoursePlan] = [
+            CoursePlan(
+                course="Listings",
+                recordings=0,
+                requests=listing_requests,
+                size=0,
+                seconds=listing_requests * latency,
+            )
+        ]
+        for name, items in self.parser.planned_items.items():
+            course: str = replace_illegal_characters(name.strip())
+            sampled: int = self.parser.sampled_items[name]
+            found: List[Recording] = by_course.get(course, [])
+            estimated: int = round(items * len(found) / sampled) if sampled > 0 else 0
+
+            # Bytes still to download, the downloaded samples are extrapolated too
+            missing: List[int] = [
+                0
+                if is_download_complete(
+                    os.path.join(output, r.get_output_filename()),
+                    size_by_video[r.video_id],
+                )
+                else size_by_video[r.video_id]
+                for r in found
+                if size_by_video[r.video_id] is not None
+            ]
+            size: int = (
+                round(sum(missing) / len(missing) * estimated) if len(missing) > 0 else 0
+            )
+            to_download: int = round(
+                estimated * len([m for m in missing if m > 0]) / max(1, len(missing))
+            )
+
+            resolution_requests: int = round(items * requests_per_item)
+            seconds: float = resolution_requests * latency / workers
+            if bandwidth is not None:
+                seconds += size / bandwidth
+            plans.append(
+                CoursePlan(
+                    course=course,
+                    recordings=estimated,
+                    # A HEAD for the disk space check and a download for each recording
+                    requests=resolution_requests + estimated + to_download,
+                    size=size,
+                    seconds=seconds,
+                )
+            )
+        return plans
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration in a human readable way.
+
+    Args:
+        seconds (float): The duration in seconds.
+
+    Returns:
+        str: The duration, for example "1h 05m".
+    """
+    minutes: int = round(seconds / 60)
+    if minutes < 1:
+        return f"{round(seconds)}s"
+    return f"{minutes // 60}h {minutes % 60:02d}m"
+
+
+def print_plan(plans: List[CoursePlan]) -> None:
+    """Print the estimate of each course and the total.
+
+    Args:
+        plans (List[CoursePlan]): The estimates.
+    """
+    table: Table = Table(title="Estimated cost of the run")
+    table.add_column("Course")
+    table.add_column("Recordings", justify="right")
+    table.add_column("Requests", justify="right")
+    table.add_column("Download", justify="right")
+    table.add_column("Time", justify="right")
+    for p in plans:
+        table.add_row(
+            p.course,
+            str(p.recordings),
+            str(p.requests),
+            format_size(p.size),
+            format_duration(p.seconds),
+        )
+    table.add_row(
+        "[bold]Total[/bold]",
+        str(sum(p.recordings for p in plans)),
+        str(sum(p.requests for p in plans)),
+        format_size(sum(p.size for p in plans)),
+        format_duration(sum(p.seconds for p in plans)),
+    )
+    print(table)
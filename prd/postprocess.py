@@ -0,0 +1,241 @@
+import os
+import json
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+import typer
+
+from prd.config import Config
+from prd.reporter import Reporter, ConsoleReporter
+from prd.store import link_into_place
+
+PRESETS_FILEPATH: str = os.path.join(
+    typer.get_app_dir(Config.APP_NAME), Config.POSTPROCESS_PRESETS_FILENAME
+)
+
+
+def load_presets() -> Dict[str, Dict[str, object]]:
+    """Load the post-processing presets.
+
+    The builtin presets can be extended or overridden by a json file in the
+    application folder mapping a preset name to an object with the keys
+    "extension" (the extension of the output file) and "args" (the ffmpeg
+    output arguments).
+
+    Raises:
+        ValueError: If the file is not valid json or a preset is malformed.
+
+    Returns:
+        Dict[str, Dict[str, object]]: The presets by name.
+    """
+    presets: Dict[str, Dict[str, object]] = dict(Config.POSTPROCESS_PRESETS)
+    try:
+        with open(PRESETS_FILEPATH) as f:
+            user_presets = json.load(f)
+    except FileNotFoundError:
+        return presets
+    except json.decoder.JSONDecodeError as e:
+        raise ValueError(f"{PRESETS_FILEPATH} is not valid json: {e}")
+    if not isinstance(user_presets, dict):
+        raise ValueError(f"{PRESETS_FILEPATH} must map each preset name to a preset.")
+    for name, preset in user_presets.items():
+        if (
+            not isinstance(preset, dict)
+            or not isinstance(preset.get("extension"), str)
+            or not isinstance(preset.get("args"), list)
+            or not all(isinstance(a, str) for a in preset["args"])
+        ):
+            raise ValueError(
+                f'The post-processing preset "{name}" of {PRESETS_FILEPATH} needs '
+                'an "extension" string and an "args" list of strings.'
+            )
+    presets.update(user_presets)
+    return presets
+
+
+def get_postprocess_workers() -> int:
+    """Get the size of the post-processing pool.
+
+    ffmpeg is itself multithreaded, so by default half of the CPUs are used.
+
+    Returns:
+        int: The number of ffmpeg processes to run in parallel.
+    """
+    if Config.POSTPROCESS_WORKERS is not None:
+        return max(1, Config.POSTPROCESS_WORKERS)
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+def get_postprocess_output_path(input_path: str, preset: str, extension: str) -> str:
+    """Get the path of the post-processed file.
+
+    Args:
+        input_path (str): The path of the downloaded recording.
+        preset (str): The preset name.
+        extension (str): The extension of the output file.
+
+    Returns:
+        str: The path of the output file, next to the input one.
+    """
+    return f"{os.path.splitext(input_path)[0]}.{preset}{extension}"
+
+
+def is_up_to_date(input_path: str, output_path: str) -> bool:
+    """Check if an output file is newer than its input file.
+
+    Args:
+        input_path (str): The input file.
+        output_path (str): The output file.
+
+    Returns:
+        bool: True if the output exists and is not older than the input.
+    """
+    if not os.path.exists(output_path):
+        return False
+    return os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+
+
+def _run_ffmpeg(input_path: str, output_path: str, args: List[str]) -> str:
+    """Run ffmpeg on a file, writing the output atomically.
+
+    Args:
+        input_path (str): The input file.
+        output_path (str): The output file.
+        args (List[str]): The ffmpeg output arguments.
+
+    Raises:
+        RuntimeError: If ffmpeg fails.
+
+    Returns:
+        str: The output path.
+    """
+    root, extension = os.path.splitext(output_path)
+    tmp_path: str = f"{root}.part{extension}"
+    res = subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", input_path, *args, tmp_path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if res.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"ffmpeg failed on {input_path}: {res.stderr.strip()}")
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def _process(
+    input_path: str, output_path: str, args: List[str], link_paths: List[str]
+) -> str:
+    """Run ffmpeg on a file and make its output available next to other paths.
+
+    Args:
+        input_path (str): The input file.
+        output_path (str): The output file.
+        args (List[str]): The ffmpeg output arguments.
+        link_paths (List[str]): The paths of the output file of each link of the
+            input file.
+
+    Raises:
+        RuntimeError: If ffmpeg fails.
+
+    Returns:
+        str: The output path.
+    """
+    _run_ffmpeg(input_path, output_path, args)
+    for path in link_paths:
+        link_into_place(output_path, path)
+    return output_path
+
+
+class PostProcessor:
+    """Pool of ffmpeg processes post-processing downloaded recordings.
+
+    Each ffmpeg runs in its own process, launched and waited for by a thread of
+    the pool. Call wait() once the downloads are done, or close() if they fail.
+    """
+
+    def __init__(
+        self,
+        preset: str,
+        workers: Optional[int] = None,
+        reporter: Optional[Reporter] = None,
+    ):
+        """Create the post-processor.
+
+        Args:
+            preset (str): The name of the preset to apply.
+            workers (Optional[int], optional): Size of the pool. Defaults to None,
+                which adapts it to the CPU count.
+            reporter (Optional[Reporter], optional): Where the progress is reported.
+                Defaults to None, which prints to the terminal.
+
+        Raises:
+            ValueError: If the preset does not exist or the presets file is
+                malformed.
+        """
+        presets: Dict[str, Dict[str, object]] = load_presets()
+        if preset not in presets.keys():
+            raise ValueError(f"The post-processing preset {preset} does not exist.")
+        self.preset = preset
+        self.reporter: Reporter = reporter if reporter is not None else ConsoleReporter()
+        self.extension: str = presets[preset]["extension"]
+        self.args: List[str] = list(presets[preset]["args"])
+        self.workers = workers if workers is not None else get_postprocess_workers()
+        self.futures: List[Future] = []
+        self.skipped: int = 0
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=self.workers
+        )
+
+    def submit(self, input_path: str, links: Optional[List[str]] = None) -> None:
+        """Queue a downloaded file, unless its output is already up to date.
+
+        Args:
+            input_path (str): The path of the downloaded recording.
+            links (Optional[List[str]], optional): Other paths of the same file,
+                such as the course folders a file of the store is linked into.
+                The file is processed once and its output is linked next to each
+                of them. Defaults to None.
+        """
+        output_path: str = get_postprocess_output_path(
+            input_path, self.preset, self.extension
+        )
+        link_paths: List[str] = [
+            get_postprocess_output_path(p, self.preset, self.extension)
+            for p in (links if links is not None else [])
+        ]
+        if is_up_to_date(input_path, output_path):
+            self.skipped += 1
+            for path in link_paths:
+                link_into_place(output_path, path)
+            return
+        self.futures.append(
+            self._executor.submit(
+                _process, input_path, output_path, self.args, link_paths
+            )
+        )
+
+    def wait(self) -> None:
+        """Wait for all the queued files and shut the pool down."""
+        failed: int = 0
+        for future in self.futures:
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                self.reporter.message("[red]" + str(e) + "[/red]")
+        self.close()
+        self.reporter.message(
+            f"[green]Post-processed {len(self.futures) - failed} recordings[/green] "
+            f"({self.skipped} already up to date, {failed} failed)."
+        )
+
+    def close(self) -> None:
+        """Shut the pool down, dropping the queued files.
+
+        The ffmpeg processes already running are waited for, it is a no-op after
+        wait().
+        """
+        self._executor.shutdown(cancel_futures=True)
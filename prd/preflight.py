@@ -0,0 +1,230 @@
+import os
+import shutil
+from enum import Enum
+from multiprocessing.pool import ThreadPool
+from typing import Callable, Dict, List, Optional, Tuple
+import requests
+
+from prd.config import Config
+from prd.reporter import Reporter, ConsoleReporter
+from prd.utils import format_size
+from prd.webex_api import Recording
+
+
+class DiskSpacePolicy(str, Enum):
+    """What to do when the recordings do not fit in the free disk space."""
+
+    refuse = "refuse"
+    trim = "trim"
+    ignore = "ignore"
+
+
+class InsufficientDiskSpaceError(RuntimeError):
+    """Raised when the recordings do not fit in the free disk space."""
+
+
+def get_content_length(url: str, session: requests.Session) -> Optional[int]:
+    """Get the size of a file with a HEAD request.
+
+    Args:
+        url (str): The url of the file.
+        session (requests.Session): The session used for the request.
+
+    Returns:
+        Optional[int]: The size in bytes, None if the server does not tell it.
+    """
+    try:
+        res: requests.Response = session.head(url, allow_redirects=True)
+    except requests.exceptions.RequestException:
+        return None
+    if res.status_code != 200 or res.headers.get("Content-Length") is None:
+        return None
+    return int(res.headers["Content-Length"])
+
+
+def get_expected_sizes(
+    recordings: List[Recording],
+    session: Optional[requests.Session] = None,
+    reporter: Optional[Reporter] = None,
+) -> List[Optional[int]]:
+    """Get the size of the recordings with concurrent HEAD requests.
+
+    Args:
+        recordings (List[Recording]): The recordings.
+        session (Optional[requests.Session], optional): The session used for the
+            requests. Defaults to None, which creates a new one.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
+
+    Returns:
+        List[Optional[int]]: The size of each recording, None if unknown.
+    """
+    session = session if session is not None else requests.Session()
+    reporter = reporter if reporter is not None else ConsoleReporter()
+
+    sizes: List[Optional[int]] = []
+    reporter.progress_start("Getting the size of the recordings...", len(recordings))
+    try:
+        with ThreadPool(Config.PREFLIGHT_WORKERS) as pool:
+            for size in pool.imap(
+                lambda r: get_content_length(r.download_url, session), recordings
+            ):
+                sizes.append(size)
+                reporter.progress_advance()
+    finally:
+        reporter.progress_stop()
+    return sizes
+
+
+def get_missing_bytes(path: str, size: Optional[int]) -> int:
+    """Get how many bytes a download still needs on disk.
+
+    A file preallocated by aria2c already takes its whole size, so only the
+    part of the file which does not exist yet is counted.
+
+    Args:
+        path (str): The path of the downloaded file.
+        size (Optional[int]): The expected size of the file.
+
+    Returns:
+        int: The missing bytes, 0 if the size is unknown.
+    """
+    if size is None:
+        return 0
+    if os.path.exists(path):
+        return max(0, size - os.path.getsize(path))
+    return size
+
+
+def get_existing_ancestor(path: str) -> str:
+    """Get the nearest folder of a path which already exists.
+
+    Args:
+        path (str): The path.
+
+    Returns:
+        str: The existing folder.
+    """
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def check_disk_space(
+    recordings: List[Recording],
+    sizes: List[Optional[int]],
+    output: str,
+    policy: DiskSpacePolicy = DiskSpacePolicy.refuse,
+    reporter: Optional[Reporter] = None,
+    get_filename: Callable[[Recording], str] = Recording.get_output_filename,
+) -> List[Recording]:
+    """Check that the recordings fit in the free space of their target folders.
+
+    The target folders are grouped by device, so folders on the same disk share
+    its free space, and Config.DISK_SPACE_MARGIN bytes are always left free.
+
+    Args:
+        recordings (List[Recording]): The recordings.
+        sizes (List[Optional[int]]): The expected size of each recording.
+        output (str): The output folder.
+        policy (DiskSpacePolicy, optional): What to do if the space is not enough.
+            Defaults to DiskSpacePolicy.refuse.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
+        get_filename (Callable[[Recording], str], optional): Get the path where a
+            recording is downloaded, relative to the output folder. Defaults to
+            Recording.get_output_filename.
+
+    Raises:
+        InsufficientDiskSpaceError: If the space is not enough and the policy is refuse.
+
+    Returns:
+        List[Recording]: The recordings to download, the ones which fit in the
+            free space if the policy is trim.
+    """
+    reporter = reporter if reporter is not None else ConsoleReporter()
+
+    unknown: int = len([s for s in sizes if s is None])
+    if unknown > 0:
+        reporter.message(
+            f"[yellow]The size of {unknown} recordings is unknown, "
+            "they are not counted in the disk space check.[/yellow]"
+        )
+
+    free: Dict[int, int] = {}
+    folders: Dict[int, str] = {}
+    needed: Dict[int, int] = {}
+    to_download: List[Recording] = []
+    trimmed: List[Tuple[Recording, int]] = []
+    for recording, size in zip(recordings, sizes):
+        path: str = os.path.join(output, get_filename(recording))
+        folder: str = get_existing_ancestor(os.path.dirname(path))
+        device: int = os.stat(folder).st_dev
+        if device not in free:
+            free[device] = shutil.disk_usage(folder).free - Config.DISK_SPACE_MARGIN
+            folders[device] = folder
+            needed[device] = 0
+
+        missing: int = get_missing_bytes(path, size)
+        if (
+            policy == DiskSpacePolicy.trim
+            and needed[device] + missing > free[device]
+        ):
+            trimmed.append((recording, missing))
+            continue
+        needed[device] += missing
+        to_download.append(recording)
+
+    for device in free.keys():
+        reporter.message(
+            f"{format_size(needed[device])} needed in {folders[device]}, "
+            f"{format_size(max(0, free[device]))} available"
+        )
+        if policy == DiskSpacePolicy.refuse and needed[device] > free[device]:
+            raise InsufficientDiskSpaceError(
+                f"Not enough disk space in {folders[device]}: "
+                f"{format_size(needed[device])} needed, "
+                f"{format_size(max(0, free[device]))} available. "
+                "Free some space or use --disk-space-policy=trim."
+            )
+
+    if len(trimmed) > 0:
+        reporter.message(
+            f"[yellow]{len(trimmed)} recordings "
+            f"({format_size(sum(m for _, m in trimmed))}) do not fit in the disk "
+            "and will not be downloaded.[/yellow]"
+        )
+    return to_download
+
+
+def preflight(
+    recordings: List[Recording],
+    output: str,
+    policy: DiskSpacePolicy = DiskSpacePolicy.refuse,
+    reporter: Optional[Reporter] = None,
+    get_filename: Callable[[Recording], str] = Recording.get_output_filename,
+) -> List[Recording]:
+    """Get the size of the recordings and check the free disk space.
+
+    Args:
+        recordings (List[Recording]): The recordings.
+        output (str): The output folder.
+        policy (DiskSpacePolicy, optional): What to do if the space is not enough.
+            Defaults to DiskSpacePolicy.refuse.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
+        get_filename (Callable[[Recording], str], optional): Get the path where a
+            recording is downloaded, relative to the output folder. Defaults to
+            Recording.get_output_filename.
+
+    Raises:
+        InsufficientDiskSpaceError: If the space is not enough and the policy is refuse.
+
+    Returns:
+        List[Recording]: The recordings to download.
+    """
+    if policy == DiskSpacePolicy.ignore:
+        return recordings
+    sizes: List[Optional[int]] = get_expected_sizes(recordings, reporter=reporter)
+    return check_disk_space(recordings, sizes, output, policy, reporter, get_filename)
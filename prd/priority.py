@@ -0,0 +1,174 @@
+import os
+import re
+from typing import Callable, List, Optional, Tuple
+import requests
+
+from prd.config import Config
+from prd.mp4 import Mp4Error, RangeReader, build_faststart_header, get_top_level_boxes
+from prd.reporter import Reporter, ConsoleReporter
+from prd.webex_api import Recording
+
+
+def select_priority(
+    recordings: List[Recording],
+    newest: Optional[int] = None,
+    subject_regex: Optional[str] = None,
+) -> List[Recording]:
+    """Select the recordings downloaded first.
+
+    Args:
+        recordings (List[Recording]): The recordings.
+        newest (Optional[int], optional): Select this many of the newest
+            recordings. Defaults to None.
+        subject_regex (Optional[str], optional): Select the recordings whose
+            subject matches this regular expression, ignoring the case. Defaults
+            to None.
+
+    Returns:
+        List[Recording]: The selected recordings, the newest first.
+    """
+    selected: List[Recording] = []
+    if newest is not None:
+        selected += sorted(recordings, reverse=True)[:newest]
+    if subject_regex is not None:
+        pattern: re.Pattern = re.compile(subject_regex, re.IGNORECASE)
+        selected += [
+            r for r in recordings if pattern.search(r.subject) and r not in selected
+        ]
+    return sorted(selected, reverse=True)
+
+
+def get_in_order_marker(path: str) -> str:
+    """Get the path of the file marking a download in order as incomplete.
+
+    Args:
+        path (str): The path of the downloaded file.
+
+    Returns:
+        str: The path of the marker.
+    """
+    return path + Config.IN_ORDER_MARKER_SUFFIX
+
+
+def download_in_order(
+    url: str, path: str, session: Optional[requests.Session] = None
+) -> None:
+    """Download an MP4 from the beginning to the end, so it can be played while it
+    is downloaded.
+
+    The moov box, the index a player needs to open the file, is fetched first
+    with range requests and written at the beginning of the file, followed by
+    the media data. A file which is not an MP4, or a server without range
+    requests, is downloaded as it is. An interrupted download is resumed.
+
+    Args:
+        url (str): The url of the recording.
+        path (str): The path of the downloaded file.
+        session (Optional[requests.Session], optional): The session used for the
+            requests. Defaults to None, which creates a new one.
+
+    Raises:
+        requests.exceptions.RequestException: If a request fails.
+    """
+    session = session if session is not None else requests.Session()
+    reader: RangeReader = RangeReader(url, session)
+    marker: str = get_in_order_marker(path)
+    header: bytes = b""
+    ranges: Optional[List[Tuple[int, int]]] = None
+    try:
+        header, ranges = build_faststart_header(reader, get_top_level_boxes(reader))
+    except Mp4Error:
+        pass
+
+    # The marker holds the url, a download is resumed only from the same source
+    resumable: bool = False
+    if ranges is not None and os.path.exists(marker) and os.path.exists(path):
+        with open(marker) as m:
+            resumable = m.read() == url
+    written: int = os.path.getsize(path) if resumable else 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(marker, "w") as m:
+        m.write(url)
+    with open(path, "r+b" if written > 0 else "wb") as f:
+        f.seek(written)
+        f.truncate()
+        if ranges is None:
+            with session.get(url, stream=True) as res:
+                res.raise_for_status()
+                for chunk in res.iter_content(chunk_size=Config.IN_ORDER_CHUNK_SIZE):
+                    f.write(chunk)
+        else:
+            if written < len(header):
+                f.write(header[written:])
+                written = len(header)
+            # Where the resumed download is in the media data
+            skip: int = written - len(header)
+            for start, end in ranges:
+                if skip >= end - start:
+                    skip -= end - start
+                    continue
+                for chunk in reader.iter_range(
+                    start + skip, end, Config.IN_ORDER_CHUNK_SIZE
+                ):
+                    f.write(chunk)
+                skip = 0
+    os.remove(marker)
+
+
+def download_priority(
+    recordings: List[Recording],
+    output: str,
+    on_complete: Callable[[Recording, str], None],
+    reporter: Optional[Reporter] = None,
+    get_filename: Callable[[Recording], str] = Recording.get_output_filename,
+    session: Optional[requests.Session] = None,
+) -> List[Recording]:
+    """Download recordings one at a time, each in order.
+
+    Each source of a recording is tried in turn.
+
+    Args:
+        recordings (List[Recording]): The recordings, in the order they are
+            downloaded.
+        output (str): The output folder.
+        on_complete (Callable[[Recording, str], None]): Called with the recording
+            and the path of the file once it is downloaded.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
+        get_filename (Callable[[Recording], str], optional): Get the path where a
+            recording is downloaded, relative to the output folder. Defaults to
+            Recording.get_output_filename.
+        session (Optional[requests.Session], optional): The session used for the
+            requests. Defaults to None, which creates a new one.
+
+    Returns:
+        List[Recording]: The recordings which could not be downloaded.
+    """
+    reporter = reporter if reporter is not None else ConsoleReporter()
+    session = session if session is not None else requests.Session()
+    failed: List[Recording] = []
+    for recording in recordings:
+        path: str = os.path.join(output, get_filename(recording))
+        marker: str = get_in_order_marker(path)
+        if os.path.exists(path + ".aria2"):
+            # A partial download of aria2c cannot be continued in order
+            for p in [path, path + ".aria2"]:
+                if os.path.exists(p):
+                    os.remove(p)
+        elif os.path.exists(path) and not os.path.exists(marker):
+            on_complete(recording, path)
+            continue
+        reporter.message(
+            f"Downloading {recording.subject} in order, it can be played from {path}"
+        )
+        for url in recording.download_urls:
+            try:
+                download_in_order(url, path, session)
+            except (requests.exceptions.RequestException, Mp4Error) as e:
+                reporter.message(f"[yellow]Download of {url} failed: {e}[/yellow]")
+                continue
+            on_complete(recording, path)
+            break
+        else:
+            failed.append(recording)
+    return failed
@@ -0,0 +1,47 @@
+from rich.progress import (
+    BarColumn,
+    MofNCompleteColumn,
+    Progress,
+    ProgressColumn,
+    SpinnerColumn,
+    Task,
+    TextColumn,
+    TimeElapsedColumn,
+    TimeRemainingColumn,
+)
+from rich.text import Text
+
+
+class RateColumn(ProgressColumn):
+    """Column showing the number of completed items per second."""
+
+    def render(self, task: Task) -> Text:
+        """Render the rate of a task.
+
+        Args:
+            task (Task): The task.
+
+        Returns:
+            Text: The rate.
+        """
+        if task.speed is None:
+            return Text("?/s", style="progress.data.speed")
+        return Text(f"{task.speed:.1f}/s", style="progress.data.speed")
+
+
+def create_progress() -> Progress:
+    """Create a determinate progress bar with throughput and ETA.
+
+    Returns:
+        Progress: The progress bar.
+    """
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        RateColumn(),
+        TimeElapsedColumn(),
+        TextColumn("ETA"),
+        TimeRemainingColumn(),
+    )
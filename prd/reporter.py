@@ -0,0 +1,144 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+from rich import print
+from rich.progress import Progress, TaskID
+
+from prd.progress import create_progress
+from prd.webex_api import Recording
+
+
+class Reporter:
+    """Receive the progress of the parsers and of the output creation.
+
+    The base class discards everything, so it can be used to run silently.
+    """
+
+    show_subprocess_output: bool = False
+
+    def message(self, text: str) -> None:
+        """Report an informative message.
+
+        Args:
+            text (str): The message, it can contain rich markup.
+        """
+
+    def progress_start(self, description: str, total: int) -> None:
+        """Report the start of a task made of a known number of steps.
+
+        Args:
+            description (str): The description of the task.
+            total (int): The number of steps.
+        """
+
+    def progress_advance(self) -> None:
+        """Report that a step of the current task completed."""
+
+    def progress_stop(self) -> None:
+        """Report the end of the current task."""
+
+    def recording_resolved(self, recording: Recording) -> None:
+        """Report a resolved recording.
+
+        Args:
+            recording (Recording): The recording.
+        """
+
+    def resolution_failed(self, item: str, error: Exception) -> None:
+        """Report an item which could not be resolved.
+
+        Args:
+            item (str): The item.
+            error (Exception): The error.
+        """
+
+    def download_completed(self, recording: Recording, path: str) -> None:
+        """Report a completed download.
+
+        Args:
+            recording (Recording): The recording.
+            path (str): The path of the downloaded file.
+        """
+
+
+class ConsoleReporter(Reporter):
+    """Reporter printing to the terminal with rich, used by the command line.
+
+    The tasks of the executor report their progress concurrently: each thread
+    gets its own bar in a single live display, which is stopped once every bar
+    is done.
+    """
+
+    show_subprocess_output: bool = True
+
+    def __init__(self):
+        """Create the reporter."""
+        self._progress: Optional[Progress] = None
+        # The bar of each thread reporting a progress
+        self._tasks: Dict[int, TaskID] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def message(self, text: str) -> None:
+        print(text)
+
+    def progress_start(self, description: str, total: int) -> None:
+        self.progress_stop()
+        with self._lock:
+            if self._progress is None:
+                self._progress = create_progress()
+                self._progress.start()
+            self._tasks[threading.get_ident()] = self._progress.add_task(
+                description=description, total=total
+            )
+
+    def progress_advance(self) -> None:
+        with self._lock:
+            task: Optional[TaskID] = self._tasks.get(threading.get_ident())
+            if task is not None:
+                self._progress.advance(task)
+
+    def progress_stop(self) -> None:
+        with self._lock:
+            if self._tasks.pop(threading.get_ident(), None) is None:
+                return
+            # The finished bars stay on screen until the last one is done
+            if len(self._tasks) == 0:
+                self._progress.stop()
+                self._progress = None
+
+
+class CallbackReporter(Reporter):
+    """Reporter forwarding everything to a single callback.
+
+    The callback receives the name of the event ("message", "progress_start",
+    "progress_advance", "progress_stop", "recording_resolved",
+    "resolution_failed" or "download_completed") and a dict with its fields.
+    """
+
+    def __init__(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """Create the reporter.
+
+        Args:
+            callback (Callable[[str, Dict[str, Any]], None]): The callback.
+        """
+        self.callback = callback
+
+    def message(self, text: str) -> None:
+        self.callback("message", {"text": text})
+
+    def progress_start(self, description: str, total: int) -> None:
+        self.callback("progress_start", {"description": description, "total": total})
+
+    def progress_advance(self) -> None:
+        self.callback("progress_advance", {})
+
+    def progress_stop(self) -> None:
+        self.callback("progress_stop", {})
+
+    def recording_resolved(self, recording: Recording) -> None:
+        self.callback("recording_resolved", {"recording": recording})
+
+    def resolution_failed(self, item: str, error: Exception) -> None:
+        self.callback("resolution_failed", {"item": item, "error": error})
+
+    def download_completed(self, recording: Recording, path: str) -> None:
+        self.callback("download_completed", {"recording": recording, "path": path})
@@ -0,0 +1,112 @@
+import os
+import json
+import typing
+from typing import Any, Dict, List, Mapping, Optional
+import typer
+
+from prd.config import Config
+
+SETTINGS_FILEPATH: str = os.path.join(
+    typer.get_app_dir(Config.APP_NAME), Config.SETTINGS_FILENAME
+)
+ENVIRONMENT_PREFIX: str = "PRD_"
+
+
+def _check_type(name: str, annotation: Any, value: Any) -> Any:
+    """Check that a setting has the type of its Config attribute.
+
+    Args:
+        name (str): The name of the setting.
+        annotation (Any): The type annotation of the Config attribute.
+        value (Any): The value of the setting.
+
+    Raises:
+        ValueError: If the value does not have the right type.
+
+    Returns:
+        Any: The value, with integers converted to floats where a float is expected.
+    """
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union and type(None) in args:
+        if value is None:
+            return None
+        return _check_type(name, [a for a in args if a is not type(None)][0], value)
+    if annotation is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if annotation is int and isinstance(value, bool):
+        raise ValueError(f"The setting {name} must be an integer.")
+    expected = origin if origin is not None else annotation
+    if not isinstance(value, expected):
+        raise ValueError(f"The setting {name} must be of type {expected.__name__}.")
+    return value
+
+
+def _parse_environment_value(annotation: Any, value: str) -> Any:
+    """Parse the value of an environment variable.
+
+    Strings are taken as they are, the other types are parsed as json.
+
+    Args:
+        annotation (Any): The type annotation of the Config attribute.
+        value (str): The value of the environment variable.
+
+    Returns:
+        Any: The parsed value, the string itself if it is not valid json.
+    """
+    if annotation is str or annotation == Optional[str]:
+        return value
+    try:
+        return json.loads(value)
+    except json.decoder.JSONDecodeError:
+        return value
+
+
+def load_settings(
+    path: Optional[str] = None, environ: Optional[Mapping[str, str]] = None
+) -> List[str]:
+    """Override the Config attributes with the settings file and the environment.
+
+    The settings file is a json object mapping the name of a Config attribute
+    to its value, the environment variable PRD_<NAME> takes precedence over it.
+
+    Args:
+        path (Optional[str], optional): The settings file. Defaults to None, which
+            uses the one in the application folder.
+        environ (Optional[Mapping[str, str]], optional): The environment. Defaults
+            to None, which uses os.environ.
+
+    Raises:
+        ValueError: If the settings file is not valid, a setting does not exist or
+            its value does not have the right type.
+
+    Returns:
+        List[str]: The names of the overridden settings.
+    """
+    path = path if path is not None else SETTINGS_FILEPATH
+    environ = environ if environ is not None else os.environ
+    annotations: Dict[str, Any] = typing.get_type_hints(Config)
+
+    settings: Dict[str, Any] = {}
+    try:
+        with open(path) as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        pass
+    except json.decoder.JSONDecodeError as e:
+        raise ValueError(f"The settings file {path} is not valid json: {e}")
+    if not isinstance(settings, dict):
+        raise ValueError(f"The settings file {path} must contain a json object.")
+    for name in settings.keys():
+        if name not in annotations:
+            raise ValueError(f"The setting {name} in {path} does not exist.")
+
+    for name, annotation in annotations.items():
+        if ENVIRONMENT_PREFIX + name in environ:
+            settings[name] = _parse_environment_value(
+                annotation, environ[ENVIRONMENT_PREFIX + name]
+            )
+
+    for name, value in settings.items():
+        setattr(Config, name, _check_type(name, annotations[name], value))
+    return list(settings.keys())
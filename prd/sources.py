@@ -0,0 +1,183 @@
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+import requests
+
+from prd.autotune import Aria2cRPC
+from prd.cache import PersistentCache, get_cache
+from prd.config import Config
+
+
+class SourceHistory:
+    """Download throughput observed for each host, persisted across runs.
+
+    It is a moving average of the throughput of the downloads from the host, a
+    download which fails before starting counts as a throughput of 0.
+    """
+
+    def __init__(self, cache: Optional[PersistentCache] = None):
+        """Create the history.
+
+        Args:
+            cache (Optional[PersistentCache], optional): Where the throughputs are
+                stored. Defaults to None, which uses the "source_speeds" cache.
+        """
+        self.cache: PersistentCache = (
+            cache if cache is not None else get_cache("source_speeds")
+        )
+
+    @staticmethod
+    def get_host(url: str) -> str:
+        """Get the host of a download url.
+
+        Args:
+            url (str): The url.
+
+        Returns:
+            str: The host.
+        """
+        return urlparse(url).netloc
+
+    def get_speed(self, url: str) -> Optional[float]:
+        """Get the throughput observed for the host of a url.
+
+        Args:
+            url (str): The url.
+
+        Returns:
+            Optional[float]: The throughput in bytes per second, None if nothing was
+                downloaded from the host yet.
+        """
+        return self.cache.get(self.get_host(url))
+
+    def record(self, url: str, speed: float) -> None:
+        """Record the throughput of a download. Call save() to persist it.
+
+        Args:
+            url (str): The url the recording was downloaded from.
+            speed (float): The throughput in bytes per second, 0 if it failed
+                before starting.
+        """
+        previous: Optional[float] = self.get_speed(url)
+        if previous is not None:
+            speed = (
+                Config.SOURCE_SPEED_SMOOTHING * speed
+                + (1 - Config.SOURCE_SPEED_SMOOTHING) * previous
+            )
+        self.cache.set(self.get_host(url), speed)
+
+    def order(self, urls: List[str]) -> List[str]:
+        """Sort the sources of a recording, the historically fastest first.
+
+        The order is kept as it is unless the throughput of every host is known.
+
+        Args:
+            urls (List[str]): The urls, in order of preference.
+
+        Returns:
+            List[str]: The sorted urls.
+        """
+        speeds: Dict[str, Optional[float]] = {u: self.get_speed(u) for u in urls}
+        if any(s is None for s in speeds.values()):
+            return list(urls)
+        return sorted(urls, key=lambda u: speeds[u], reverse=True)
+
+    def save(self) -> None:
+        """Persist the history."""
+        self.cache.save()
+
+
+class SourceMonitor:
+    """Throughput of each download of a running aria2c, measured on its own.
+
+    A download is timed from the first time aria2c reports it active, so the time
+    it waited in the queue does not count, and the bytes resumed from a previous
+    run are left out. A download slower than Config.SOURCE_SWITCH_SPEED after
+    Config.SOURCE_SWITCH_AFTER seconds is stopped if it has another source, to be
+    downloaded again from there.
+    """
+
+    def __init__(
+        self,
+        paths: Dict[str, str],
+        has_fallback: Callable[[str], bool] = lambda video_id: False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Create the monitor.
+
+        Args:
+            paths (Dict[str, str]): The video id of each downloaded file, by path.
+            has_fallback (Callable[[str], bool], optional): Tell whether the
+                recording of a video id has another source. Defaults to never.
+            clock (Callable[[], float], optional): The clock. Defaults to
+                time.monotonic.
+        """
+        self.paths: Dict[str, str] = {
+            os.path.abspath(p): video_id for p, video_id in paths.items()
+        }
+        self.has_fallback: Callable[[str], bool] = has_fallback
+        self.clock: Callable[[], float] = clock
+        # The average throughput of each download seen active
+        self.speeds: Dict[str, float] = {}
+        # The video ids of the downloads stopped for being too slow
+        self.switched: Set[str] = set()
+        # When each download was first seen active and its bytes at that time
+        self._started: Dict[str, Tuple[float, int]] = {}
+
+    def tick(self, rpc: Aria2cRPC, switch: bool = True) -> None:
+        """Sample the downloads in progress, called periodically while aria2c
+        downloads.
+
+        Args:
+            rpc (Aria2cRPC): The client of aria2c.
+            switch (bool, optional): Stop the slow downloads which have another
+                source. Defaults to True.
+        """
+        try:
+            active: List[Dict[str, Any]] = rpc.tell_active(
+                ["gid", "completedLength", "files"]
+            )
+        except requests.exceptions.RequestException:
+            return
+        now: float = self.clock()
+        for download in active:
+            files: List[Dict[str, Any]] = download.get("files") or []
+            if len(files) == 0:
+                continue
+            video_id: Optional[str] = self.paths.get(os.path.abspath(files[0]["path"]))
+            if video_id is None or video_id in self.switched:
+                continue
+            completed: int = int(download["completedLength"])
+            started, initial = self._started.setdefault(video_id, (now, completed))
+            if now <= started:
+                continue
+            self.speeds[video_id] = (completed - initial) / (now - started)
+            if (
+                switch
+                and Config.SOURCE_SWITCH_SPEED > 0
+                and now - started >= Config.SOURCE_SWITCH_AFTER
+                and self.speeds[video_id] < Config.SOURCE_SWITCH_SPEED
+                and self.has_fallback(video_id)
+            ):
+                try:
+                    rpc.remove(download["gid"])
+                except requests.exceptions.RequestException:
+                    continue
+                self.switched.add(video_id)
+
+    def get_speed(self, video_id: str, size: int) -> Optional[float]:
+        """Get the throughput of a download which just completed.
+
+        Args:
+            video_id (str): The video id of the recording.
+            size (int): The size of its file.
+
+        Returns:
+            Optional[float]: The throughput in bytes per second, None if the
+                download was never seen active.
+        """
+        if video_id not in self._started:
+            return None
+        started, initial = self._started[video_id]
+        return (size - initial) / max(self.clock() - started, 1e-3)
@@ -0,0 +1,100 @@
+import os
+import shutil
+from typing import Dict, List
+
+from prd.config import Config
+from prd.webex_api import Recording
+
+
+def get_store_filename(recording: Recording) -> str:
+    """Get the path of a recording in the content store, relative to the output folder.
+
+    The store is keyed by video id, so a recording shared by several courses
+    is downloaded only once.
+
+    Args:
+        recording (Recording): The recording.
+
+    Returns:
+        str: The path of the recording in the store.
+    """
+    return f"{Config.STORE_FOLDER}/{recording.video_id}.mp4"
+
+
+def group_by_video_id(recordings: List[Recording]) -> Dict[str, List[Recording]]:
+    """Group the recordings with the same video id.
+
+    Args:
+        recordings (List[Recording]): The recordings.
+
+    Returns:
+        Dict[str, List[Recording]]: The recordings of each video id, in the order
+            of their first occurrence.
+    """
+    groups: Dict[str, List[Recording]] = {}
+    for r in recordings:
+        groups.setdefault(r.video_id, []).append(r)
+    return groups
+
+
+def _copy(source_path: str, target_path: str) -> None:
+    """Copy a file, letting the kernel share the data when possible.
+
+    os.copy_file_range makes a reflink on filesystems supporting it, such as
+    btrfs and xfs, otherwise shutil falls back to a regular copy.
+
+    Args:
+        source_path (str): The source file.
+        target_path (str): The target file.
+    """
+    if not hasattr(os, "copy_file_range"):
+        shutil.copyfile(source_path, target_path)
+        return
+    with open(source_path, "rb") as src, open(target_path, "wb") as dst:
+        try:
+            remaining: int = os.fstat(src.fileno()).st_size
+            while remaining > 0:
+                copied: int = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+            return
+        except OSError:
+            dst.seek(0)
+            dst.truncate()
+            src.seek(0)
+    shutil.copyfile(source_path, target_path)
+
+
+def link_into_place(store_path: str, target_path: str) -> str:
+    """Make a file of the store available at the path of a course folder.
+
+    A hardlink is used when possible, otherwise the file is copied. A file
+    already at the target path is kept only if it is the file of the store or
+    has its size, otherwise it is a partial or different download and it is
+    replaced atomically.
+
+    Args:
+        store_path (str): The path of the file in the store.
+        target_path (str): The path in the course folder.
+
+    Returns:
+        str: "exists", "hardlink" or "copy".
+    """
+    if os.path.exists(target_path) and (
+        os.path.samefile(store_path, target_path)
+        or os.path.getsize(store_path) == os.path.getsize(target_path)
+    ):
+        return "exists"
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    tmp_path: str = target_path + ".part"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(store_path, tmp_path)
+        method: str = "hardlink"
+    except OSError:
+        _copy(store_path, tmp_path)
+        method = "copy"
+    os.replace(tmp_path, target_path)
+    return method
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from prd.api import Client
+from prd.webex_api import Recording
+
+
+def test_client_txt(mocker, tmp_path):
+    def fake_generate_recording_from_id(video_id, ticket, course, academic_year=None, session=None, **kwargs):
+        assert session is client.session
+        return Recording(video_id, "2021-22", datetime(2022, 3, 1, 10, 15), course, "Subject", "https://example.com/video.mp4")
+
+    mocker.patch("prd.parsers.abstract_parser.generate_recording_from_id", fake_generate_recording_from_id)
+    mocker.patch("prd.parsers.abstract_parser.check_ticket")
+    events = []
+    client = Client(cookie_ticket="TICKET", on_event=lambda event, fields: events.append(event))
+
+    file = tmp_path / "ids.txt"
+    file.write_text("a" * 32 + "\n" + "b" * 32 + "\n")
+    recordings = client.txt(file, "Course")
+    assert events == []
+    assert sorted(r.video_id for r in recordings) == ["a" * 32, "b" * 32]
+    assert events.count("recording_resolved") == 2
+    assert "progress_start" in events and "message" in events
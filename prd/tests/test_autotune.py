@@ -0,0 +1,45 @@
+from prd.autotune import AutoTuner
+from prd.config import Config
+from prd.reporter import Reporter
+
+
+class FakeRPC:
+    """aria2c whose throughput peaks at 32 concurrent downloads and 4 connections."""
+
+    def __init__(self):
+        self.options = {"max-concurrent-downloads": 16, "max-connection-per-server": 16}
+
+    def get_download_speed(self):
+        downloads = self.options["max-concurrent-downloads"]
+        connections = self.options["max-connection-per-server"]
+        return 1000 - abs(downloads - 32) * 10 - abs(connections - 4) * 20
+
+    def change_global_option(self, options):
+        self.options.update(options)
+
+
+def test_auto_tuner_climbs_to_the_best_setting(mocker):
+    mocker.patch.object(Config, "AUTO_TUNE_INTERVAL", 10.0)
+    mocker.patch.object(Config, "AUTO_TUNE_DURATION", 1000.0)
+    now = [0.0]
+    rpc = FakeRPC()
+    tuner = AutoTuner(rpc, 16, 16, reporter=Reporter(), clock=lambda: now[0])
+    while not tuner.done and now[0] < 2000:
+        tuner.tick()
+        now[0] += 2
+    assert rpc.options == {"max-concurrent-downloads": 32, "max-connection-per-server": 4}
+    assert tuner.best[1] == rpc.options
+
+
+def test_auto_tuner_stops_after_the_duration(mocker):
+    mocker.patch.object(Config, "AUTO_TUNE_INTERVAL", 10.0)
+    mocker.patch.object(Config, "AUTO_TUNE_DURATION", 20.0)
+    now = [0.0]
+    rpc = FakeRPC()
+    tuner = AutoTuner(rpc, 16, 16, reporter=Reporter(), clock=lambda: now[0])
+    while not tuner.done:
+        tuner.tick()
+        now[0] += 2
+    # Only the starting setting was measured
+    assert now[0] <= 30
+    assert rpc.options == {"max-concurrent-downloads": 16, "max-connection-per-server": 16}
@@ -0,0 +1,18 @@
+from prd.cache import PersistentCache, clear_caches
+
+
+def test_persistent_cache(mocker, tmp_path):
+    mocker.patch("prd.cache.CACHE_FOLDER_PATH", str(tmp_path))
+    cache = PersistentCache("test")
+    cache.set("positive", {"video_id": "TESTID"})
+    cache.set("negative", None)
+    cache.save()
+
+    cache = PersistentCache("test")
+    assert cache.get("positive") == {"video_id": "TESTID"}
+    assert "negative" in cache
+    assert cache.get("negative", True) is None
+    assert "missing" not in cache
+
+    assert clear_caches() == ["test"]
+    assert len(PersistentCache("test")) == 0
@@ -15,3 +15,13 @@ def test_save_cookie(mocker, tmp_path):
     with open(tmp_cookies_store) as f:
         data = json.load(f)
         assert data["TESTNAME2"] == "TESTVALUE2"
+
+def test_account_cookies(mocker, tmp_path):
+    from prd.cookies import get_tickets
+
+    mocker.patch("prd.cookies.COOKIE_STORE_FILEPATH", os.path.join(tmp_path, './cookies.json'))
+    save_cookie("ticket", "DEFAULT")
+    save_cookie("ticket", "SERVICE1", account="service1")
+    assert get_cookie("ticket") == "DEFAULT"
+    assert get_cookie("ticket", account="service1") == "SERVICE1"
+    assert get_tickets() == {"default": "DEFAULT", "service1": "SERVICE1"}
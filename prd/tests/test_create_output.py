@@ -0,0 +1,198 @@
+import os
+
+from prd.create_output import is_download_complete
+
+
+def test_is_download_complete(tmp_path):
+    path = os.path.join(tmp_path, "recording.mp4")
+    assert not is_download_complete(path)
+
+    open(path, "w").close()
+    open(path + ".aria2", "w").close()
+    assert not is_download_complete(path)
+
+    os.remove(path + ".aria2")
+    # Just created by aria2c, before its control file
+    assert not is_download_complete(path)
+
+    with open(path, "wb") as f:
+        f.write(b"\0" * 10)
+    assert is_download_complete(path)
+    assert is_download_complete(path, 10)
+    assert not is_download_complete(path, 20)
+
+
+def test_create_output_dedup(mocker, tmp_path):
+    from datetime import datetime
+
+    from prd.create_output import create_output
+    from prd.preflight import DiskSpacePolicy
+    from prd.reporter import Reporter
+    from prd.webex_api import Recording
+
+    recordings = [
+        Recording("SHARED", "2021-22", datetime(2022, 3, 1, 10, 15), "Course A", "Subject", "https://example.com/shared.mp4"),
+        Recording("SHARED", "2021-22", datetime(2022, 3, 1, 10, 15), "Course B", "Subject", "https://example.com/shared.mp4"),
+        Recording("OWN", "2021-22", datetime(2022, 3, 2, 10, 15), "Course B", "Subject", "https://example.com/own.mp4"),
+    ]
+    downloaded = []
+
+    def fake_download(to_download, output, on_complete, reporter, get_filename, auto_tune, rpc_port, throttle):
+        for r in to_download:
+            path = os.path.join(output, get_filename(r))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(r.video_id)
+            downloaded.append(r.video_id)
+            on_complete(r, path)
+
+    mocker.patch("prd.create_output.start_aria2c_download", side_effect=fake_download)
+    create_output(recordings, str(tmp_path), create_xlsx=False, aria2c=True, reporter=Reporter(), disk_space_policy=DiskSpacePolicy.ignore, dedup=True)
+
+    assert downloaded == ["SHARED", "OWN"]
+    paths = [os.path.join(tmp_path, r.get_output_filename()) for r in recordings]
+    assert [open(p).read() for p in paths] == ["SHARED", "SHARED", "OWN"]
+    assert os.path.samefile(paths[0], paths[1])
+    assert os.path.samefile(paths[0], os.path.join(tmp_path, ".store", "SHARED.mp4"))
+
+
+def test_link_into_place(tmp_path):
+    from prd.store import link_into_place
+
+    store_path = os.path.join(tmp_path, ".store", "VIDEO.mp4")
+    os.makedirs(os.path.dirname(store_path))
+    with open(store_path, "w") as f:
+        f.write("complete")
+    target_path = os.path.join(tmp_path, "Course", "recording.mp4")
+    assert link_into_place(store_path, target_path) == "hardlink"
+    assert link_into_place(store_path, target_path) == "exists"
+
+    # A partial download left by a previous run is replaced
+    os.remove(target_path)
+    with open(target_path, "w") as f:
+        f.write("part")
+    assert link_into_place(store_path, target_path) == "hardlink"
+    assert os.path.samefile(store_path, target_path)
+    assert not os.path.exists(target_path + ".part")
+
+
+def test_create_output_dedup_postprocesses_once(mocker, tmp_path):
+    from datetime import datetime
+
+    from prd.create_output import create_output
+    from prd.preflight import DiskSpacePolicy
+    from prd.reporter import Reporter
+    from prd.webex_api import Recording
+
+    recordings = [
+        Recording("SHARED", "2021-22", datetime(2022, 3, 1, 10, 15), "Course A", "Subject", "https://example.com/shared.mp4"),
+        Recording("SHARED", "2021-22", datetime(2022, 3, 1, 10, 15), "Course B", "Subject", "https://example.com/shared.mp4"),
+    ]
+
+    def fake_download(to_download, output, on_complete, reporter, get_filename, auto_tune, rpc_port, throttle):
+        for r in to_download:
+            path = os.path.join(output, get_filename(r))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(r.video_id)
+            on_complete(r, path)
+
+    mocker.patch("prd.create_output.start_aria2c_download", side_effect=fake_download)
+    post_processor = mocker.patch("prd.create_output.PostProcessor").return_value
+    post_processor.workers = 1
+    create_output(recordings, str(tmp_path), create_xlsx=False, aria2c=True, postprocess="audio", reporter=Reporter(), disk_space_policy=DiskSpacePolicy.ignore, dedup=True)
+
+    post_processor.submit.assert_called_once_with(
+        os.path.join(tmp_path, ".store", "SHARED.mp4"),
+        [os.path.join(tmp_path, r.get_output_filename()) for r in recordings],
+    )
+
+
+def test_start_aria2c_download_falls_back_to_another_source(mocker, tmp_path):
+    from datetime import datetime
+
+    from prd.cache import PersistentCache
+    from prd.create_output import start_aria2c_download
+    from prd.reporter import Reporter
+    from prd.sources import SourceHistory
+    from prd.webex_api import Recording
+
+    mocker.patch("prd.cache.CACHE_FOLDER_PATH", str(tmp_path))
+    history = SourceHistory(PersistentCache("source_speeds"))
+    history.record("https://fast.example.com/x.mp4", 2000)
+    history.record("https://slow.example.com/x.mp4", 1000)
+    recordings = [
+        Recording("A", "2021-22", datetime(2022, 3, 1, 10, 15), "Course", "Subject", "https://slow.example.com/a.mp4", ["https://slow.example.com/a.mp4", "https://fast.example.com/a.mp4"]),
+        Recording("B", "2021-22", datetime(2022, 3, 2, 10, 15), "Course", "Subject", "https://broken.example.com/b.mp4", ["https://broken.example.com/b.mp4", "https://other.example.com/b.mp4"]),
+    ]
+    attempts = []
+
+    def fake_run(recordings, output, on_complete, reporter, get_filename, get_url, auto_tune, rpc_port, throttle, has_fallback, monitor):
+        assert [has_fallback(r) for r in recordings] == [len(r.download_urls) > len(attempts) + 1 for r in recordings]
+        attempts.append([get_url(r) for r in recordings])
+        for r in recordings:
+            path = os.path.join(output, get_filename(r))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+            if "broken" in get_url(r):
+                # aria2c left the download incomplete
+                open(path + ".aria2", "w").close()
+            else:
+                on_complete(r, path)
+
+    mocker.patch("prd.create_output._run_aria2c", side_effect=fake_run)
+    completed = []
+    start_aria2c_download(recordings, str(tmp_path), on_complete=lambda r, path: completed.append(r.video_id), reporter=Reporter(), history=history)
+
+    # The historically faster host comes first, the failed download is retried once
+    assert attempts == [
+        ["https://fast.example.com/a.mp4", "https://broken.example.com/b.mp4"],
+        ["https://other.example.com/b.mp4"],
+    ]
+    assert completed == ["A", "B"]
+    assert history.get_speed("https://broken.example.com/b.mp4") == 0
+    assert not os.path.exists(os.path.join(tmp_path, recordings[1].get_output_filename() + ".aria2"))
+
+
+class FakeRPC:
+    def __init__(self):
+        self.active = []
+        self.removed = []
+
+    def tell_active(self, keys):
+        return self.active
+
+    def remove(self, gid):
+        self.removed.append(gid)
+
+
+def test_source_monitor(mocker, tmp_path):
+    from prd.sources import SourceMonitor
+
+    mocker.patch("prd.config.Config.SOURCE_SWITCH_AFTER", 30.0)
+    mocker.patch("prd.config.Config.SOURCE_SWITCH_SPEED", 1000)
+    now = [0.0]
+    paths = {os.path.join(tmp_path, name + ".mp4"): name for name in ["queued", "slow", "alone"]}
+    monitor = SourceMonitor(paths, lambda video_id: video_id != "alone", clock=lambda: now[0])
+    rpc = FakeRPC()
+
+    def download(gid, name, completed):
+        return {"gid": gid, "completedLength": str(completed), "files": [{"path": os.path.join(tmp_path, name + ".mp4")}]}
+
+    # The queued download waits 100 seconds before aria2c starts it
+    rpc.active = [download("1", "slow", 0), download("2", "alone", 5000)]
+    monitor.tick(rpc)
+    now[0] = 40.0
+    rpc.active = [download("1", "slow", 20000), download("2", "alone", 10000)]
+    monitor.tick(rpc)
+    assert rpc.removed == ["1"]
+    assert monitor.switched == {"slow"}
+    # Without another source a slow download goes on, the resumed bytes do not count
+    assert monitor.speeds["alone"] == 5000 / 40
+
+    now[0] = 100.0
+    rpc.active = [download("3", "queued", 0)]
+    monitor.tick(rpc)
+    now[0] = 110.0
+    assert monitor.get_speed("queued", 100000) == 10000
+    assert monitor.get_speed("unseen", 100000) is None
@@ -0,0 +1,33 @@
+import threading
+
+import pytest
+
+from prd.executor import TaskGraph
+
+
+def test_task_graph_runs_independent_tasks_concurrently():
+    started = threading.Barrier(2, timeout=5)
+    tasks = TaskGraph()
+    tasks.add("a", lambda: started.wait() is not None and "a")
+    tasks.add("b", lambda: started.wait() is not None and "b")
+    tasks.add("c", lambda a, b: a + b, ["a", "b"])
+    assert tasks.run() == {"a": "a", "b": "b", "c": "ab"}
+
+
+def test_task_graph_propagates_failures():
+    ran = []
+
+    def fail():
+        raise RuntimeError("failed")
+
+    tasks = TaskGraph()
+    tasks.add("a", fail)
+    tasks.add("b", lambda _: ran.append("b"), ["a"])
+    with pytest.raises(RuntimeError, match="failed"):
+        tasks.run()
+    assert ran == []
+
+    with pytest.raises(ValueError):
+        tasks.add("a", fail)
+    with pytest.raises(ValueError):
+        tasks.add("c", fail, ["missing"])
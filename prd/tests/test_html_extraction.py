@@ -0,0 +1,88 @@
+from prd.parsers import ArchivesParser
+from prd.parsers.html_extraction import ArchivesRow, extract_archives_rows, extract_links
+
+ARCHIVES_PAGE = """<html><body>
+<table><tbody class="other"><tr><td><a class="Link" href="/ignored">x</a></td></tr></tbody></table>
+<table class="TableDati">
+<tbody class="TableDati-tbody">
+<tr>
+<td><a class="Link" href="/recman/redirect?id=1">Open</a></td>
+<td>2021 / 22</td>
+<td> 04/10/2021 10:15 </td>
+<td>Analisi &amp; Geometria</td>
+<td>Rossi</td>
+<td>Lezione
+1</td>
+</tr>
+<tr><td><a class="Link" href="/recman/redirect?id=2">Open</a><td>2021 / 22<td>05/10/2021 10:15<td>Fisica<td>Bianchi<td>Lezione 2
+</tbody>
+</table>
+</body></html>"""
+
+
+def chunked(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_extract_archives_rows():
+    expected = [
+        ArchivesRow(("Open", "2021 / 22", " 04/10/2021 10:15 ", "Analisi & Geometria", "Rossi", "Lezione\n1"), "/recman/redirect?id=1"),
+        ArchivesRow(("Open", "2021 / 22", "05/10/2021 10:15", "Fisica", "Bianchi", "Lezione 2\n"), "/recman/redirect?id=2"),
+    ]
+    assert extract_archives_rows([ARCHIVES_PAGE]) == expected
+    # Chunk boundaries can fall anywhere, even inside tags and multibyte characters
+    assert extract_archives_rows(chunked(ARCHIVES_PAGE, 7)) == expected
+    assert [ArchivesParser.get_row_key(r) for r in ArchivesParser.get_rows(ARCHIVES_PAGE.encode())] == ["/recman/redirect?id=1", "/recman/redirect?id=2"]
+
+
+def test_extract_links():
+    page = '<p><a href="https://a.example/1">1</a><a name="x">no href</a>caffè <A HREF="https://a.example/2?x=1&amp;y=2">2</A></p>'.encode()
+    assert extract_links([page[i : i + 5] for i in range(0, len(page), 5)]) == ["https://a.example/1", "https://a.example/2?x=1&y=2"]
+
+
+def test_extraction_in_process_pool(tmp_path):
+    from prd.parsers.html_extraction import extract_file_links, extract_webeep_recording, map_extraction, run_extraction
+
+    page = b'<div id="page-header"><h4>Lezione 1</h4></div><div class="urlworkaround"><a href="https://webex/1">Open</a></div>'
+    assert run_extraction(extract_webeep_recording, page) == ("https://webex/1", "Lezione 1")
+    assert run_extraction(extract_webeep_recording, b"<html></html>") == (None, None)
+
+    files = []
+    for i in range(3):
+        path = tmp_path / f"page{i}.html"
+        path.write_text(f'<a href="https://webex/{i}">Recording</a>')
+        files.append(str(path))
+    assert map_extraction(extract_file_links, files) == [[f"https://webex/{i}"] for i in range(3)]
+
+
+class FakeStreamedResponse:
+    def __init__(self, content, content_type, encoding):
+        self.content = content
+        self.headers = {"content-type": content_type}
+        # requests assumes ISO-8859-1 for text without a charset
+        self.encoding = encoding
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), 5):
+            yield self.content[i : i + 5]
+
+
+def test_iter_response_chunks_charset():
+    from prd.parsers.html_extraction import iter_response_chunks
+
+    page = '<html><head><meta charset="utf-8"></head><body><td>Analisi di Niccolò Çelik</td></body></html>'
+    res = FakeStreamedResponse(page.encode("utf-8"), "text/html", "ISO-8859-1")
+    assert "".join(iter_response_chunks(res)) == page
+
+    # Without any declaration the page is utf-8
+    page = "<td>Università</td>"
+    res = FakeStreamedResponse(page.encode("utf-8"), "text/html", "ISO-8859-1")
+    assert "".join(iter_response_chunks(res)) == page
+
+    page = '<meta http-equiv="Content-Type" content="text/html; charset=windows-1252"><td>Università</td>'
+    res = FakeStreamedResponse(page.encode("cp1252"), "text/html", "ISO-8859-1")
+    assert "".join(iter_response_chunks(res)) == page
+
+    # The charset of the header wins
+    res = FakeStreamedResponse(page.encode("latin-1"), "text/html; charset=ISO-8859-1", "ISO-8859-1")
+    assert "".join(iter_response_chunks(res)) == page
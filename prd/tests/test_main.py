@@ -1,3 +1,5 @@
+import os
+
 from typer.testing import CliRunner
 from typer import BadParameter
 
@@ -7,4 +9,73 @@ runner = CliRunner()
 
 def test_app():
     result = runner.invoke(app, ["set-cookie", "lol", "lol"])
-    assert result.exception
\ No newline at end of file
+    assert result.exception
+
+def test_plan_does_not_touch_the_output(mocker, tmp_path):
+    mocker.patch("prd.cache.CACHE_FOLDER_PATH", str(tmp_path / "cache"))
+    mocker.patch("prd.main.get_cookie", return_value="TICKET")
+    mocker.patch("prd.main.get_tickets", return_value={})
+    mocker.patch("prd.main.TxtParser.parse", return_value=[])
+    mocker.patch("prd.main.Planner.estimate", return_value=[])
+    output = tmp_path / "output"
+    output.mkdir()
+    journal = output / "journal.ndjson"
+    journal.write_text("progress of a crashed run\n")
+    ids = tmp_path / "ids.txt"
+    ids.write_text("a" * 32)
+
+    result = runner.invoke(app, ["txt", str(ids), "--course", "Course", "--academic-year", "2021-22", "--output", str(output), "--plan", "--events", "ndjson"])
+
+    assert result.exit_code == 0, result.output
+    assert journal.read_text() == "progress of a crashed run\n"
+    assert sorted(p.name for p in output.iterdir()) == ["journal.ndjson"]
+
+
+def test_commands_share_the_run_options(mocker, tmp_path):
+    mocker.patch("prd.main.get_cookie", return_value="TICKET")
+    mocker.patch("prd.main.get_tickets", return_value={})
+    parse = mocker.patch("prd.main.WebpageParser.parse_files", return_value=[])
+    create_output = mocker.patch("prd.main.create_output")
+    page = tmp_path / "page.html"
+    page.write_text("<html></html>")
+    output = tmp_path / "output"
+
+    result = runner.invoke(app, ["webpage-html", str(page), "--course", "Course", "--output", str(output), "--no-aria2c", "--dedup", "--limit", "2"])
+
+    assert result.exit_code == 0, result.output
+    assert parse.call_args.args == ([page], "Course", None)
+    kwargs = create_output.call_args.kwargs
+    assert (kwargs["output"], kwargs["aria2c"], kwargs["dedup"], kwargs["create_xlsx"]) == (str(output), False, True, True)
+
+
+def test_settings_apply_to_the_option_defaults(mocker, tmp_path, monkeypatch):
+    import importlib
+
+    import prd.main
+    from prd.config import Config
+
+    saved = {k: v for k, v in vars(Config).items() if k.isupper()}
+    mocker.patch("prd.settings.SETTINGS_FILEPATH", str(tmp_path / "settings.json"))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PRD_DEFAULT_OUTPUT_FOLDER", "lessons")
+    monkeypatch.setenv("PRD_PLAN_SAMPLE_SIZE", "7")
+    try:
+        main = importlib.reload(prd.main)
+        mocker.patch("prd.main.get_cookie", return_value="TICKET")
+        mocker.patch("prd.main.get_tickets", return_value={})
+        mocker.patch("prd.main.TxtParser.parse", return_value=[])
+        create_output = mocker.patch("prd.main.create_output")
+        ids = tmp_path / "ids.txt"
+        ids.write_text("a" * 32)
+
+        result = runner.invoke(main.app, ["txt", "--help"], terminal_width=1000)
+        assert "resolving 7 recordings" in " ".join(result.output.replace("│", " ").split())
+        result = runner.invoke(main.app, ["txt", str(ids), "--course", "Course"])
+        assert result.exit_code == 0, result.output
+        assert os.path.basename(create_output.call_args.kwargs["output"]) == "lessons"
+    finally:
+        for k, v in saved.items():
+            setattr(Config, k, v)
+        monkeypatch.delenv("PRD_DEFAULT_OUTPUT_FOLDER")
+        monkeypatch.delenv("PRD_PLAN_SAMPLE_SIZE")
+        importlib.reload(prd.main)
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+import requests
+
+from prd.metrics import Counter, Histogram, MetricsRegistry, get_resolution_stage
+
+
+def test_metrics_render():
+    counter = Counter("test_total", "A counter.", ("host",))
+    counter.inc(host="a")
+    counter.inc(2, host='b"')
+    assert counter.render().splitlines() == [
+        "# HELP test_total A counter.",
+        "# TYPE test_total counter",
+        'test_total{host="a"} 1',
+        'test_total{host="b\\""} 2',
+    ]
+
+    histogram = Histogram("test_seconds", "A histogram.", buckets=(1, 5))
+    histogram.observe(0.5)
+    histogram.observe(3)
+    assert histogram.render().splitlines()[2:] == [
+        'test_seconds_bucket{le="1"} 1',
+        'test_seconds_bucket{le="5"} 2',
+        'test_seconds_bucket{le="+Inf"} 2',
+        "test_seconds_sum 3.5",
+        "test_seconds_count 2",
+    ]
+
+
+def test_metrics_session_and_server():
+    registry = MetricsRegistry()
+    res = requests.Response()
+    res.url = "https://politecnicomilano.webex.com/webappng/api/v1/recordings/ID/stream?siteurl=politecnicomilano"
+    res.status_code = 429
+    res.elapsed = timedelta(seconds=0.2)
+    registry._on_response(res)
+    assert registry.http_requests.get(host="politecnicomilano.webex.com", status="429") == 1
+    assert 'prd_resolution_stage_duration_seconds_count{stage="stream_api"} 1' in registry.render()
+
+    url = registry.start_server(0)
+    try:
+        body = requests.get(url).text
+        assert "# TYPE prd_http_requests_total counter" in body
+        assert requests.get(url.replace("/metrics", "/other")).status_code == 404
+    finally:
+        registry.stop_server()
+
+
+def test_get_resolution_stage():
+    assert get_resolution_stage("https://politecnicomilano.webex.com/politecnicomilano/ldr.php?RCID=1") == "ldr"
+    assert get_resolution_stage("https://www11.ceda.polimi.it/recman_frontend/recman_frontend/controller/ArchivioListActivity.do") is None
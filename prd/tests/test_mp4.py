@@ -0,0 +1,185 @@
+import os
+import struct
+
+from prd.mp4 import Box, parse_boxes
+
+
+def box(type, payload=b"", children=None):
+    return Box(type, payload, children).to_bytes() if children is None else Box(type, children=children).to_bytes()
+
+
+def full_box(type, version_flags, payload):
+    return Box(type, struct.pack(">I", version_flags) + payload)
+
+
+class FakeResponse:
+    def __init__(self, status_code, content, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i : i + chunk_size]
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeRangeSession:
+    """Serve a file, with range requests if supported."""
+
+    def __init__(self, data, ranges=True):
+        self.data = data
+        self.ranges = ranges
+        self.requested = 0
+
+    def get(self, url, headers=None, stream=False):
+        if not self.ranges or headers is None or "Range" not in headers:
+            self.requested += len(self.data)
+            return FakeResponse(200, self.data)
+        start, end = headers["Range"][len("bytes="):].split("-")
+        content = self.data[int(start) : int(end) + 1]
+        self.requested += len(content)
+        return FakeResponse(206, content, {"Content-Range": f"bytes {start}-{end}/{len(self.data)}"})
+
+
+def make_faststart_test_file():
+    """An MP4 with its moov box after the media data, with two chunks."""
+    ftyp = box("ftyp", b"isom\x00\x00\x02\x00isommp41")
+    mdat = box("mdat", b"A" * 10 + b"B" * 10)
+    chunk_offsets = [len(ftyp) + 8, len(ftyp) + 18]
+    stco = full_box("stco", 0, struct.pack(">3I", 2, *chunk_offsets))
+    moov = Box("moov", children=[Box("trak", children=[Box("mdia", children=[Box("minf", children=[Box("stbl", children=[stco])])])])])
+    return ftyp + mdat + moov.to_bytes()
+
+
+def get_chunk_offsets(data):
+    moov = next(b for b in parse_boxes(data) if b.type == "moov")
+    stco = next(b for b in moov.walk() if b.type in ("stco", "co64"))
+    count = struct.unpack_from(">I", stco.payload, 4)[0]
+    return list(struct.unpack_from(f">{count}{'I' if stco.type == 'stco' else 'Q'}", stco.payload, 8))
+
+
+def test_download_in_order_moves_the_moov_box_first(tmp_path):
+    from prd.priority import download_in_order, get_in_order_marker
+
+    data = make_faststart_test_file()
+    path = str(tmp_path / "course" / "recording.mp4")
+    download_in_order("https://example.com/r.mp4", path, FakeRangeSession(data))
+
+    result = open(path, "rb").read()
+    assert [b.type for b in parse_boxes(result)] == ["ftyp", "moov", "mdat"]
+    assert [result[o : o + 10] for o in get_chunk_offsets(result)] == [b"A" * 10, b"B" * 10]
+    assert not os.path.exists(get_in_order_marker(path))
+
+    # An interrupted download is resumed from the same source
+    with open(path, "r+b") as f:
+        f.truncate(len(result) - 15)
+    with open(get_in_order_marker(path), "w") as f:
+        f.write("https://example.com/r.mp4")
+    session = FakeRangeSession(data)
+    download_in_order("https://example.com/r.mp4", path, session)
+    assert open(path, "rb").read() == result
+
+    # Without range requests the file is downloaded as it is
+    download_in_order("https://example.com/r.mp4", path, FakeRangeSession(data, ranges=False))
+    assert open(path, "rb").read() == data
+
+
+def test_select_priority():
+    from datetime import datetime
+
+    from prd.priority import select_priority
+    from prd.webex_api import Recording
+
+    recordings = [
+        Recording(str(i), "2021-22", datetime(2022, 3, i, 10, 15), "Course", f"Lesson {i}", "https://example.com/r.mp4")
+        for i in range(1, 6)
+    ]
+    assert [r.video_id for r in select_priority(recordings, newest=2)] == ["5", "4"]
+    assert [r.video_id for r in select_priority(recordings, newest=1, subject_regex="lesson [12]$")] == ["5", "2", "1"]
+    assert select_priority(recordings) == []
+
+
+def make_track(track_id, handler, timescale, durations, sizes, chunk_offsets, samples_per_chunk, sync=None, composition_offsets=None):
+    tables = [
+        Box("stsd", struct.pack(">II", 0, 0)),
+        full_box("stts", 0, struct.pack(f">I{2 * len(durations)}I", len(durations), *[v for d in durations for v in (1, d)])),
+        full_box("stsz", 0, struct.pack(f">II{len(sizes)}I", 0, len(sizes), *sizes)),
+        full_box("stsc", 0, struct.pack(">IIII", 1, 1, samples_per_chunk, 1)),
+        full_box("stco", 0, struct.pack(f">I{len(chunk_offsets)}I", len(chunk_offsets), *chunk_offsets)),
+    ]
+    if sync is not None:
+        tables.append(full_box("stss", 0, struct.pack(f">I{len(sync)}I", len(sync), *sync)))
+    if composition_offsets is not None:
+        tables.append(full_box("ctts", 0, struct.pack(f">I{2 * len(composition_offsets)}I", len(composition_offsets), *[v for c in composition_offsets for v in (1, c)])))
+    return Box("trak", children=[
+        full_box("tkhd", 0, struct.pack(">IIIII", 0, 0, track_id, 0, sum(durations)) + b"\x00" * 60),
+        Box("mdia", children=[
+            full_box("mdhd", 0, struct.pack(">IIII", 0, 0, timescale, sum(durations)) + b"\x00" * 4),
+            full_box("hdlr", 0, struct.pack(">I4s", 0, handler.encode()) + b"\x00" * 13),
+            Box("minf", children=[Box("stbl", children=tables)]),
+        ]),
+    ])
+
+
+def make_clip_test_file():
+    """A 10 seconds MP4 with a video track with a keyframe every 3 seconds and
+    an audio track, interleaved as a video sample followed by two audio samples.
+    """
+    ftyp = box("ftyp", b"isom\x00\x00\x02\x00isommp41")
+    media = b""
+    video_offsets, audio_offsets = [], []
+    for i in range(10):
+        video_offsets.append(len(ftyp) + 8 + len(media))
+        media += bytes([i]) * 10
+        audio_offsets.append(len(ftyp) + 8 + len(media))
+        media += bytes([100 + 2 * i]) * 4 + bytes([101 + 2 * i]) * 4
+    video = make_track(1, "vide", 1000, [1000] * 10, [10] * 10, video_offsets, 1, sync=[1, 4, 7, 10], composition_offsets=[500] * 10)
+    audio = make_track(2, "soun", 1000, [500] * 20, [4] * 20, audio_offsets, 2)
+    mvhd = full_box("mvhd", 0, struct.pack(">IIII", 0, 0, 1000, 10000) + b"\x00" * 80)
+    moov = Box("moov", children=[mvhd, video, audio])
+    return ftyp + box("mdat", media) + moov.to_bytes()
+
+
+def test_download_clip(tmp_path):
+    from prd.clip import download_clip, parse_clip
+    from prd.mp4 import Track
+
+    data = make_clip_test_file()
+    session = FakeRangeSession(data)
+    path = str(tmp_path / "clip.mp4")
+    start, end = parse_clip("0:04.5-7.2")
+    download_clip("https://example.com/r.mp4", path, start, end, session)
+
+    result = open(path, "rb").read()
+    boxes = parse_boxes(result)
+    assert [b.type for b in boxes] == ["ftyp", "moov", "mdat"]
+    video, audio = [Track(t) for t in boxes[1].find_all("trak")]
+    # The clip starts at the keyframe at 3 seconds
+    assert [result[o] for o in video.offsets] == [3, 4, 5, 6, 7]
+    assert [s for s in range(5) if video.is_sync(s)] == [0, 3]
+    assert video.times == [0, 1000, 2000, 3000, 4000]
+    assert video.composition_offsets == [500] * 5
+    assert [result[o] for o in audio.offsets] == list(range(106, 115))
+    assert all(result[o : o + 4] == bytes([result[o]]) * 4 for o in audio.offsets)
+    assert session.requested < len(data)
+
+
+def test_parse_clip():
+    import pytest
+
+    from prd.clip import parse_clip
+
+    assert parse_clip("1:00:00-1:20:30") == (3600, 4830)
+    assert parse_clip("90-120") == (90, 120)
+    for value in ["10", "20-10", "a-b", "1:2:3:4-5"]:
+        with pytest.raises(ValueError):
+            parse_clip(value)
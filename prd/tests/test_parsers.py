@@ -0,0 +1,173 @@
+from prd.parsers import WebeepParser
+
+
+def test_webeep_is_possible_recording_link():
+    assert WebeepParser._is_possible_recording_link("https://webeep.polimi.it/mod/url/view.php?id=1")
+    assert not WebeepParser._is_possible_recording_link("https://webeep.polimi.it/mod/resource/view.php?id=1")
+    assert not WebeepParser._is_possible_recording_link("https://webeep.polimi.it/mod/forum/view.php?id=1")
+    assert WebeepParser._is_possible_recording_link("https://example.com/recording")
+
+
+def test_parser_map_emits_events(tmp_path):
+    import json
+    from datetime import datetime
+
+    from prd.events import emitter
+    from prd.parsers import Parser
+    from prd.webex_api import Recording
+
+    def resolve(video_id):
+        if video_id == "FAIL":
+            raise RuntimeError("failed")
+        return Recording(video_id, "2021-22", datetime(2022, 3, 1, 10, 15), "Course", "Subject", "https://example.com/video.mp4")
+
+    events_file = tmp_path / "events.ndjson"
+    emitter.open(str(events_file))
+    try:
+        results = Parser()._map(resolve, [("ID1",), ("FAIL",), ("ID2",)], description="Test")
+        assert sorted(r.video_id for r in results) == ["ID1", "ID2"]
+    finally:
+        emitter.close()
+
+    events = [json.loads(line) for line in open(events_file)]
+    assert sorted(e["event"] for e in events) == ["recording_resolved", "recording_resolved", "resolution_failed"]
+    assert [e["item"] for e in events if e["event"] == "resolution_failed"] == ["FAIL"]
+
+
+def test_parser_map_journal(tmp_path):
+    from datetime import datetime
+
+    from prd.journal import Journal
+    from prd.parsers import Parser
+    from prd.webex_api import Recording
+
+    calls = []
+
+    def resolve(video_id, fail):
+        calls.append(video_id)
+        if fail:
+            raise RuntimeError("failed")
+        return Recording(video_id, "2021-22", datetime(2022, 3, 1, 10, 15), "Course", "Subject", "https://example.com/video.mp4")
+
+    path = str(tmp_path / "journal.ndjson")
+    journal = Journal(path)
+    results = Parser(journal=journal)._map(resolve, [("ID1", False), ("ID2", True)], description="Test", key=lambda args: args[0])
+    journal.close()
+    assert [r.video_id for r in results] == ["ID1"]
+
+    journal = Journal(path, resume=True)
+    assert journal.get_failed() == ["ID2"]
+    calls.clear()
+    results = Parser(journal=journal)._map(resolve, [("ID1", False), ("ID2", False)], description="Test", key=lambda args: args[0])
+    journal.close()
+    assert calls == ["ID2"]
+    assert sorted(r.video_id for r in results) == ["ID1", "ID2"]
+    assert Journal(path, resume=True).get_failed() == []
+
+
+def test_parser_map_stops_when_session_expires():
+    import pytest
+
+    from prd.parsers import Parser
+    from prd.webex_api import SessionExpiredError
+
+    calls = []
+
+    def resolve(video_id):
+        calls.append(video_id)
+        raise SessionExpiredError("expired")
+
+    parser = Parser()
+    with pytest.raises(SessionExpiredError, match="not started"):
+        parser._map(resolve, [(f"ID{i}",) for i in range(200)], description="Test")
+    # The items dispatched after the first failure are not requested
+    assert len(calls) < 200
+
+
+def test_parser_map_filters_before_resolving():
+    from datetime import date, datetime
+
+    from prd.filters import RecordingFilter
+    from prd.parsers import Parser
+    from prd.webex_api import Recording
+
+    calls = []
+
+    def resolve(video_id, day, subject):
+        calls.append(video_id)
+        return Recording(video_id, "2021-22", datetime(2022, 3, day, 10, 15), "Course", subject, "https://example.com/video.mp4")
+
+    items = [("ID1", 1, "Intro"), ("ID2", 2, "Lab 1"), ("ID3", 3, "Lab 2"), ("ID4", 4, "Lab 3")]
+    parser = Parser()
+    parser.recording_filter = RecordingFilter(since=date(2022, 3, 2), subject_regex="^lab", limit=2)
+    results = parser._map(resolve, items, description="Test", info=lambda args: (datetime(2022, 3, args[1]), "2021-22", args[2]))
+    assert sorted(r.video_id for r in results) == ["ID2", "ID3"]
+    # The rows filtered out and the ones over the limit are never resolved
+    assert sorted(calls) == ["ID2", "ID3"]
+
+    # Without the information the recordings are filtered once resolved
+    calls.clear()
+    parser.recording_filter = RecordingFilter(subject_regex="^lab", limit=1)
+    results = parser._map(resolve, items, description="Test")
+    assert len(results) == 1 and results[0].subject.startswith("Lab")
+
+
+def test_parser_crawl():
+    from prd.parsers import WebpageParser
+
+    site = {
+        "https://example.com/": ["https://example.com/week1", "https://example.com/notes.pdf", "https://other.com/page"],
+        "https://example.com/week1": ["https://example.com/", "https://example.com/week1/lab", "https://webex/1"],
+        "https://example.com/week1/lab": ["https://webex/2"],
+    }
+    fetched = []
+
+    def fetch_links(url):
+        fetched.append(url)
+        return site[url]
+
+    parser = WebpageParser(cookie_ticket="TICKET")
+    is_page = lambda link: WebpageParser._is_same_site_page(link, "https://example.com/")
+    start = site["https://example.com/"]
+
+    assert parser._crawl(start, 0, fetch_links, is_page, visited={"https://example.com/"}) == start
+    assert fetched == []
+
+    links = parser._crawl(start, 1, fetch_links, is_page, visited={"https://example.com/"})
+    assert "https://webex/1" in links and "https://webex/2" not in links
+    assert fetched == ["https://example.com/week1"]
+
+    fetched.clear()
+    links = parser._crawl(start, 5, fetch_links, is_page, visited={"https://example.com/"})
+    assert "https://webex/2" in links
+    assert len(links) == len(set(links))
+    # Each page is fetched once, other sites and files are never fetched
+    assert sorted(fetched) == ["https://example.com/week1", "https://example.com/week1/lab"]
+
+
+def test_parser_crawl_failure_is_not_a_failed_resolution(mocker):
+    from prd.metrics import metrics
+    from prd.parsers import WebpageParser
+    from prd.reporter import Reporter
+
+    def fetch_links(url):
+        if url.endswith("broken"):
+            raise ConnectionError("unreachable")
+        return ["https://webex/1"]
+
+    reporter = Reporter()
+    resolution_failed = mocker.spy(reporter, "resolution_failed")
+    message = mocker.spy(reporter, "message")
+    emit = mocker.patch("prd.parsers.abstract_parser.emitter.emit")
+    parser = WebpageParser(cookie_ticket="TICKET", reporter=reporter)
+    is_page = lambda link: link.startswith("https://example.com/")
+    start = ["https://example.com/broken", "https://example.com/week1"]
+
+    failed_resolutions = metrics.resolutions_failed.get()
+    links = parser._crawl(start, 1, fetch_links, is_page)
+    assert "https://webex/1" in links
+    assert parser.failed_keys == []
+    assert metrics.resolutions_failed.get() == failed_resolutions
+    assert resolution_failed.call_count == 0
+    assert emit.call_count == 0
+    assert any("https://example.com/broken" in c.args[0] for c in message.call_args_list)
@@ -0,0 +1,49 @@
+import os
+from datetime import datetime
+
+from prd.placement import PlacementPolicy, place_recordings, read_output_index, write_output_index
+from prd.reporter import Reporter
+from prd.webex_api import Recording
+
+
+def make_recording(video_id, course):
+    return Recording(video_id, "2021-22", datetime(2022, 3, 1, 10, int(video_id)), course, "Subject", f"https://example.com/{video_id}.mp4")
+
+
+def test_place_recordings_by_course(tmp_path):
+    roots = [str(tmp_path / "a"), str(tmp_path / "b")]
+    recordings = [make_recording("1", "X"), make_recording("2", "Y"), make_recording("3", "X")]
+
+    placement = place_recordings(recordings, roots, PlacementPolicy.course, reporter=Reporter())
+    assert [r.video_id for r in placement[roots[0]]] == ["1", "3"]
+    assert [r.video_id for r in placement[roots[1]]] == ["2"]
+
+    write_output_index(roots[0], placement)
+    assert read_output_index(roots[0]) == {"X 2021-22": [roots[0]], "Y 2021-22": [roots[1]]}
+
+    # A course stays where the index puts it
+    placement = place_recordings([make_recording("4", "Y")], roots, PlacementPolicy.course, reporter=Reporter())
+    assert [r.video_id for r in placement[roots[1]]] == ["4"]
+
+
+def test_place_recordings_round_robin_keeps_existing_downloads(tmp_path):
+    roots = [str(tmp_path / "a"), str(tmp_path / "b")]
+    recordings = [make_recording(str(i), "X") for i in range(1, 5)]
+    existing = os.path.join(roots[1], recordings[0].get_output_filename())
+    os.makedirs(os.path.dirname(existing))
+    open(existing, "w").close()
+
+    placement = place_recordings(recordings, roots, PlacementPolicy.round_robin, reporter=Reporter())
+    assert [r.video_id for r in placement[roots[0]]] == ["2", "4"]
+    assert [r.video_id for r in placement[roots[1]]] == ["1", "3"]
+
+
+def test_place_recordings_most_free(mocker, tmp_path):
+    roots = [str(tmp_path / "a"), str(tmp_path / "b")]
+    mocker.patch("prd.placement._get_free_space", return_value={roots[0]: 300, roots[1]: 200})
+    mocker.patch("prd.placement._get_device", side_effect=lambda root: root)
+    recordings = [make_recording(str(i), "X") for i in range(1, 4)]
+
+    placement = place_recordings(recordings, roots, PlacementPolicy.most_free, reporter=Reporter(), sizes=[150, 100, None])
+    assert [r.video_id for r in placement[roots[0]]] == ["1", "3"]
+    assert [r.video_id for r in placement[roots[1]]] == ["2"]
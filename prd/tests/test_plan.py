@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from prd.parsers import Parser
+from prd.plan import Planner
+from prd.webex_api import Recording
+
+
+def test_planner_extrapolates_sample(mocker, tmp_path):
+    mocker.patch("prd.plan.get_expected_sizes", side_effect=lambda recordings, reporter=None: [100] * len(recordings))
+    mocker.patch("prd.plan.measure_bandwidth", return_value=None)
+
+    parser = Parser()
+    planner = Planner(parser, sample_size=2)
+    def resolve(video_id, course):
+        # Simulate one request per resolved item
+        planner.stats.resolution_requests += 1
+        return Recording(video_id, "2021-22", datetime(2022, 3, 1, 10, 15), course, "Subject", "https://example.com/video.mp4")
+
+    items = [(f"A{i}", "Course A") for i in range(10)] + [(f"B{i}", "Course B") for i in range(3)]
+    recordings = parser._map(resolve, items, description="Test", key=lambda args: args[0], course=lambda args: args[1])
+    assert len(recordings) == 4
+
+    plans = {p.course: p for p in planner.estimate(recordings, str(tmp_path))}
+    assert plans["Course A"].recordings == 10
+    assert plans["Course A"].size == 1000
+    assert plans["Course B"].recordings == 3
+    # Resolution, HEAD and download requests
+    assert plans["Course A"].requests == 10 + 10 + 10
+
+    # The resolution time is divided by the workers of the parser pool
+    from prd.config import Config
+
+    mocker.patch.object(Config, "PARSER_WORKERS", 5)
+    mocker.patch.object(planner.stats, "get_mean_latency", return_value=1.0)
+    plans = {p.course: p for p in planner.estimate(recordings, str(tmp_path))}
+    assert plans["Course A"].seconds == 10 / 5
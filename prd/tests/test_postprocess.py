@@ -0,0 +1,59 @@
+import os
+
+from prd.postprocess import get_postprocess_output_path, is_up_to_date
+
+
+def test_get_postprocess_output_path():
+    assert get_postprocess_output_path("out/Course 2021-22/2022-03-01 10-15.mp4", "audio", ".m4a") == "out/Course 2021-22/2022-03-01 10-15.audio.m4a"
+
+def test_is_up_to_date(tmp_path):
+    input_path = os.path.join(tmp_path, "input.mp4")
+    output_path = os.path.join(tmp_path, "input.audio.m4a")
+    open(input_path, "w").close()
+    assert not is_up_to_date(input_path, output_path)
+
+    open(output_path, "w").close()
+    os.utime(input_path, (1000, 1000))
+    os.utime(output_path, (2000, 2000))
+    assert is_up_to_date(input_path, output_path)
+
+    os.utime(input_path, (3000, 3000))
+    assert not is_up_to_date(input_path, output_path)
+
+
+def test_load_presets_rejects_malformed_file(mocker, tmp_path):
+    import json
+
+    import pytest
+
+    from prd.postprocess import PostProcessor, load_presets
+
+    path = os.path.join(tmp_path, "postprocess_presets.json")
+    mocker.patch("prd.postprocess.PRESETS_FILEPATH", path)
+    with open(path, "w") as f:
+        json.dump({"mp3": {"extension": ".mp3", "args": ["-vn"]}}, f)
+    assert load_presets()["mp3"] == {"extension": ".mp3", "args": ["-vn"]}
+
+    with open(path, "w") as f:
+        json.dump({"mp3": {"args": ["-vn"]}}, f)
+    with pytest.raises(ValueError, match='"mp3"'):
+        PostProcessor("mp3")
+
+
+def test_postprocessor_is_closed_when_the_download_fails(mocker, tmp_path):
+    from datetime import datetime
+
+    import pytest
+
+    from prd.create_output import create_output
+    from prd.postprocess import PostProcessor
+    from prd.preflight import DiskSpacePolicy
+    from prd.reporter import Reporter
+    from prd.webex_api import Recording
+
+    recordings = [Recording("VIDEO", "2021-22", datetime(2022, 3, 1, 10, 15), "Course", "Subject", "https://example.com/video.mp4")]
+    mocker.patch("prd.create_output.start_aria2c_download", side_effect=RuntimeError("aria2c failed"))
+    close = mocker.spy(PostProcessor, "close")
+    with pytest.raises(Exception):
+        create_output(recordings, str(tmp_path), create_xlsx=False, aria2c=True, postprocess="audio", reporter=Reporter(), disk_space_policy=DiskSpacePolicy.ignore)
+    assert close.call_count == 1
@@ -0,0 +1,38 @@
+from collections import namedtuple
+from datetime import datetime
+
+import pytest
+
+from prd.preflight import DiskSpacePolicy, InsufficientDiskSpaceError, check_disk_space, get_missing_bytes
+from prd.webex_api import Recording
+
+DiskUsage = namedtuple("DiskUsage", ["total", "used", "free"])
+
+
+def make_recordings(n):
+    return [
+        Recording(f"ID{i}", "2021-22", datetime(2022, 3, i + 1, 10, 15), "Course", "Subject", f"https://example.com/{i}.mp4")
+        for i in range(n)
+    ]
+
+
+def test_check_disk_space(mocker, tmp_path):
+    mocker.patch("prd.preflight.Config.DISK_SPACE_MARGIN", 0)
+    mocker.patch("prd.preflight.shutil.disk_usage", return_value=DiskUsage(1000, 750, 250))
+    recordings = make_recordings(3)
+    sizes = [100, 100, 100]
+
+    with pytest.raises(InsufficientDiskSpaceError):
+        check_disk_space(recordings, sizes, str(tmp_path), DiskSpacePolicy.refuse)
+
+    assert check_disk_space(recordings, sizes, str(tmp_path), DiskSpacePolicy.trim) == recordings[:2]
+    # Unknown sizes are not counted
+    assert check_disk_space(recordings, [100, None, 100], str(tmp_path), DiskSpacePolicy.refuse) == recordings
+
+
+def test_get_missing_bytes(tmp_path):
+    path = tmp_path / "video.mp4"
+    assert get_missing_bytes(str(path), 100) == 100
+    path.write_bytes(b"x" * 40)
+    assert get_missing_bytes(str(path), 100) == 60
+    assert get_missing_bytes(str(path), None) == 0
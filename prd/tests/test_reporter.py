@@ -0,0 +1,33 @@
+import threading
+
+from prd.reporter import ConsoleReporter
+
+
+def test_console_reporter_progress_of_concurrent_tasks():
+    reporter = ConsoleReporter()
+    started = threading.Event()
+    stopped = threading.Event()
+
+    def other_task():
+        reporter.progress_start("Other", 2)
+        started.set()
+        stopped.wait()
+        reporter.progress_advance()
+        reporter.progress_stop()
+
+    thread = threading.Thread(target=other_task)
+    thread.start()
+    started.wait(5)
+    try:
+        reporter.progress_start("Main", 1)
+        progress = reporter._progress
+        reporter.progress_advance()
+        reporter.progress_stop()
+
+        # The bar of the other task is still running
+        assert reporter._progress is progress and progress.live.is_started
+    finally:
+        stopped.set()
+        thread.join(5)
+    assert reporter._progress is None
+    assert [t.completed for t in progress.tasks] == [1, 1]
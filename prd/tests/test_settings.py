@@ -0,0 +1,54 @@
+import json
+import os
+
+import pytest
+
+from prd.config import Config
+from prd.settings import load_settings
+
+
+@pytest.fixture
+def restore_config():
+    saved = {k: v for k, v in vars(Config).items() if k.isupper()}
+    yield
+    for k, v in saved.items():
+        setattr(Config, k, v)
+
+
+def test_load_settings(tmp_path, restore_config):
+    path = os.path.join(tmp_path, "settings.json")
+    with open(path, "w") as f:
+        json.dump({"ARIA2C_CONCURRENT_DOWNLOADS": 4, "AUTO_TUNE_INTERVAL": 5}, f)
+
+    overridden = load_settings(
+        path,
+        {
+            "PRD_ARIA2C_CONCURRENT_DOWNLOADS": "8",
+            "PRD_PARSER_WORKERS": "32",
+            "PRD_DEFAULT_OUTPUT_FOLDER": "recordings",
+            "PRD_UNRELATED": "1",
+        },
+    )
+    assert set(overridden) == {
+        "ARIA2C_CONCURRENT_DOWNLOADS",
+        "AUTO_TUNE_INTERVAL",
+        "PARSER_WORKERS",
+        "DEFAULT_OUTPUT_FOLDER",
+    }
+    # The environment takes precedence over the file
+    assert Config.ARIA2C_CONCURRENT_DOWNLOADS == 8
+    assert Config.AUTO_TUNE_INTERVAL == 5.0
+    assert Config.PARSER_WORKERS == 32
+    assert Config.DEFAULT_OUTPUT_FOLDER == "recordings"
+
+
+def test_load_settings_invalid(tmp_path, restore_config):
+    path = os.path.join(tmp_path, "settings.json")
+    with pytest.raises(ValueError, match="must be an integer|must be of type int"):
+        load_settings(path, {"PRD_ARIA2C_CONNECTIONS": "many"})
+
+    with open(path, "w") as f:
+        json.dump({"ARIA2C_MISSING": 4}, f)
+    with pytest.raises(ValueError, match="does not exist"):
+        load_settings(path, {})
+    assert Config.ARIA2C_CONNECTIONS == 16
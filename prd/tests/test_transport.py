@@ -0,0 +1,60 @@
+import pytest
+import requests
+
+from prd.config import Config
+from prd.transport import Http2Adapter, create_session
+from prd.webex_api import generate_recording_from_id
+
+httpx = pytest.importorskip("httpx")
+
+
+def test_generate_recording_from_id_over_http2():
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(
+            200,
+            json={
+                "recordName": "Lesson",
+                "createTime": "2021-10-04 10:15:00",
+                "preventDownload": False,
+                "downloadRecordingInfo": {"downloadInfo": {"mp4URL": "https://example.com/a.mp4"}},
+            },
+        )
+
+    session = requests.Session()
+    session.mount("https://politecnicomilano.webex.com/", Http2Adapter(httpx.AsyncClient(transport=httpx.MockTransport(handler))))
+    recording = generate_recording_from_id("a" * 32, "TICKET", "Course", session=session)
+
+    assert recording.download_url == "https://example.com/a.mp4"
+    assert requests_seen[0].headers["cookie"] == "ticket=TICKET"
+
+
+def test_http2_adapter_follows_redirects_and_keeps_cookies():
+    def handler(request):
+        if request.url.path == "/ldr.php":
+            return httpx.Response(302, headers={"location": "/playback", "set-cookie": "a=1; Path=/"})
+        if request.url.path == "/error":
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200, text=request.headers.get("cookie", ""))
+
+    session = requests.Session()
+    session.mount("https://politecnicomilano.webex.com/", Http2Adapter(httpx.AsyncClient(transport=httpx.MockTransport(handler))))
+    res = session.get("https://politecnicomilano.webex.com/ldr.php", cookies={"ticket": "TICKET"})
+
+    assert res.status_code == 200
+    assert len(res.history) == 1
+    assert res.text == "ticket=TICKET; a=1"
+    assert session.cookies.get("a") == "1"
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get("https://politecnicomilano.webex.com/error")
+
+
+def test_create_session_mounts_only_the_http2_hosts(mocker):
+    mocker.patch.object(Config, "HTTP2_HOSTS", ["politecnicomilano.webex.com"])
+    session = create_session()
+
+    assert isinstance(session.get_adapter("https://politecnicomilano.webex.com/webappng/api/v1/recordings"), Http2Adapter)
+    assert not isinstance(session.get_adapter("https://www11.ceda.polimi.it/recman_frontend/"), Http2Adapter)
+    assert not isinstance(create_session([]).get_adapter("https://politecnicomilano.webex.com/"), Http2Adapter)
@@ -0,0 +1,68 @@
+from prd.watch import ConditionalFetcher
+
+
+class FakeResponse:
+    def __init__(self, url, status_code, content, headers):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+
+def test_conditional_fetcher(mocker, tmp_path):
+    mocker.patch("prd.cache.CACHE_FOLDER_PATH", str(tmp_path))
+    url = "https://webeep.polimi.it/course/view.php?id=1"
+    fetcher = ConditionalFetcher()
+
+    first = FakeResponse(url, 200, b"page", {"ETag": '"v1"'})
+    get = mocker.patch.object(fetcher.session, "get", return_value=first)
+    assert fetcher.get(url, {}) is first
+    fetcher.commit(first)
+
+    # Validators are sent and a 304 means the page did not change
+    get.return_value = FakeResponse(url, 304, b"", {})
+    assert fetcher.get(url, {}) is None
+    assert get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+    # Without validators support the content hash is compared
+    get.return_value = FakeResponse(url, 200, b"page", {})
+    assert fetcher.get(url, {}) is None
+    changed = FakeResponse(url, 200, b"new page", {})
+    get.return_value = changed
+    assert fetcher.get(url, {}) is changed
+
+
+def test_watcher_retries_recordings_whose_download_failed(mocker, tmp_path):
+    import os
+    from datetime import datetime
+
+    from prd.watch import Watcher
+    from prd.webex_api import Recording
+
+    mocker.patch("prd.cache.CACHE_FOLDER_PATH", str(tmp_path / "cache"))
+    url = "https://webeep.polimi.it/course/view.php?id=2"
+    output = str(tmp_path / "output")
+    watcher = Watcher([url], output, aria2c=True, cookie_ticket="TICKET", cookie_MoodleSession="SESSION")
+    recording = Recording("A", "2021-22", datetime(2022, 3, 1, 10, 15), "Course", "Subject", "https://example.com/a.mp4")
+    mocker.patch.object(watcher.fetcher.session, "get", return_value=FakeResponse(url, 200, b"page", {}))
+    mocker.patch("prd.watch.WebeepParser.get_links", return_value=("Course", "2021-22", ["link"]))
+    parse_links = mocker.patch.object(watcher.webeep_parser, "parse_links", return_value=[recording])
+
+    # aria2c fails, nothing is downloaded
+    create_output = mocker.patch("prd.watch.create_output")
+    assert watcher.poll() == [recording]
+    assert watcher.poll() == [recording]
+    assert parse_links.call_count == 2
+
+    def download(recordings, output, **kwargs):
+        for r in recordings:
+            path = os.path.join(output, r.get_output_filename())
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("video")
+
+    create_output.side_effect = download
+    assert watcher.poll() == [recording]
+    # Once downloaded the page is remembered as processed
+    assert watcher.poll() == []
+    assert parse_links.call_count == 3
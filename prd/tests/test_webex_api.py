@@ -0,0 +1,281 @@
+import json
+
+from prd.cache import PersistentCache
+from prd.webex_api import extract_id_from_url
+
+
+class FakeResponse:
+    status_code = 200
+    url = "https://politecnicomilano.webex.com/politecnicomilano/ldr.php?RCID=abc"
+    text = '<a href="https://politecnicomilano.webex.com/recordingservice/sites/politecnicomilano/recording/playback/0123456789abcdef0123456789abcdef">'
+
+
+def test_extract_id_from_url_ldr_cache(mocker, tmp_path):
+    mocker.patch("prd.cache.CACHE_FOLDER_PATH", str(tmp_path))
+    session = mocker.Mock()
+    session.get.return_value = FakeResponse()
+    cache = PersistentCache("ldr_links")
+    url = "https://politecnicomilano.webex.com/politecnicomilano/ldr.php?RCID=abc"
+
+    assert extract_id_from_url(url, "TICKET", session=session, cache=cache) == "0123456789abcdef0123456789abcdef"
+    assert extract_id_from_url(url, "TICKET", session=session, cache=cache) == "0123456789abcdef0123456789abcdef"
+    assert session.get.call_count == 1
+
+    # Urls with the id in them never need a request
+    assert extract_id_from_url("https://politecnicomilano.webex.com/webappng/sites/politecnicomilano/recording/0123456789abcdef0123456789abcdef/playback", "TICKET", session=session) == "0123456789abcdef0123456789abcdef"
+    assert session.get.call_count == 1
+
+
+class FakeJsonResponse:
+    status_code = 200
+    ok = True
+    is_redirect = False
+    url = "https://politecnicomilano.webex.com/webappng/api/v1/recordings"
+    headers = {"content-type": "application/json"}
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def json(self):
+        return self.obj
+
+
+def make_info(video_id):
+    return {
+        "id": video_id,
+        "recordName": f"Lesson {video_id}",
+        "createTime": "2021-10-04 10:15:00",
+        "preventDownload": False,
+        "downloadRecordingInfo": {"downloadInfo": {"mp4URL": f"https://example.com/{video_id}.mp4"}},
+    }
+
+
+class MockWebexAPI:
+    """Local server answering like the recordings listing and the stream API."""
+
+    def __init__(self, listing, infos):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlparse
+
+        self.requests = []
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                api.requests.append((url.path, query, self.headers.get("Cookie")))
+                if url.path == "/webappng/api/v1/recordings":
+                    offset, limit = int(query["offset"]), int(query["limit"])
+                    body = {"items": listing[offset : offset + limit]}
+                elif url.path.endswith("/stream") and url.path.split("/")[-2] in infos:
+                    body = infos[url.path.split("/")[-2]]
+                else:
+                    self.send_error(404)
+                    return
+                content = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("content-type", "application/json;charset=UTF-8")
+                self.send_header("content-length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/webappng/api/v1"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def test_txt_parser_batch_metadata(mocker, tmp_path):
+    from prd.parsers import TxtParser
+    from prd.reporter import Reporter
+
+    mocker.patch("prd.cache.CACHE_FOLDER_PATH", str(tmp_path))
+    mocker.patch("prd.config.Config.WEBEX_LISTING_PAGE_SIZE", 2)
+    listed = ["a" * 32, "b" * 32, "c" * 32]
+    incomplete = "d" * 32
+    unlisted = "e" * 32
+    listing = [make_info(i) for i in listed] + [{"id": incomplete, "recordName": "No download info"}]
+    api = MockWebexAPI(listing, {i: make_info(i) for i in listed + [incomplete, unlisted]})
+    mocker.patch("prd.config.Config.WEBEX_API_URL", api.url)
+    input_file = tmp_path / "ids.txt"
+    input_file.write_text("\n".join(listed + [incomplete, unlisted]))
+    try:
+        parser = TxtParser(cookie_ticket="TICKET", reporter=Reporter(), batch_metadata=True)
+        recordings = parser.parse(input_file, "Course")
+    finally:
+        api.close()
+
+    assert sorted(r.video_id for r in recordings) == sorted(listed + [incomplete, unlisted])
+    assert all(r.academic_year == "2021-22" for r in recordings)
+    assert all(cookie == "ticket=TICKET" for _, _, cookie in api.requests)
+    # The listing is paged until a short page, after the check of the ticket
+    pages = [(q["offset"], q["limit"]) for path, q, _ in api.requests if path.endswith("/recordings")]
+    assert pages == [("0", "1"), ("0", "2"), ("2", "2"), ("4", "2")]
+    # Only the videos missing from the listing, or without the download
+    # information in it, need their own request
+    streams = [path.split("/")[-2] for path, q, _ in api.requests if path.endswith("/stream")]
+    assert sorted(streams) == [incomplete, unlisted]
+    assert all(q == {"siteurl": "politecnicomilano"} for path, q, _ in api.requests if path.endswith("/stream"))
+
+
+def test_ticket_pool():
+    import pytest
+
+    from prd.webex_api import SessionExpiredError, ThrottledError, TicketPool
+
+    pool = TicketPool({"a": "TA", "b": "TB", "c": "TC"})
+    assert [pool.acquire()[0] for _ in range(4)] == ["a", "b", "c", "a"]
+
+    def request(ticket):
+        if ticket == "TB":
+            raise ThrottledError("throttled")
+        if ticket == "TC":
+            raise SessionExpiredError("expired")
+        return ticket
+
+    assert [pool.call(request) for _ in range(3)] == ["TA", "TA", "TA"]
+    counters = pool.get_counters()
+    assert counters["b"]["throttled"] == 1 and not counters["b"]["expired"]
+    assert counters["c"]["expired"]
+    assert [pool.acquire()[0] for _ in range(2)] == ["a", "a"]
+
+    pool.mark_expired("a")
+    pool.mark_expired("b")
+    with pytest.raises(SessionExpiredError):
+        pool.acquire()
+
+
+class FakeLoginPage:
+    status_code = 200
+    url = "https://idbroker.webex.com/idb/oauth2/v1/authorize"
+    text = "<html>Sign in</html>"
+
+
+def test_ticket_pool_used_for_ldr_and_listing(mocker, tmp_path):
+    from prd.webex_api import RecordingsListing, TicketPool
+
+    mocker.patch("prd.cache.CACHE_FOLDER_PATH", str(tmp_path))
+    pool = TicketPool({"expired": "EXPIRED", "valid": "VALID"})
+    tickets = []
+
+    def get(url, params=None, cookies=None):
+        tickets.append(cookies["ticket"])
+        if cookies["ticket"] == "EXPIRED":
+            return FakeLoginPage()
+        if url.endswith("/recordings"):
+            return FakeJsonResponse({"items": [make_info("d" * 32)]})
+        return FakeResponse()
+
+    session = mocker.Mock()
+    session.get.side_effect = get
+    url = "https://politecnicomilano.webex.com/politecnicomilano/ldr.php?RCID=def"
+    assert extract_id_from_url(url, "EXPIRED", session=session, ticket_pool=pool) == "0123456789abcdef0123456789abcdef"
+    assert pool.expired == {"expired"}
+    listing = RecordingsListing("EXPIRED", session=session, ticket_pool=pool)
+    assert listing.prefetch(["d" * 32]) == 1
+
+    # The expired account is dropped after its first answer
+    assert tickets == ["EXPIRED", "VALID", "VALID"]
+
+
+def test_check_ticket(mocker):
+    import pytest
+
+    from prd.webex_api import SessionExpiredError, check_ticket
+
+    session = mocker.Mock()
+    session.get.return_value = mocker.Mock(status_code=200, is_redirect=False, headers={"content-type": "application/json;charset=UTF-8"})
+    check_ticket("TICKET", session=session)
+
+    session.get.return_value = mocker.Mock(status_code=302, is_redirect=True, headers={"location": "https://idbroker.webex.com/idb/oauth2/v1/authorize"})
+    with pytest.raises(SessionExpiredError):
+        check_ticket("TICKET", session=session)
+
+    session.get.return_value = mocker.Mock(status_code=401, is_redirect=False, headers={})
+    with pytest.raises(SessionExpiredError):
+        check_ticket("TICKET", session=session)
+
+    # Inconclusive answers do not block the run
+    session.get.return_value = mocker.Mock(status_code=404, is_redirect=False, headers={"content-type": "text/html"})
+    check_ticket("TICKET", session=session)
+    session.get.return_value = mocker.Mock(status_code=200, is_redirect=False, headers={"content-type": "text/html"})
+    check_ticket("TICKET", session=session)
+
+
+class FakeRedirect:
+    status_code = 302
+    ok = True
+    is_redirect = True
+    headers = {"location": "https://politecnicomilano.webex.com/webappng/sites/politecnicomilano/recording"}
+
+
+def test_inconclusive_ticket_check_does_not_abort_the_run(mocker, tmp_path):
+    from prd.parsers import TxtParser
+    from prd.reporter import Reporter
+
+    mocker.patch("prd.cache.CACHE_FOLDER_PATH", str(tmp_path))
+    ids = [c * 32 for c in "ghi"]
+
+    def get(url, params=None, cookies=None, allow_redirects=True):
+        if url.endswith("/recordings"):
+            # The probe of the listing is moved elsewhere, not to the login
+            return FakeRedirect()
+        return FakeJsonResponse(make_info(url.split("/")[-2]))
+
+    session = mocker.Mock()
+    session.get.side_effect = get
+    input_file = tmp_path / "ids.txt"
+    input_file.write_text("\n".join(ids))
+    parser = TxtParser(cookie_ticket="TICKET", session=session, reporter=Reporter())
+    recordings = parser.parse(input_file, "Course")
+
+    assert sorted(r.video_id for r in recordings) == ids
+    assert parser.failed_keys == []
+
+
+class FakeErrorPage:
+    status_code = 500
+    ok = False
+    is_redirect = False
+    headers = {"content-type": "text/html; charset=utf-8"}
+
+
+def test_server_error_does_not_abort_the_run(mocker, tmp_path):
+    import pytest
+    import requests
+
+    from prd.parsers import TxtParser
+    from prd.reporter import Reporter
+    from prd.webex_api import SessionExpiredError, generate_recording_from_id
+
+    mocker.patch("prd.cache.CACHE_FOLDER_PATH", str(tmp_path))
+    mocker.patch("prd.parsers.abstract_parser.check_ticket")
+    failing = "a" * 32
+    ids = [failing] + [c * 32 for c in "bcdef"]
+
+    def get(url, params=None, cookies=None):
+        if failing in url:
+            return FakeErrorPage()
+        return FakeJsonResponse(make_info(url.split("/")[-2]))
+
+    session = mocker.Mock()
+    session.get.side_effect = get
+    with pytest.raises(requests.exceptions.ConnectionError) as e:
+        generate_recording_from_id(failing, "TICKET", "Course", session=session)
+    assert not isinstance(e.value, SessionExpiredError)
+
+    input_file = tmp_path / "ids.txt"
+    input_file.write_text("\n".join(ids))
+    parser = TxtParser(cookie_ticket="TICKET", session=session, reporter=Reporter())
+    recordings = parser.parse(input_file, "Course")
+
+    assert sorted(r.video_id for r in recordings) == ids[1:]
+    assert parser.failed_keys == [f"Course {failing}"]
@@ -0,0 +1,201 @@
+import asyncio
+import io
+import threading
+from http.client import HTTPMessage
+from typing import List, Optional, Tuple, Union
+import requests
+from requests.adapters import BaseAdapter
+from requests.cookies import extract_cookies_to_jar
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3 import HTTPHeaderDict, HTTPResponse
+
+from prd.config import Config
+
+try:
+    import h2  # Needed by httpx for HTTP/2
+    import httpx
+except ImportError:
+    httpx = None
+
+HTTP2_AVAILABLE: bool = httpx is not None
+
+
+class _OriginalResponse:
+    """The part of http.client.HTTPResponse read by urllib3 and requests, the
+    headers from which the cookies are extracted."""
+
+    def __init__(self, method: str, msg: HTTPMessage):
+        self._method: str = method
+        self.msg: HTTPMessage = msg
+
+    def isclosed(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class Http2Adapter(BaseAdapter):
+    """Transport adapter of requests which sends the requests over HTTP/2 with httpx.
+
+    All the requests of the adapter share the connections of a single httpx client,
+    so the concurrent requests to a host are multiplexed over a few connections
+    instead of opening one connection each. The client is asynchronous and runs in
+    its own thread: the synchronous one of httpx can send the streams of several
+    threads out of order, which the servers reject.
+    """
+
+    def __init__(self, client: Optional["httpx.AsyncClient"] = None):
+        """Create the adapter.
+
+        Args:
+            client (Optional[httpx.AsyncClient], optional): The client which sends
+                the requests. Defaults to None, which creates an HTTP/2 client with
+                at most Config.HTTP2_MAX_CONNECTIONS connections per host.
+
+        Raises:
+            RuntimeError: If httpx is not installed.
+        """
+        super().__init__()
+        if not HTTP2_AVAILABLE:
+            raise RuntimeError(
+                'HTTP/2 needs httpx, install it with "pip install httpx[http2]".'
+            )
+        self.client: httpx.AsyncClient = (
+            client
+            if client is not None
+            else httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=Config.HTTP2_MAX_CONNECTIONS),
+            )
+        )
+        self._loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: Union[None, float, Tuple[float, float]] = None,
+        verify: Union[bool, str] = True,
+        cert: Union[None, str, Tuple[str, str]] = None,
+        proxies: Optional[dict] = None,
+    ) -> requests.Response:
+        """Send a prepared request.
+
+        The redirects are followed by requests, the TLS verification and the
+        proxies are the ones of the httpx client.
+
+        Args:
+            request (requests.PreparedRequest): The request.
+            stream (bool, optional): Ignored, the body is read before returning.
+                Defaults to False.
+            timeout (Union[None, float, Tuple[float, float]], optional): The timeout,
+                or the connect and read timeouts. Defaults to None.
+            verify (Union[bool, str], optional): Ignored. Defaults to True.
+            cert (Union[None, str, Tuple[str, str]], optional): Ignored. Defaults to
+                None.
+            proxies (Optional[dict], optional): Ignored. Defaults to None.
+
+        Raises:
+            requests.exceptions.ConnectTimeout: If the connection times out.
+            requests.exceptions.ReadTimeout: If the response times out.
+            requests.exceptions.ConnectionError: If the request fails.
+
+        Returns:
+            requests.Response: The response.
+        """
+        if isinstance(timeout, tuple):
+            http_timeout: httpx.Timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        else:
+            http_timeout = httpx.Timeout(timeout)
+        try:
+            res: httpx.Response = asyncio.run_coroutine_threadsafe(
+                self.client.request(
+                    request.method,
+                    request.url,
+                    headers=request.headers,
+                    content=request.body,
+                    timeout=http_timeout,
+                ),
+                self._loop,
+            ).result()
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e, request=request)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+        return self._build_response(request, res)
+
+    def _build_response(
+        self, request: requests.PreparedRequest, res: "httpx.Response"
+    ) -> requests.Response:
+        """Convert a response of httpx to a response of requests.
+
+        Args:
+            request (requests.PreparedRequest): The request.
+            res (httpx.Response): The response of httpx, already decoded.
+
+        Returns:
+            requests.Response: The response.
+        """
+        # The body is decoded by httpx, its encoding and length do not apply anymore
+        headers: HTTPHeaderDict = HTTPHeaderDict()
+        message: HTTPMessage = HTTPMessage()
+        for name, value in res.headers.multi_items():
+            if name.lower() not in ["content-encoding", "content-length"]:
+                headers.add(name, value)
+                message[name] = value
+        raw: HTTPResponse = HTTPResponse(
+            body=io.BytesIO(res.content),
+            headers=headers,
+            status=res.status_code,
+            reason=res.reason_phrase,
+            preload_content=False,
+            decode_content=False,
+            original_response=_OriginalResponse(request.method, message),
+        )
+
+        response: requests.Response = requests.Response()
+        response.status_code = res.status_code
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = raw
+        response.reason = res.reason_phrase
+        response.url = request.url
+        extract_cookies_to_jar(response.cookies, request, raw)
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self) -> None:
+        """Close the connections of the client and stop its thread."""
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def create_session(hosts: Optional[List[str]] = None) -> requests.Session:
+    """Create a session which sends the requests to some hosts over HTTP/2.
+
+    The requests to the other hosts are sent over HTTP/1.1 as usual.
+
+    Args:
+        hosts (Optional[List[str]], optional): The hosts reached over HTTP/2.
+            Defaults to None, which uses Config.HTTP2_HOSTS.
+
+    Raises:
+        RuntimeError: If there are HTTP/2 hosts but httpx is not installed.
+
+    Returns:
+        requests.Session: The session.
+    """
+    hosts = hosts if hosts is not None else Config.HTTP2_HOSTS
+    session: requests.Session = requests.Session()
+    if len(hosts) > 0:
+        adapter: Http2Adapter = Http2Adapter()
+        for host in hosts:
+            session.mount(f"https://{host}/", adapter)
+    return session
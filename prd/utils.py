@@ -33,3 +33,20 @@ def extract_academic_year_from_datetime(dt: datetime) -> str:
         end_year = dt.strftime("%y")
         starting_year = dt.replace(year=dt.year - 1).strftime("%Y")
     return starting_year + "-" + end_year
+
+
+def format_size(size: int) -> str:
+    """Format a size in bytes in a human readable way.
+
+    Args:
+        size (int): The size in bytes.
+
+    Returns:
+        str: The size, for example "1.5 GB".
+    """
+    value: float = float(size)
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
@@ -1,6 +1,9 @@
 import typer
 import re
 
+from prd.clip import parse_clip
+from prd.postprocess import load_presets
+
 
 def validate_academic_year(value: str) -> str:
     """Validate academic year option.
@@ -49,3 +52,68 @@ def validate_cookie_name(name: str) -> str:
             'Possible values are "SSL_JSESSIONID", "ticket" and "MoodleSession".'
         )
     return name
+
+
+def validate_postprocess_preset(value: str) -> str:
+    """Validate postprocess option.
+
+    Args:
+        value (str): The name of the post-processing preset.
+
+    Raises:
+        typer.BadParameter: If the preset does not exist or the presets file is
+            malformed.
+
+    Returns:
+        str: The value itself.
+    """
+    if value is not None:
+        try:
+            presets = load_presets()
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+        if value not in presets.keys():
+            raise typer.BadParameter(
+                "Possible values are " + ", ".join(f'"{p}"' for p in presets) + "."
+            )
+    return value
+
+
+def validate_regex(value: str) -> str:
+    """Validate a regular expression option.
+
+    Args:
+        value (str): The regular expression.
+
+    Raises:
+        typer.BadParameter: If the regular expression is not valid.
+
+    Returns:
+        str: The value itself.
+    """
+    if value is not None:
+        try:
+            re.compile(value)
+        except re.error as e:
+            raise typer.BadParameter(f"The regular expression is not valid: {e}.")
+    return value
+
+
+def validate_clip(value: str) -> str:
+    """Validate a clip option.
+
+    Args:
+        value (str): The time range, in the format "START-END".
+
+    Raises:
+        typer.BadParameter: If the time range is not valid.
+
+    Returns:
+        str: The value itself.
+    """
+    if value is not None:
+        try:
+            parse_clip(value)
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+    return value
@@ -0,0 +1,319 @@
+import os
+import time
+import hashlib
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+import requests
+from rich import print
+
+from prd.cache import PersistentCache, get_cache
+from prd.parsers import ArchivesParser, WebeepParser
+from prd.webex_api import Recording
+from prd.create_output import create_output, is_download_complete
+from prd.preflight import InsufficientDiskSpaceError
+
+
+class ConditionalFetcher:
+    """Fetch pages with conditional requests, remembering the validators of each url."""
+
+    def __init__(self):
+        """Create the fetcher."""
+        self.session: requests.Session = requests.Session()
+        self.validators: PersistentCache = get_cache("http_validators")
+
+    def get(self, url: str, cookies: Dict[str, str]) -> Optional[requests.Response]:
+        """Get a page if it changed since the last time it was fetched.
+
+        ETag and Last-Modified are used when the server provides them, otherwise
+        the hash of the content is compared.
+
+        Args:
+            url (str): The url of the page.
+            cookies (Dict[str, str]): The cookies of the request.
+
+        Returns:
+            Optional[requests.Response]: The response, None if the page did not change.
+        """
+        validators: dict = self.validators.get(url, {})
+        headers: Dict[str, str] = {}
+        if validators.get("etag") is not None:
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified") is not None:
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        res: requests.Response = self.session.get(
+            url, cookies=cookies, headers=headers, allow_redirects=False
+        )
+        if res.status_code == 304:
+            return None
+
+        content_hash: str = hashlib.sha256(res.content).hexdigest()
+        if res.status_code == 200 and content_hash == validators.get("hash"):
+            return None
+        return res
+
+    def commit(self, res: requests.Response) -> None:
+        """Remember the validators of a response once it has been processed.
+
+        Args:
+            res (requests.Response): The response.
+        """
+        self.validators.set(
+            res.url,
+            {
+                "etag": res.headers.get("ETag"),
+                "last_modified": res.headers.get("Last-Modified"),
+                "hash": hashlib.sha256(res.content).hexdigest(),
+            },
+        )
+        self.validators.save()
+
+
+class PollResult(NamedTuple):
+    """What a poll of a page found, committed once its recordings are downloaded."""
+
+    recordings: List[Recording]
+    # The keys added to the snapshot of the page
+    keys: List[str]
+    # The response whose validators are remembered, None if some keys failed
+    res: Optional[requests.Response]
+
+
+class Watcher:
+    """Poll archives and Webeep pages, downloading only the new recordings."""
+
+    def __init__(
+        self,
+        urls: List[str],
+        output: str,
+        aria2c: bool,
+        postprocess: Optional[str] = None,
+        cookie_ticket: Optional[str] = None,
+        cookie_SSL_JSESSIONID: Optional[str] = None,
+        cookie_MoodleSession: Optional[str] = None,
+    ):
+        """Create the watcher.
+
+        Args:
+            urls (List[str]): Archives or Webeep urls to watch.
+            output (str): The output path.
+            aria2c (bool): True to download with aria2c.
+            postprocess (Optional[str], optional): Name of the ffmpeg preset. Defaults to None.
+            cookie_ticket (Optional[str], optional): The ticket cookie. Defaults to None.
+            cookie_SSL_JSESSIONID (Optional[str], optional): The SSL_JSESSIONID cookie,
+                required to watch archives urls. Defaults to None.
+            cookie_MoodleSession (Optional[str], optional): The MoodleSession cookie,
+                required to watch Webeep urls. Defaults to None.
+
+        Raises:
+            ValueError: If an url is neither an archives nor a Webeep url.
+        """
+        self.urls = urls
+        self.output = output
+        self.aria2c = aria2c
+        self.postprocess = postprocess
+        self.fetcher: ConditionalFetcher = ConditionalFetcher()
+        self.snapshots: PersistentCache = get_cache("watch_snapshots")
+        self.archives_parser: Optional[ArchivesParser] = None
+        self.webeep_parser: Optional[WebeepParser] = None
+
+        for url in urls:
+            if url.startswith("https://webeep.polimi.it/"):
+                if self.webeep_parser is None:
+                    self.webeep_parser = WebeepParser(
+                        cookie_ticket=cookie_ticket,
+                        cookie_MoodleSession=cookie_MoodleSession,
+                    )
+            else:
+                ArchivesParser.check_url(url)
+                if self.archives_parser is None:
+                    self.archives_parser = ArchivesParser(
+                        cookie_ticket=cookie_ticket,
+                        cookie_SSL_JSESSIONID=cookie_SSL_JSESSIONID,
+                    )
+
+    def _get_new_keys(self, url: str, keys: List[str]) -> List[str]:
+        """Diff the keys of a listing against the previous snapshot.
+
+        Args:
+            url (str): The url of the listing.
+            keys (List[str]): The keys of the current listing.
+
+        Returns:
+            List[str]: The keys which were not in the previous snapshot.
+        """
+        known: set = set(self.snapshots.get(url, []))
+        return [k for k in keys if k not in known]
+
+    def _save_snapshot(self, url: str, keys: List[str]) -> None:
+        """Add keys to the snapshot of a listing.
+
+        Args:
+            url (str): The url of the listing.
+            keys (List[str]): The processed keys.
+        """
+        self.snapshots.set(url, sorted(set(self.snapshots.get(url, [])) | set(keys)))
+        self.snapshots.save()
+
+    def _commit(self, url: str, result: PollResult) -> None:
+        """Remember what a poll of a page processed, so the next polls skip it.
+
+        Args:
+            url (str): The url of the page.
+            result (PollResult): The result of the poll.
+        """
+        self._save_snapshot(url, result.keys)
+        if result.res is not None:
+            self.fetcher.commit(result.res)
+
+    def _poll_archives(self, url: str, baseline: bool) -> Optional[PollResult]:
+        """Poll an archives page.
+
+        Args:
+            url (str): The archives url.
+            baseline (bool): True to only record the current rows as known.
+
+        Returns:
+            Optional[PollResult]: The new recordings, None if the page did not change.
+        """
+        res: Optional[requests.Response] = self.fetcher.get(
+            url, {"SSL_JSESSIONID": self.archives_parser.cookie_SSL_JSESSIONID}
+        )
+        if res is None:
+            return None
+        rows = ArchivesParser.get_rows(res.content)
+        keys: List[str] = [ArchivesParser.get_row_key(row) for row in rows]
+        new_keys: set = set(self._get_new_keys(url, keys))
+        recordings: List[Recording] = []
+        if not baseline and len(new_keys) > 0:
+            print(f"{len(new_keys)} new rows in {url}")
+            self.archives_parser.failed_keys.clear()
+            recordings = self.archives_parser.parse_rows(
+                [row for row, key in zip(rows, keys) if key in new_keys],
+                ArchivesParser.is_UserListActivity(url),
+            )
+            # Failed rows are retried at the next poll
+            failed: set = set(self.archives_parser.failed_keys)
+            keys = [k for k in keys if k not in failed]
+            if len(failed) > 0:
+                return PollResult(recordings, keys, None)
+        return PollResult(recordings, keys, res)
+
+    def _poll_webeep(self, url: str, baseline: bool) -> Optional[PollResult]:
+        """Poll a Webeep page.
+
+        Args:
+            url (str): The Webeep url.
+            baseline (bool): True to only record the current links as known.
+
+        Raises:
+            RuntimeError: If the MoodleSession cookie expired.
+
+        Returns:
+            Optional[PollResult]: The new recordings, None if the page did not change.
+        """
+        res: Optional[requests.Response] = self.fetcher.get(
+            url, {"MoodleSession": self.webeep_parser.cookie_MoodleSession}
+        )
+        if res is None:
+            return None
+        if res.status_code == 303:
+            raise RuntimeError(
+                "Unable to open the Webeep page, check MoodleSession cookie."
+            )
+        course, academic_year, links = WebeepParser.get_links(res.content)
+        new_links: List[str] = self._get_new_keys(url, links)
+        recordings: List[Recording] = []
+        if not baseline and len(new_links) > 0:
+            print(f"{len(new_links)} new links in {url}")
+            self.webeep_parser.failed_keys.clear()
+            recordings = self.webeep_parser.parse_links(
+                new_links, course, academic_year
+            )
+            # Failed links are retried at the next poll
+            failed: set = set(self.webeep_parser.failed_keys)
+            links = [k for k in links if k not in failed]
+            if len(failed) > 0:
+                return PollResult(recordings, links, None)
+        return PollResult(recordings, links, res)
+
+    def poll(self, baseline: bool = False) -> List[Recording]:
+        """Poll all the urls once and download the new recordings.
+
+        A page is remembered as processed only once its new recordings are
+        downloaded, otherwise they are found again at the next poll.
+
+        Args:
+            baseline (bool, optional): True to only record the current listings as
+                known, without downloading. Defaults to False.
+
+        Returns:
+            List[Recording]: The new recordings.
+        """
+        results: Dict[str, PollResult] = {}
+        for url in self.urls:
+            try:
+                if url.startswith("https://webeep.polimi.it/"):
+                    result: Optional[PollResult] = self._poll_webeep(url, baseline)
+                else:
+                    result = self._poll_archives(url, baseline)
+            except Exception as e:
+                print("[red]" + str(e) + "[/red]")
+                continue
+            if result is not None:
+                results[url] = result
+
+        recordings: List[Recording] = [
+            r for result in results.values() for r in result.recordings
+        ]
+        created: bool = True
+        if len(recordings) > 0:
+            try:
+                create_output(
+                    recordings=recordings,
+                    output=self.output,
+                    create_xlsx=False,
+                    aria2c=self.aria2c,
+                    postprocess=self.postprocess,
+                )
+            except InsufficientDiskSpaceError as e:
+                print("[red]" + str(e) + "[/red]")
+                created = False
+
+        for url, result in results.items():
+            if created and all(self._is_downloaded(r) for r in result.recordings):
+                self._commit(url, result)
+            else:
+                print(f"[yellow]The new recordings of {url} will be retried at the next poll[/yellow]")
+        return recordings
+
+    def _is_downloaded(self, recording: Recording) -> bool:
+        """Check that a new recording was downloaded.
+
+        Args:
+            recording (Recording): The recording.
+
+        Returns:
+            bool: True if it was downloaded, or only written to the download links
+                file without aria2c.
+        """
+        return not self.aria2c or is_download_complete(
+            os.path.join(self.output, recording.get_output_filename())
+        )
+
+    def run(self, interval: int, baseline: bool = False) -> None:
+        """Poll forever.
+
+        Args:
+            interval (int): Seconds between the start of two polls.
+            baseline (bool, optional): True to only record the listings as known on
+                the first poll. Defaults to False.
+        """
+        first: bool = True
+        while True:
+            started: float = time.monotonic()
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M')}] Polling {len(self.urls)} pages...")
+            recordings: List[Recording] = self.poll(baseline=baseline and first)
+            print(f"{len(recordings)} new recordings.")
+            first = False
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List, Optional
 
 from prd.utils import replace_illegal_characters
 
@@ -14,6 +15,7 @@ class Recording:
         course: str,
         subject: str,
         download_url: str,
+        download_urls: Optional[List[str]] = None,
     ) -> None:
         """Create a Recording.
 
@@ -24,6 +26,9 @@ class Recording:
             course (str): Course name.
             subject (str): Subject.
             download_url (str): Download url of the recording.
+            download_urls (Optional[List[str]], optional): Every url the recording
+                can be downloaded from, in order of preference. Defaults to None,
+                which uses only download_url.
         """
         self.video_id = video_id.strip()
         self.academic_year = academic_year.strip()
@@ -31,6 +36,47 @@ class Recording:
         self.course = replace_illegal_characters(course.strip())
         self.subject = subject.strip()
         self.download_url = download_url.strip()
+        self.download_urls: List[str] = (
+            [u.strip() for u in download_urls]
+            if download_urls is not None and len(download_urls) > 0
+            else [self.download_url]
+        )
+
+    def to_dict(self) -> dict:
+        """Serialize the recording.
+
+        Returns:
+            dict: The json serializable fields of the recording.
+        """
+        return {
+            "video_id": self.video_id,
+            "academic_year": self.academic_year,
+            "recording_datetime": self.recording_datetime.isoformat(),
+            "course": self.course,
+            "subject": self.subject,
+            "download_url": self.download_url,
+            "download_urls": self.download_urls,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Recording":
+        """Deserialize a recording.
+
+        Args:
+            data (dict): The fields of the recording, as returned by to_dict().
+
+        Returns:
+            Recording: The recording.
+        """
+        return cls(
+            video_id=data["video_id"],
+            academic_year=data["academic_year"],
+            recording_datetime=datetime.fromisoformat(data["recording_datetime"]),
+            course=data["course"],
+            subject=data["subject"],
+            download_url=data["download_url"],
+            download_urls=data.get("download_urls"),
+        )
 
     def get_video_url(self) -> str:
         """Get the url to the recording.
@@ -43,5 +89,13 @@ class Recording:
             + self.video_id
         )
 
+    def get_output_filename(self) -> str:
+        """Get the path of the recording file relative to the output folder.
+
+        Returns:
+            str: The relative path of the recording file.
+        """
+        return f"{self.course} {self.academic_year}/{self.recording_datetime.strftime('%Y-%m-%d %H-%M')}.mp4"
+
     def __lt__(self, other):
         return self.recording_datetime < other.recording_datetime
@@ -1,3 +1,7 @@
 from .extract_id_from_url import extract_id_from_url
-from .generate_recording_from_id import generate_recording_from_id
-from .Recording import Recording
\ No newline at end of file
+from .generate_recording_from_id import generate_recording_from_id, generate_recording_from_info
+from .Recording import Recording
+from .recordings_listing import RecordingsListing
+from .ticket_pool import TicketPool
+from .errors import SessionExpiredError, ThrottledError
+from .check_ticket import check_ticket
@@ -0,0 +1,89 @@
+from typing import List, Optional
+import requests
+from requests.models import Response
+
+from prd.config import Config
+from prd.webex_api.errors import SessionExpiredError, ThrottledError
+
+# Parts of the urls of the login pages of Webex
+LOGIN_HINTS: List[str] = ["login", "signin", "idbroker"]
+
+
+def is_session_expired(res: Response) -> bool:
+    """Tell whether a response of the Webex API means that the ticket expired.
+
+    Only a redirect (to the login), a 401 or 403, or a 200 with an HTML page
+    instead of json mean it: any other error is not conclusive.
+
+    Args:
+        res (Response): The response.
+
+    Returns:
+        bool: True if the ticket expired.
+    """
+    return (
+        res.is_redirect
+        or res.status_code in [401, 403]
+        or (
+            res.status_code == 200
+            and not res.headers.get("content-type", "").startswith("application/json")
+        )
+    )
+
+
+def is_login_redirect(res: Response) -> bool:
+    """Tell whether a response redirects to the login of Webex.
+
+    Args:
+        res (Response): The response, got without following the redirects.
+
+    Returns:
+        bool: True if the response redirects to the login.
+    """
+    location: str = res.headers.get("location", "").lower()
+    return res.is_redirect and any(hint in location for hint in LOGIN_HINTS)
+
+
+def is_login_page(res: Response) -> bool:
+    """Tell whether a response, got following the redirects, means that the
+    ticket was rejected: a 401 or 403, or a redirect which ended at the login.
+
+    Args:
+        res (Response): The response.
+
+    Returns:
+        bool: True if the ticket expired.
+    """
+    return res.status_code in [401, 403] or any(
+        hint in res.url.lower() for hint in LOGIN_HINTS
+    )
+
+
+def check_ticket(ticket: str, session: Optional[requests.Session] = None) -> None:
+    """Check with a single cheap request that the Webex API accepts a ticket.
+
+    An expired ticket is rejected with a 401 or 403 or redirected to the login.
+    Any other answer, like a 404, a redirect elsewhere or an unexpected page, is
+    not conclusive and the ticket is assumed valid.
+
+    Args:
+        ticket (str): The "ticket" cookie value.
+        session (requests.Session, optional): The session used for the request. If None use a new connection.
+
+    Raises:
+        ThrottledError: If the API is throttling the requests of the ticket.
+        SessionExpiredError: If the API rejects the ticket.
+    """
+    http = session if session is not None else requests
+    res: Response = http.get(
+        Config.WEBEX_API_URL + "/recordings",
+        params={"siteurl": "politecnicomilano", "offset": 0, "limit": 1},
+        cookies={"ticket": ticket},
+        allow_redirects=False,
+    )
+    if res.status_code == 429:
+        raise ThrottledError("The Webex API is throttling the requests.")
+    if res.status_code in [401, 403] or is_login_redirect(res):
+        raise SessionExpiredError(
+            "The ticket is not valid or it expired, refresh it."
+        )
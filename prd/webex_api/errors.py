@@ -0,0 +1,9 @@
+import requests
+
+
+class SessionExpiredError(requests.exceptions.ConnectionError):
+    """Raised when the Webex API rejects the ticket because it expired."""
+
+
+class ThrottledError(requests.exceptions.ConnectionError):
+    """Raised when the Webex API is throttling the requests of a ticket."""
@@ -1,10 +1,21 @@
 import re
 import requests
 from requests.models import Response
+from typing import Optional
 from urllib.parse import unquote
 
+from prd.cache import PersistentCache
+from prd.webex_api.check_ticket import is_login_page
+from prd.webex_api.errors import SessionExpiredError, ThrottledError
+from prd.webex_api.ticket_pool import TicketPool
 
-def extract_id_from_url(url: str, ticket: str) -> str:
+def extract_id_from_url(
+    url: str,
+    ticket: str,
+    session: Optional[requests.Session] = None,
+    cache: Optional[PersistentCache] = None,
+    ticket_pool: Optional[TicketPool] = None,
+) -> str:
     """Extract the video id from a url.
     Urls can be in the formats:
     - https://politecnicomilano.webex.com/politecnicomilano/ldr.php?RCID={VIDEO_ID}
@@ -18,12 +29,17 @@ def extract_id_from_url(url: str, ticket: str) -> str:
     Args:
         url (str): Url of the recording.
         ticket (str): The "ticket" cookie value.
+        session (requests.Session, optional): The session used for the request. If None use a new connection.
+        cache (PersistentCache, optional): Cache of the ids of ldr.php urls, which need a request. If None do not cache.
+        ticket_pool (TicketPool, optional): The tickets of several accounts, used instead of ticket for the request. If None use ticket.
 
     Returns:
         str: Video id of the recording.
 
     Raises:
         ValueError: if the provided url is not recorgnized.
+        ThrottledError: If the API is throttling the requests of the ticket.
+        SessionExpiredError: If the ticket, or every ticket of the pool, expired.
     """
     url = unquote(url)
     url = url.replace("/webappng", "/recordingservice")
@@ -33,7 +49,21 @@ def extract_id_from_url(url: str, ticket: str) -> str:
     if url.startswith(
         "https://politecnicomilano.webex.com/politecnicomilano/ldr.php?RCID="
     ):
-        res: Response = requests.get(url, cookies={"ticket": ticket})
+        if cache is not None and url in cache:
+            return cache.get(url)
+        http = session if session is not None else requests
+
+        def get(ticket: str) -> Response:
+            res: Response = http.get(url, cookies={"ticket": ticket})
+            if res.status_code == 429:
+                raise ThrottledError("The Webex API is throttling the requests.")
+            if is_login_page(res):
+                raise SessionExpiredError(
+                    "Unable to connect to Webex API. Try refreshing the ticket."
+                )
+            return res
+
+        res: Response = ticket_pool.call(get) if ticket_pool is not None else get(ticket)
         id_search = re.search(
             "https:\/\/politecnicomilano\.webex\.com\/recordingservice\/sites\/politecnicomilano\/recording\/playback\/([a-z,0-9]*)",
             res.text,
@@ -41,6 +71,8 @@ def extract_id_from_url(url: str, ticket: str) -> str:
         if not (id_search):
             raise RuntimeError("Was not able to extract video id from url.")
 
+        if cache is not None:
+            cache.set(url, id_search.group(1))
         return id_search.group(1)
     elif url.startswith("https://politecnicomilano.webex.com/recordingservice/"):
         search_str: str = (
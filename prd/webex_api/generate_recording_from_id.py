@@ -1,10 +1,68 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 import requests
 from requests.models import Response
 from prd.utils import extract_academic_year_from_datetime
 
+from prd.config import Config
 from prd.webex_api.Recording import Recording
+from prd.webex_api.check_ticket import is_session_expired
+from prd.webex_api.errors import SessionExpiredError, ThrottledError
+
+
+def generate_recording_from_info(
+    video_id: str,
+    info: dict,
+    course: str,
+    academic_year: Optional[str] = None,
+    subject: Optional[str] = None,
+    recording_datetime: Optional[datetime] = None,
+) -> Recording:
+    """Generate a Recording given the information about the video returned by the API.
+
+    Args:
+        video_id (str): Id of the video.
+        info (dict): The information about the video.
+        course (str): Name of the course.
+        academic_year (str, optional): The academic year of the course. If None infer from recording.
+        subject (str, optional): The subjet of the recording. If None use the title of the recording.
+        recording_datetime (datetime, optional): The datetime of the recording. If None use get from the API.
+
+    Returns:
+        Recording: The Recording object.
+    """
+    # Both sources are kept, the download falls back to the other one if needed
+    download_urls: List[str] = list(
+        dict.fromkeys(
+            u
+            for u in [
+                info["downloadRecordingInfo"]["downloadInfo"].get("mp4URL"),
+                info.get("fallbackPlaySrc"),
+            ]
+            if u
+        )
+    )
+    if info["preventDownload"] == True:
+        download_urls.reverse()
+
+    if subject is None:
+        subject = info["recordName"]
+    if recording_datetime is None:
+        recording_datetime = datetime.strptime(
+            info["createTime"], "%Y-%m-%d %H:%M:%S"
+        )
+    if academic_year is None:
+        academic_year = extract_academic_year_from_datetime(recording_datetime)
+
+    return Recording(
+        video_id=video_id,
+        course=course,
+        academic_year=academic_year,
+        download_url=download_urls[0],
+        download_urls=download_urls,
+        subject=subject,
+        recording_datetime=recording_datetime,
+    )
 
 
 def generate_recording_from_id(
@@ -14,6 +72,7 @@ def generate_recording_from_id(
     academic_year: Optional[str] = None,
     subject: Optional[str] = None,
     recording_datetime: Optional[datetime] = None,
+    session: Optional[requests.Session] = None,
 ) -> Recording:
     """Generate a Recording given a video id.
 
@@ -24,42 +83,45 @@ def generate_recording_from_id(
         academic_year (str, optional): The academic year of the course. If None infer from recording.
         subject (str, optional): The subjet of the recording. If None use the title of the recording.
         recording_datetime (datetime, optional): The datetime of the recording. If None use get from the API.
+        session (requests.Session, optional): The session used for the request. If None use a new connection.
 
     Returns:
         Recording: The Recording object.
+
+    Raises:
+        ThrottledError: If the API is throttling the requests of the ticket.
+        SessionExpiredError: If the API rejects the ticket.
+        requests.exceptions.ConnectionError: If the API fails with another error.
     """
     # Get video information from API
     endpoint: str = (
-        "https://politecnicomilano.webex.com/webappng/api/v1/recordings/"
+        Config.WEBEX_API_URL
+        + "/recordings/"
         + video_id
         + "/stream?siteurl=politecnicomilano"
     )
-    res: Response = requests.get(
+    http = session if session is not None else requests
+    res: Response = http.get(
         endpoint, cookies={"ticket": ticket}
     )
-    if res.headers.get("content-type") != "application/json":
-        raise requests.exceptions.ConnectionError(
+    if res.status_code == 429:
+        raise ThrottledError("The Webex API is throttling the requests.")
+    if is_session_expired(res):
+        raise SessionExpiredError(
             "Unable to connect to Webex API. Try refreshing the ticket."
         )
-    response_obj = res.json()
-    download_url: str = response_obj["downloadRecordingInfo"]["downloadInfo"]["mp4URL"]
-    if response_obj["preventDownload"] == True:
-        download_url = response_obj["fallbackPlaySrc"]
-
-    if subject is None:
-        subject = response_obj["recordName"]
-    if recording_datetime is None:
-        recording_datetime = datetime.strptime(
-            response_obj["createTime"], "%Y-%m-%d %H:%M:%S"
+    if not res.ok or not res.headers.get("content-type", "").startswith(
+        "application/json"
+    ):
+        raise requests.exceptions.ConnectionError(
+            f"Unable to get the video {video_id} from the Webex API ({res.status_code})."
         )
-    if academic_year is None:
-        academic_year = extract_academic_year_from_datetime(recording_datetime)
 
-    return Recording(
+    return generate_recording_from_info(
         video_id=video_id,
+        info=res.json(),
         course=course,
         academic_year=academic_year,
-        download_url=download_url,
         subject=subject,
         recording_datetime=recording_datetime,
     )
@@ -0,0 +1,198 @@
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+import requests
+from requests.models import Response
+
+from prd.config import Config
+from prd.transport import create_session
+from prd.webex_api.Recording import Recording
+from prd.webex_api.check_ticket import is_login_page
+from prd.webex_api.errors import SessionExpiredError, ThrottledError
+from prd.webex_api.ticket_pool import TicketPool
+from prd.webex_api.generate_recording_from_id import generate_recording_from_info
+
+
+class RecordingsListing:
+    """Batched provider of the information about the videos.
+
+    The recordings listing endpoint of the API is fetched a page at a time, so a
+    single request returns the information about many videos. Only the entries
+    with the download information are kept: the other videos need a request
+    each with generate_recording_from_id, and so do all of them if no ticket can
+    fetch the listing.
+    """
+
+    def __init__(
+        self,
+        ticket: str,
+        session: Optional[requests.Session] = None,
+        page_size: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        ticket_pool: Optional[TicketPool] = None,
+    ):
+        """Create the provider.
+
+        Args:
+            ticket (str): The "ticket" cookie value.
+            session (Optional[requests.Session], optional): The session used for the
+                requests. Defaults to None, which creates a new one reaching
+                Config.HTTP2_HOSTS over HTTP/2.
+            page_size (Optional[int], optional): The number of recordings in a page.
+                Defaults to None, which uses Config.WEBEX_LISTING_PAGE_SIZE.
+            max_pages (Optional[int], optional): The maximum number of pages fetched.
+                Defaults to None, which uses Config.WEBEX_LISTING_MAX_PAGES.
+            ticket_pool (Optional[TicketPool], optional): The tickets of several
+                accounts, used instead of ticket. Defaults to None.
+        """
+        self.ticket = ticket
+        self.ticket_pool: Optional[TicketPool] = ticket_pool
+        self.session: requests.Session = (
+            session if session is not None else create_session()
+        )
+        self.page_size: int = (
+            page_size if page_size is not None else Config.WEBEX_LISTING_PAGE_SIZE
+        )
+        self.max_pages: int = (
+            max_pages if max_pages is not None else Config.WEBEX_LISTING_MAX_PAGES
+        )
+        self.pages_fetched: int = 0
+        self._infos: Dict[str, dict] = {}
+        self._exhausted: bool = False
+        self._lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def _get_entries(response_obj) -> List[dict]:
+        """Get the entries of a page of the listing.
+
+        Args:
+            response_obj: The decoded json of the page, either a list of entries or
+                an object with the list in "items" or "recordings".
+
+        Returns:
+            List[dict]: The entries.
+        """
+        if isinstance(response_obj, list):
+            return response_obj
+        for key in ["items", "recordings"]:
+            if isinstance(response_obj.get(key), list):
+                return response_obj[key]
+        return []
+
+    @staticmethod
+    def _has_download_info(entry: dict) -> bool:
+        """Check if an entry contains everything needed to generate a Recording.
+
+        Args:
+            entry (dict): The entry.
+
+        Returns:
+            bool: True if the entry is complete.
+        """
+        try:
+            entry["downloadRecordingInfo"]["downloadInfo"]["mp4URL"]
+            entry["preventDownload"]
+            entry["recordName"]
+            entry["createTime"]
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def _fetch_page(self) -> None:
+        """Fetch the next page of the listing."""
+
+        def get(ticket: str) -> Response:
+            res: Response = self.session.get(
+                Config.WEBEX_API_URL + "/recordings",
+                params={
+                    "siteurl": "politecnicomilano",
+                    "offset": self.pages_fetched * self.page_size,
+                    "limit": self.page_size,
+                },
+                cookies={"ticket": ticket},
+            )
+            if res.status_code == 429:
+                raise ThrottledError("The Webex API is throttling the requests.")
+            if is_login_page(res):
+                raise SessionExpiredError(
+                    "Unable to connect to Webex API. Try refreshing the ticket."
+                )
+            return res
+
+        try:
+            res: Response = (
+                self.ticket_pool.call(get)
+                if self.ticket_pool is not None
+                else get(self.ticket)
+            )
+        except (ThrottledError, SessionExpiredError):
+            self._exhausted = True
+            return
+        self.pages_fetched += 1
+        if res.status_code != 200 or not res.headers.get(
+            "content-type", ""
+        ).startswith("application/json"):
+            self._exhausted = True
+            return
+
+        entries: List[dict] = self._get_entries(res.json())
+        for entry in entries:
+            video_id: Optional[str] = entry.get("id")
+            if video_id is not None and self._has_download_info(entry):
+                self._infos[video_id] = entry
+        if len(entries) < self.page_size:
+            self._exhausted = True
+
+    def prefetch(self, video_ids: Iterable[str]) -> int:
+        """Fetch pages of the listing until all the videos are covered.
+
+        Args:
+            video_ids (Iterable[str]): The ids of the videos.
+
+        Returns:
+            int: The number of videos covered by the listing.
+        """
+        wanted: Set[str] = set(video_ids)
+        with self._lock:
+            while (
+                not wanted.issubset(self._infos.keys())
+                and not self._exhausted
+                and self.pages_fetched < self.max_pages
+            ):
+                self._fetch_page()
+            return len(wanted & self._infos.keys())
+
+    def generate_recording(
+        self,
+        video_id: str,
+        course: str,
+        academic_year: Optional[str] = None,
+        subject: Optional[str] = None,
+        recording_datetime: Optional[datetime] = None,
+    ) -> Optional[Recording]:
+        """Generate a Recording from the listing, fetching pages if needed.
+
+        Args:
+            video_id (str): Id of the video.
+            course (str): Name of the course.
+            academic_year (str, optional): The academic year of the course. If None infer from recording.
+            subject (str, optional): The subjet of the recording. If None use the title of the recording.
+            recording_datetime (datetime, optional): The datetime of the recording. If None use get from the API.
+
+        Returns:
+            Optional[Recording]: The Recording object, None if the video is not
+                covered by the listing.
+        """
+        self.prefetch([video_id])
+        with self._lock:
+            info: Optional[dict] = self._infos.get(video_id)
+        if info is None:
+            return None
+        return generate_recording_from_info(
+            video_id=video_id,
+            info=info,
+            course=course,
+            academic_year=academic_year,
+            subject=subject,
+            recording_datetime=recording_datetime,
+        )
@@ -0,0 +1,153 @@
+import threading
+import time
+from typing import Callable, Dict, List, Set, Tuple, TypeVar
+
+from prd.config import Config
+from prd.webex_api.errors import SessionExpiredError, ThrottledError
+
+T = TypeVar("T")
+
+
+class TicketPool:
+    """Spread the requests to the Webex API across the tickets of several accounts.
+
+    The accounts are used round-robin. An account which is throttled is left
+    out of the rotation for Config.TICKET_THROTTLE_COOLDOWN seconds, an account
+    whose ticket expired is left out for the rest of the run.
+    """
+
+    def __init__(self, tickets: Dict[str, str]):
+        """Create the pool.
+
+        Args:
+            tickets (Dict[str, str]): The ticket of each account.
+
+        Raises:
+            ValueError: If there are no tickets.
+        """
+        if len(tickets) == 0:
+            raise ValueError("At least one ticket is needed.")
+        self.accounts: List[str] = list(tickets.keys())
+        self._tickets: Dict[str, str] = dict(tickets)
+        self._next: int = 0
+        self._cooldown_until: Dict[str, float] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self.expired: Set[str] = set()
+        self.requests: Dict[str, int] = {a: 0 for a in self.accounts}
+        self.throttled: Dict[str, int] = {a: 0 for a in self.accounts}
+
+    def acquire(self) -> Tuple[str, str]:
+        """Get the next account in the rotation, waiting if all of them are throttled.
+
+        Raises:
+            SessionExpiredError: If the tickets of all the accounts expired.
+
+        Returns:
+            Tuple[str, str]: The account and its ticket.
+        """
+        while True:
+            with self._lock:
+                now: float = time.monotonic()
+                alive: List[str] = [a for a in self.accounts if a not in self.expired]
+                if len(alive) == 0:
+                    raise SessionExpiredError(
+                        "The tickets of all the accounts expired, refresh them."
+                    )
+                for _ in range(len(self.accounts)):
+                    account: str = self.accounts[self._next % len(self.accounts)]
+                    self._next += 1
+                    if (
+                        account not in self.expired
+                        and self._cooldown_until.get(account, 0) <= now
+                    ):
+                        self.requests[account] += 1
+                        return (account, self._tickets[account])
+                wait: float = min(self._cooldown_until[a] for a in alive) - now
+            time.sleep(max(0.0, wait))
+
+    def mark_throttled(self, account: str) -> None:
+        """Leave an account out of the rotation for a while.
+
+        Args:
+            account (str): The account.
+        """
+        with self._lock:
+            self.throttled[account] += 1
+            self._cooldown_until[account] = (
+                time.monotonic() + Config.TICKET_THROTTLE_COOLDOWN
+            )
+
+    def mark_expired(self, account: str) -> None:
+        """Leave an account out of the rotation for the rest of the run.
+
+        Args:
+            account (str): The account.
+        """
+        with self._lock:
+            self.expired.add(account)
+
+    def probe(self, check: Callable[[str], None]) -> List[str]:
+        """Check the ticket of each account, leaving the expired ones out of the
+        rotation.
+
+        Args:
+            check (Callable[[str], None]): Called with a ticket, raises
+                SessionExpiredError if it expired.
+
+        Raises:
+            SessionExpiredError: If the tickets of all the accounts expired.
+
+        Returns:
+            List[str]: The accounts whose ticket expired.
+        """
+        for account in self.accounts:
+            try:
+                check(self._tickets[account])
+            except SessionExpiredError:
+                self.mark_expired(account)
+            except ThrottledError:
+                self.mark_throttled(account)
+        if len(self.expired) == len(self.accounts):
+            raise SessionExpiredError(
+                "The tickets of all the accounts expired, refresh them."
+            )
+        return [a for a in self.accounts if a in self.expired]
+
+    def call(self, func: Callable[[str], T]) -> T:
+        """Call a function with the ticket of the next account, moving to the
+        following accounts while the ticket is throttled or expired.
+
+        Args:
+            func (Callable[[str], T]): The function, called with a ticket.
+
+        Raises:
+            SessionExpiredError: If the tickets of all the accounts expired.
+
+        Returns:
+            T: The result of the function.
+        """
+        while True:
+            account, ticket = self.acquire()
+            try:
+                return func(ticket)
+            except ThrottledError:
+                self.mark_throttled(account)
+            except SessionExpiredError:
+                self.mark_expired(account)
+
+    def get_counters(self) -> Dict[str, Dict[str, object]]:
+        """Get the counters of each account.
+
+        Returns:
+            Dict[str, Dict[str, object]]: The number of requests, the number of
+                times it was throttled and if it expired, by account.
+        """
+        with self._lock:
+            return {
+                a: {
+                    "requests": self.requests[a],
+                    "throttled": self.throttled[a],
+                    "expired": a in self.expired,
+                }
+                for a in self.accounts
+            }
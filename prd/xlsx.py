@@ -1,10 +1,10 @@
 import os
 from xlsxwriter import Workbook
 from xlsxwriter.worksheet import Worksheet
-from typing import List, Dict
-from rich import print
+from typing import List, Dict, Optional
 
 from prd.webex_api import Recording
+from prd.reporter import Reporter, ConsoleReporter
 
 
 def _divide_in_courses(recordings: List[Recording]) -> Dict[str, List[Recording]]:
@@ -33,20 +33,27 @@ def _divide_in_courses(recordings: List[Recording]) -> Dict[str, List[Recording]
     return courses
 
 
-def generate_xlsx(recordings: List[Recording], output_folder: str) -> None:
+def generate_xlsx(
+    recordings: List[Recording],
+    output_folder: str,
+    reporter: Optional[Reporter] = None,
+) -> None:
     """Create the xlsx file.
 
     Args:
         recordings (List[Recording]): List of recordings.
         output_folder (str): Output folder path.
+        reporter (Optional[Reporter], optional): Where the progress is reported.
+            Defaults to None, which prints to the terminal.
     """
+    reporter = reporter if reporter is not None else ConsoleReporter()
     courses: Dict[str, List[Recording]] = _divide_in_courses(recordings)
 
     for course, recordings in courses.items():
-        print(f"Generating xlsx file for {course}...")
+        reporter.message(f"Generating xlsx file for {course}...")
         course_output_path: str = os.path.join(output_folder, course)
-        if not os.path.exists(course_output_path):
-            os.makedirs(course_output_path)
+        # aria2c may be creating the same folder
+        os.makedirs(course_output_path, exist_ok=True)
 
         workbook: Workbook = Workbook(
             os.path.join(course_output_path, course + ".xlsx")
@@ -107,4 +114,4 @@ def generate_xlsx(recordings: List[Recording], output_folder: str) -> None:
 
         workbook.close()
 
-    print(f"[green]All xlsx files generated correctly")
+    reporter.message(f"[green]All xlsx files generated correctly")